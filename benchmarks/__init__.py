@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The generator modules import each other as top-level modules (they are run
+# from src/), so make them importable the same way here.
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
@@ -0,0 +1,149 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import benchmarks
+from benchmarks.bench_startup import measure_startup, print_startup
+from benchmarks.corpora import CORPORA, TREES
+from block_markdown import (
+    BlockType,
+    block_to_blocktype,
+    markdown_to_blocks,
+    markdown_to_html_node
+)
+from inline_markdown import text_to_textnodes
+
+def inline_texts(blocks):
+    # The text the block parser hands to the inline parser, minus the
+    # per-type prefix handling; code blocks are not parsed inline.
+    return [block.replace("\n", " ") for block in blocks if block_to_blocktype(block) is not BlockType.CODE]
+
+def timed(func, inputs, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in inputs:
+            func(item)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def peak_memory(pages, render=lambda page: markdown_to_html_node(page).to_html()):
+    tracemalloc.start()
+    for page in pages:
+        render(page)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+def stage_result(seconds, total_bytes, pages):
+    return {
+        "seconds": seconds,
+        "mb_per_s": total_bytes / (1024 * 1024) / seconds,
+        "pages_per_s": pages / seconds,
+    }
+
+def run_corpus(pages, repeat):
+    total_bytes = sum(len(page.encode("utf-8")) for page in pages)
+    blocks = [block for page in pages for block in markdown_to_blocks(page)]
+    texts = inline_texts(blocks)
+    nodes = [markdown_to_html_node(page) for page in pages]
+    stages = {
+        "markdown_to_blocks": (markdown_to_blocks, pages),
+        "block_to_blocktype": (block_to_blocktype, blocks),
+        "text_to_textnodes": (text_to_textnodes, texts),
+        "markdown_to_html_node": (markdown_to_html_node, pages),
+        "to_html": (lambda node: node.to_html(), nodes),
+    }
+    results = {}
+    for name, (func, inputs) in stages.items():
+        if not inputs:
+            continue
+        results[name] = stage_result(timed(func, inputs, repeat), total_bytes, len(pages))
+    return {
+        "pages": len(pages),
+        "bytes": total_bytes,
+        "peak_memory_bytes": peak_memory(pages),
+        "stages": results,
+    }
+
+def run_trees(trees, repeat):
+    # Node trees have no markdown stages; bytes are those of the HTML.
+    to_html = lambda node: node.to_html()
+    total_bytes = sum(len(to_html(tree).encode("utf-8")) for tree in trees)
+    return {
+        "pages": len(trees),
+        "bytes": total_bytes,
+        "peak_memory_bytes": peak_memory(trees, to_html),
+        "stages": {"to_html": stage_result(timed(to_html, trees, repeat), total_bytes, len(trees))},
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_report(report, baseline=None):
+    if "startup" in report:
+        print_startup(report["startup"], (baseline or {}).get("startup"))
+    for corpus, result in report["corpora"].items():
+        print(f"{corpus}: {result['pages']} pages, {result['bytes'] / (1024 * 1024):.1f} MB, "
+              f"peak {result['peak_memory_bytes'] / (1024 * 1024):.1f} MB")
+        for stage, numbers in result["stages"].items():
+            line = f"  {stage:<24}{numbers['mb_per_s']:>10.2f} MB/s{numbers['pages_per_s']:>12.1f} pages/s"
+            if baseline is not None:
+                old = baseline.get("corpora", {}).get(corpus, {}).get("stages", {}).get(stage)
+                if old is not None:
+                    line += f"{old['seconds'] / numbers['seconds']:>8.2f}x vs baseline"
+            print(line)
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark the markdown-to-HTML pipeline stage by stage.")
+    parser.add_argument("corpora", nargs="*", help=f"corpora to run (default: all of {', '.join([*CORPORA, *TREES])})")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage; the fastest is reported")
+    parser.add_argument("--json", metavar="PATH", help="also write the results as JSON ('-' for stdout)")
+    parser.add_argument("--startup-runs", type=int, default=20, metavar="N", help="launches of src/main.py for the startup time (0 = skip)")
+    parser.add_argument("--compare", metavar="PATH", help="show speedups against an earlier --json result")
+    args = parser.parse_args()
+    for name in args.corpora:
+        if name not in CORPORA and name not in TREES:
+            parser.error(f"unknown corpus: {name}")
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "corpora": {},
+    }
+    if args.startup_runs > 0:
+        report["startup"] = measure_startup(args.startup_runs)
+    for name in args.corpora or [*CORPORA, *TREES]:
+        if name in TREES:
+            report["corpora"][name] = run_trees(TREES[name](), args.repeat)
+        else:
+            report["corpora"][name] = run_corpus(CORPORA[name](), args.repeat)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+    if args.json == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+        return
+    print_report(report, baseline)
+    if args.json:
+        with open(args.json, "w") as json_file:
+            json.dump(report, json_file, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import re
+import argparse
+import timeit
+
+import benchmarks
+from htmlnode import ParentNode
+from textnode import TextNode, TextType, text_node_to_html_node
+from block_markdown import (
+    BlockType,
+    classify_block_lines,
+    iter_block_lines,
+    markdown_to_html_node,
+    text_to_children
+)
+
+# The block layer as it was before the line-oriented parser: split on "\n\n",
+# classify each block with regexes, then split it into lines again to build
+# its node.
+def original_markdown_to_blocks(markdown):
+    return [block for block in (s.strip() for s in markdown.split("\n\n")) if block != ""]
+
+def original_block_to_blocktype(block):
+    lines = block.split("\n")
+    if re.findall(r"^(#){1,6}(?= )", block, re.MULTILINE):
+        return BlockType.HEADING
+    if len(lines) > 1 and lines[0].startswith("```") and lines[-1].startswith("```"):
+        return BlockType.CODE
+    elif len(lines) == 1 and lines[0].startswith("```") and lines[0].endswith("```"):
+        return BlockType.CODE
+    if re.match(r"\A>.*(?:\n>.*)*\Z", block):
+        return BlockType.QUOTE
+    if re.match(r"\A- .*(?:\n- .*)*\Z", block):
+        return BlockType.UNORDERED_LIST
+    if block.startswith("1. "):
+        i = 1
+        for line in lines:
+            if not line.startswith(f"{i}. "):
+                return BlockType.PARAGRAPH
+            i += 1
+        return BlockType.ORDERED_LIST
+    return BlockType.PARAGRAPH
+
+def original_block_to_htmlnode(block):
+    block_type = original_block_to_blocktype(block)
+    if block_type is BlockType.PARAGRAPH:
+        return ParentNode("p", text_to_children(block.replace('\n', ' ')))
+    if block_type is BlockType.HEADING:
+        i = len(re.search(r"^(#{1,6})(?= )", block, re.MULTILINE).group(1))
+        return ParentNode(f"h{i}", text_to_children(block[(i+1):]))
+    if block_type is BlockType.CODE:
+        return ParentNode("pre", [ParentNode("code", [text_node_to_html_node(TextNode(block[4:-3], TextType.TEXT))])])
+    if block_type is BlockType.QUOTE:
+        text = "".join(line[1:] + " " for line in block.split("\n"))
+        return ParentNode("blockquote", text_to_children(text.strip()))
+    items = [ParentNode("li", text_to_children(line[line.find(" ") + 1:])) for line in block.split("\n")]
+    return ParentNode("ol" if block_type is BlockType.ORDERED_LIST else "ul", items)
+
+def original_markdown_to_html_node(markdown):
+    return ParentNode("div", [original_block_to_htmlnode(block) for block in original_markdown_to_blocks(markdown)])
+
+def original_classify(markdown):
+    return [original_block_to_blocktype(block) for block in original_markdown_to_blocks(markdown)]
+
+def line_classify(markdown):
+    return [classify_block_lines(lines)[0] for lines in iter_block_lines(markdown.split("\n"))]
+
+def synthetic_document(lines):
+    chunk = [
+        "## Heading",
+        "",
+        "Plain paragraph text",
+        "spanning two lines",
+        "",
+        "- item one",
+        "- item two",
+        "- item three",
+        "",
+        "1. first",
+        "2. second",
+        "",
+        "> quoted",
+        "> more quoted",
+        "",
+        "```",
+        "code line",
+        "    return value",
+        "```",
+        "",
+    ]
+    return "\n".join(chunk * (lines // len(chunk) + 1))
+
+def best_time(func, text, repeat):
+    return min(timeit.repeat(lambda: func(text), number=1, repeat=repeat))
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the line-oriented block parser with the split-and-regex one.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--sizes", type=int, nargs="*", default=[10_000, 100_000, 400_000], help="document sizes in lines")
+    args = parser.parse_args()
+
+    print(f"{'lines':>10}{'stage':>10}{'original ms':>14}{'lines ms':>12}{'ns/line':>10}{'speedup':>10}")
+    for size in args.sizes:
+        text = synthetic_document(size)
+        if original_markdown_to_html_node(text).to_html() != markdown_to_html_node(text).to_html():
+            raise Exception(f"Line parser output differs from the original for {size} lines")
+        for stage, original, current in (
+            ("classify", original_classify, line_classify),
+            ("to nodes", original_markdown_to_html_node, markdown_to_html_node),
+        ):
+            before = best_time(original, text, args.repeat)
+            after = best_time(current, text, args.repeat)
+            print(f"{size:>10}{stage:>10}{before * 1000:>14.1f}{after * 1000:>12.1f}{after / size * 1e9:>10.0f}{before / after:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
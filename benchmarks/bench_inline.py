@@ -0,0 +1,98 @@
+import re
+import argparse
+import timeit
+
+import benchmarks
+from textnode import TextNode, TextType
+from inline_markdown import (
+    split_nodes_delimiter,
+    split_nodes_image,
+    split_nodes_link,
+    text_to_textnodes
+)
+
+# split_nodes_image/split_nodes_link as they were before they walked match
+# positions: every match re-splits the remaining text, which is quadratic in
+# the number of links in a paragraph.
+def split_nodes_resplit(old_nodes, pattern, text_type, prefix):
+    new_list = []
+    for node in old_nodes:
+        if node.text_type != TextType.TEXT:
+            new_list.append(node)
+            continue
+        current_text_to_process = node.text
+        for text, url in re.findall(pattern, node.text):
+            split_node_text = current_text_to_process.split(f"{prefix}[{text}]({url})", 1)
+            if split_node_text[0] != "":
+                new_list.append(TextNode(split_node_text[0], TextType.TEXT))
+            new_list.append(TextNode(text, text_type, url))
+            current_text_to_process = split_node_text[1]
+        if current_text_to_process != "":
+            new_list.append(TextNode(current_text_to_process, TextType.TEXT))
+    return new_list
+
+def original_text_to_textnodes(text):
+    text_node = [TextNode(text, TextType.TEXT)]
+    text_node = split_nodes_delimiter(text_node, "**", TextType.BOLD)
+    text_node = split_nodes_delimiter(text_node, "_", TextType.ITALIC)
+    text_node = split_nodes_delimiter(text_node, "`", TextType.CODE)
+    text_node = split_nodes_resplit(text_node, r"!\[([^\[\]]*)\]\(([^\(\)]*)\)", TextType.IMAGE, "!")
+    text_node = split_nodes_resplit(text_node, r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)", TextType.LINK, "")
+    return text_node
+
+# The five-pass pipeline, using the current compatibility wrappers.
+def chained_text_to_textnodes(text):
+    text_node = [TextNode(text, TextType.TEXT)]
+    text_node = split_nodes_delimiter(text_node, "**", TextType.BOLD)
+    text_node = split_nodes_delimiter(text_node, "_", TextType.ITALIC)
+    text_node = split_nodes_delimiter(text_node, "`", TextType.CODE)
+    text_node = split_nodes_image(text_node)
+    text_node = split_nodes_link(text_node)
+    return text_node
+
+def link_heavy_paragraph(links):
+    parts = []
+    for i in range(links):
+        parts.append(f"see [link number {i}](https://example.com/posts/{i}) and ")
+        if i % 10 == 0:
+            parts.append(f"![figure {i}](/images/fig{i}.png) ")
+    return "".join(parts)
+
+def mixed_paragraph(words):
+    parts = []
+    for i in range(words):
+        if i % 7 == 0:
+            parts.append(f"**strong{i}**")
+        elif i % 5 == 0:
+            parts.append(f"_em{i}_")
+        else:
+            parts.append(f"word{i}")
+    return " ".join(parts)
+
+def best_time(func, text, repeat):
+    return min(timeit.repeat(lambda: func(text), number=1, repeat=repeat))
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the single-pass inline scanner with the chained split passes.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    cases = [
+        ("links x100", link_heavy_paragraph(100)),
+        ("links x1000", link_heavy_paragraph(1000)),
+        ("links x5000", link_heavy_paragraph(5000)),
+        ("links x20000", link_heavy_paragraph(20000)),
+        ("mixed x5000 words", mixed_paragraph(5000)),
+    ]
+    print(f"{'case':<20}{'chars':>10}{'original ms':>14}{'chained ms':>12}{'single ms':>12}{'speedup':>10}")
+    for name, text in cases:
+        expected = original_text_to_textnodes(text)
+        if chained_text_to_textnodes(text) != expected or text_to_textnodes(text) != expected:
+            raise Exception(f"Scanner output differs from the original passes for {name}")
+        original = best_time(original_text_to_textnodes, text, args.repeat)
+        chained = best_time(chained_text_to_textnodes, text, args.repeat)
+        single = best_time(text_to_textnodes, text, args.repeat)
+        print(f"{name:<20}{len(text):>10}{original * 1000:>14.2f}{chained * 1000:>12.2f}{single * 1000:>12.2f}{original / single:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
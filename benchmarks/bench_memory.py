@@ -0,0 +1,105 @@
+import argparse
+import gc
+import tracemalloc
+
+import benchmarks
+from htmlnode import LeafNode, ParentNode
+from textnode import TextNode
+from block_markdown import markdown_to_blocks, markdown_to_html_node
+from inline_markdown import text_to_textnodes
+
+# Stand-ins with the same fields as the node classes but a per-instance
+# __dict__, i.e. the layout the nodes had before they declared __slots__.
+class DictTextNode():
+    def __init__(self, text, text_type, url=None):
+        self.text = text
+        self.text_type = text_type
+        self.url = url
+
+class DictHTMLNode():
+    def __init__(self, tag=None, value=None, children=None, props=None):
+        self.tag = tag
+        self.value = value
+        self.children = children
+        self.props = props
+
+def synthetic_markdown(size_mb):
+    section = (
+        "## Section {i}\n\n"
+        "A paragraph with **bold {i}**, _italic_, `code` and a [link](https://example.com/{i}).\n"
+        "It continues on a second line with ![an image](/images/{i}.png) in it.\n\n"
+        "- first item {i}\n- second item with **bold**\n- third [item](/items/{i})\n\n"
+        "> a quote line {i}\n> and another one\n\n"
+    )
+    target = size_mb * 1024 * 1024
+    parts = []
+    size = 0
+    i = 0
+    while size < target:
+        part = section.format(i=i)
+        parts.append(part)
+        size += len(part)
+        i += 1
+    return "".join(parts)
+
+def slotted_html_node(tag, value, children, props):
+    if children is None:
+        return LeafNode(tag, value, props)
+    return ParentNode(tag, children, props)
+
+def copy_html_tree(node, make_node):
+    children = None
+    if node.children is not None:
+        children = [copy_html_tree(child, make_node) for child in node.children]
+    return make_node(node.tag, node.value, children, node.props)
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+def count_html_nodes(node):
+    count = 0
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        count += 1
+        if current.children:
+            stack.extend(current.children)
+    return count
+
+def main():
+    parser = argparse.ArgumentParser(description="Report bytes per node for the text and HTML node trees.")
+    parser.add_argument("--size-mb", type=int, default=10, help="size of the synthetic markdown document")
+    args = parser.parse_args()
+
+    markdown = synthetic_markdown(args.size_mb)
+    print(f"document: {len(markdown) / (1024 * 1024):.1f} MB")
+
+    text_nodes = [node for block in markdown_to_blocks(markdown) for node in text_to_textnodes(block)]
+    html_root = markdown_to_html_node(markdown)
+    text_count = len(text_nodes)
+    html_count = count_html_nodes(html_root)
+
+    # Copy the existing trees into each layout, so only the node objects (and
+    # the child lists for HTML nodes) are counted, not the shared strings.
+    rows = [
+        ("TextNode", text_count,
+            lambda: [DictTextNode(n.text, n.text_type, n.url) for n in text_nodes],
+            lambda: [TextNode(n.text, n.text_type, n.url) for n in text_nodes]),
+        ("HTMLNode tree", html_count,
+            lambda: copy_html_tree(html_root, DictHTMLNode),
+            lambda: copy_html_tree(html_root, slotted_html_node)),
+    ]
+    print(f"{'nodes':<16}{'count':>12}{'dict B/node':>14}{'slots B/node':>14}{'saved':>8}")
+    for name, count, build_dict, build_slots in rows:
+        _, dict_bytes = measure(build_dict)
+        _, slots_bytes = measure(build_slots)
+        print(f"{name:<16}{count:>12}{dict_bytes / count:>14.1f}{slots_bytes / count:>14.1f}{1 - slots_bytes / dict_bytes:>7.0%}")
+
+if __name__ == "__main__":
+    main()
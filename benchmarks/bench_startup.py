@@ -0,0 +1,91 @@
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+import time
+
+import benchmarks
+
+MAIN_PATH = os.path.join(benchmarks.SRC_DIR, "main.py")
+# --help imports everything main.py imports at the top and parses the
+# command line, but builds nothing.
+STARTUP_ARGS = ("--help",)
+
+def wall_times(command, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    return times
+
+def parse_importtime(stderr):
+    # The top-level entries of -X importtime output: module -> cumulative
+    # microseconds. Nested imports are indented under their importer.
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2]
+        if name.startswith("  "):
+            continue
+        modules[name.strip()] = int(fields[1])
+    return modules
+
+def import_times(command):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *command[1:]],
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True,
+    )
+    return parse_importtime(result.stderr)
+
+def measure_startup(runs=20, args=STARTUP_ARGS, top=10):
+    # Fresh interpreters, with bytecode already cached by a warm-up run:
+    # the cost every one-off build pays before rendering anything. The
+    # bare interpreter is measured the same way and subtracted.
+    bare = [sys.executable, "-c", "pass"]
+    main = [sys.executable, MAIN_PATH, *args]
+    wall_times(main, 1)
+    bare_times = wall_times(bare, runs)
+    main_times = wall_times(main, runs)
+    bare_imports = import_times(bare)
+    main_imports = import_times(main)
+    # Modules main.py pulls in beyond what the interpreter loads anyway.
+    own = {name: us for name, us in main_imports.items() if name not in bare_imports}
+    return {
+        "args": list(args),
+        "runs": runs,
+        "interpreter_ms": statistics.median(bare_times) * 1000,
+        "main_ms": statistics.median(main_times) * 1000,
+        "main_min_ms": min(main_times) * 1000,
+        "startup_ms": (statistics.median(main_times) - statistics.median(bare_times)) * 1000,
+        "import_ms": sum(own.values()) / 1000,
+        "modules": [[name, us / 1000] for name, us in sorted(own.items(), key=lambda item: -item[1])[:top]],
+    }
+
+def print_startup(result, baseline=None):
+    line = (f"startup: {result['startup_ms']:.1f} ms over a {result['interpreter_ms']:.1f} ms interpreter "
+            f"(main.py {' '.join(result['args'])}: median {result['main_ms']:.1f} ms, best {result['main_min_ms']:.1f} ms), "
+            f"imports {result['import_ms']:.1f} ms")
+    # Startup is a difference of two medians, so on a quiet interpreter it
+    # can come out at zero or below; there is no ratio then.
+    if baseline is not None and baseline.get("startup_ms", 0) > 0 and result["startup_ms"] > 0:
+        line += f", {baseline['startup_ms'] / result['startup_ms']:.2f}x vs baseline"
+    print(line)
+    for name, ms in result["modules"]:
+        print(f"  {name:<24}{ms:>8.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start time of src/main.py in fresh interpreters, with an -X importtime breakdown.")
+    parser.add_argument("--runs", type=int, default=20, help="interpreter launches per command; the median is reported")
+    parser.add_argument("--top", type=int, default=10, help="number of top-level imports to list")
+    parser.add_argument("args", nargs="*", default=list(STARTUP_ARGS), help="arguments for main.py (default --help)")
+    args = parser.parse_args()
+    print_startup(measure_startup(args.runs, args.args, args.top))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# Synthetic markdown corpora, each a list of page sources. They are built
+# deterministically so results are comparable between commits.
+
+from htmlnode import LeafNode, ParentNode
+
+def long_paragraphs(pages=20, paragraphs=50, sentences=40):
+    sentence = "The quick **brown** fox jumps over the _lazy_ dog near the `river` bank. "
+    page = "# Long paragraphs\n\n" + "\n\n".join(sentence * sentences for _ in range(paragraphs))
+    return [page] * pages
+
+def link_dense(pages=20, paragraphs=30, links=60):
+    paragraph = " ".join(
+        f"see [link {i}](https://example.com/posts/{i}) or ![fig {i}](/images/{i}.png)" for i in range(links)
+    )
+    page = "# Links\n\n" + "\n\n".join(paragraph for _ in range(paragraphs))
+    return [page] * pages
+
+def giant_code(pages=10, lines=20000):
+    code = "\n".join(f"    result_{i} = compute(value_{i}, **options)  # `{i}`" for i in range(lines))
+    page = f"# Code\n\n```\n{code}\n```"
+    return [page] * pages
+
+def long_lists(pages=20, lists=20, items=200):
+    unordered = "\n".join(f"- item {i} with **bold** and [a link](/items/{i})" for i in range(items))
+    ordered = "\n".join(f"{i + 1}. step {i} with _emphasis_" for i in range(items))
+    page = "# Lists\n\n" + "\n\n".join(unordered if n % 2 else ordered for n in range(lists))
+    return [page] * pages
+
+def small_pages(pages=5000):
+    return [
+        f"# Post {i}\n\n[< Back Home](/)\n\nA short post with **bold** text and a [link](/posts/{i + 1}).\n\n> quoted line {i}"
+        for i in range(pages)
+    ]
+
+# The block parser has no nested lists (an indented "- item" line is
+# paragraph text), so no markdown reaches deeper than ul > li > inline.
+# Deep trees for the stack-based serializer are built as nodes instead: the
+# shape nested lists would parse to, depth levels deep with items per level.
+def deep_lists(pages=20, depth=500, items=4):
+    trees = []
+    for _ in range(pages):
+        node = ParentNode("ul", [ParentNode("li", [LeafNode(None, "innermost")])])
+        for level in range(depth):
+            siblings = [ParentNode("li", [LeafNode("b", f"level {level}"), LeafNode(None, f" item {i}")]) for i in range(items - 1)]
+            node = ParentNode("ul", siblings + [ParentNode("li", [LeafNode(None, f"level {level} "), node])])
+        trees.append(ParentNode("div", [node]))
+    return trees
+
+CORPORA = {
+    "long_paragraphs": long_paragraphs,
+    "link_dense": link_dense,
+    "giant_code": giant_code,
+    "long_lists": long_lists,
+    "small_pages": small_pages,
+}
+
+# Corpora of node trees rather than markdown; only serialization is timed.
+TREES = {
+    "deep_lists": deep_lists,
+}
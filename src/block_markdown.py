@@ -1,6 +1,8 @@
-import re
+import profiling
+import textnode
 
 from enum import Enum
+from collections import OrderedDict
 from htmlnode import HTMLNode, LeafNode, ParentNode
 from textnode import TextNode, TextType, text_node_to_html_node
 from inline_markdown import text_to_textnodes
@@ -13,71 +15,194 @@ class BlockType(Enum):
     UNORDERED_LIST = "unordered list"
     ORDERED_LIST = "ordered list"
 
+# Blocks are handled as lists of lines, found in one pass over the document:
+# a block ends at an empty line, which is exactly where splitting the text
+# on "\n\n" would cut it. Each block's lines are then classified and turned
+# into nodes without joining and re-splitting them.
+
+def iter_lines(text):
+    start = 0
+    while True:
+        end = text.find("\n", start)
+        if end == -1:
+            yield text[start:]
+            return
+        yield text[start:end]
+        start = end + 1
+
+def iter_file_lines(md_file):
+    # Lines of an open text file without their newline, like iter_lines.
+    for line in md_file:
+        if line.endswith("\n"):
+            yield line[:-1]
+        else:
+            yield line
+
+def iter_block_lines(lines):
+    block = []
+    for line in lines:
+        if line:
+            block.append(line)
+        elif block:
+            block = strip_block_lines(block)
+            if block:
+                yield block
+            block = []
+    if block:
+        block = strip_block_lines(block)
+        if block:
+            yield block
+
+def strip_block_lines(lines):
+    # Same as calling strip() on the joined block.
+    start = 0
+    end = len(lines)
+    while start < end and lines[start].isspace():
+        start += 1
+    while end > start and lines[end - 1].isspace():
+        end -= 1
+    if start == end:
+        return []
+    lines = lines[start:end]
+    lines[0] = lines[0].lstrip()
+    lines[-1] = lines[-1].rstrip()
+    return lines
+
 def markdown_to_blocks(markdown):
-    blocks = markdown.split("\n\n")
-    stripped_blocks = [s.strip() for s in blocks]
-    new_blocks = []
-    for block in stripped_blocks:
-        if block != "":
-            new_blocks.append(block)
-    return new_blocks
+    return ["\n".join(lines) for lines in iter_block_lines(markdown.split("\n"))]
+
+def heading_level(line):
+    # 1-6 "#" followed by a space, i.e. r"^#{1,6}(?= )"; 0 otherwise.
+    level = len(line) - len(line.lstrip("#"))
+    if 1 <= level <= 6 and line[level:level + 1] == " ":
+        return level
+    return 0
+
+def classify_block_lines(lines):
+    # Returns (block type, heading level). A heading line anywhere in the
+    # block makes it a heading, so that check wins over the others.
+    quote = unordered = True
+    ordered = lines[0].startswith("1. ")
+    i = 1
+    for line in lines:
+        if line.startswith("#"):
+            level = heading_level(line)
+            if level:
+                return BlockType.HEADING, level
+        if quote and not line.startswith(">"):
+            quote = False
+        if unordered and not line.startswith("- "):
+            unordered = False
+        if ordered and not line.startswith(f"{i}. "):
+            ordered = False
+        i += 1
+    first = lines[0]
+    if first.startswith("```"):
+        if len(lines) > 1 and lines[-1].startswith("```"):
+            return BlockType.CODE, 0
+        if len(lines) == 1 and first.endswith("```"):
+            return BlockType.CODE, 0
+    if quote:
+        return BlockType.QUOTE, 0
+    if unordered:
+        return BlockType.UNORDERED_LIST, 0
+    if ordered:
+        return BlockType.ORDERED_LIST, 0
+    return BlockType.PARAGRAPH, 0
 
 def block_to_blocktype(block):
-    lines = block.split("\n")
-    if re.findall(r"^(#){1,6}(?= )", block, re.MULTILINE):
-        return BlockType.HEADING
-    if len(lines) > 1 and lines[0].startswith("```") and lines[-1].startswith("```"):
-        return BlockType.CODE
-    elif len(lines) == 1 and lines[0].startswith("```") and lines[0].endswith("```"):
-        return BlockType.CODE
-    if re.match(r"\A>.*(?:\n>.*)*\Z", block):
-        return BlockType.QUOTE
-    if re.match(r"\A- .*(?:\n- .*)*\Z", block):
-        return BlockType.UNORDERED_LIST
-    if block.startswith("1. "):
-        i = 1
-        for line in lines:
-            if not line.startswith(f"{i}. "):
-                return BlockType.PARAGRAPH
-            i += 1
-        return BlockType.ORDERED_LIST
-    return BlockType.PARAGRAPH
+    return classify_block_lines(block.split("\n"))[0]
     
 def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
-    children_nodes = []
-    for block in blocks:
-        node = block_to_htmlnode(block)
-        children_nodes.append(node)
-    return ParentNode("div", children_nodes)
+    with profiling.stage("blocks"):
+        children_nodes = []
+        for lines in iter_block_lines(markdown.split("\n")):
+            children_nodes.append(block_lines_to_htmlnode(lines))
+        return ParentNode("div", children_nodes)
+
+def iter_block_nodes(lines):
+    # Yields each block's node as soon as the empty line closing it is read,
+    # so only one block's lines are held at a time.
+    for block_lines in iter_block_lines(lines):
+        with profiling.stage("blocks"):
+            node = block_lines_to_htmlnode(block_lines)
+        yield node
+
+def iter_markdown_html(lines):
+    # Streaming equivalent of markdown_to_html_node(markdown).iter_html().
+    yield "<div>"
+    empty = True
+    for node in iter_block_nodes(lines):
+        empty = False
+        yield from node.iter_html()
+    if empty:
+        raise ValueError("No children found, parent node must have children")
+    yield "</div>"
 
 def block_to_htmlnode(block):
-    block_type = block_to_blocktype(block)
+    return block_lines_to_htmlnode(block.split("\n"))
+
+def block_lines_to_htmlnode(lines):
+    block_type, level = classify_block_lines(lines)
     if block_type is BlockType.PARAGRAPH:
-        return ParentNode("p", text_to_children(block.replace('\n', ' ')))
+        return ParentNode("p", text_to_children(" ".join(lines)))
     if block_type is BlockType.HEADING:
-        match = re.search(r"^(#{1,6})(?= )", block, re.MULTILINE)
-        i = len(match.group(1))
-        return ParentNode(f"h{i}", text_to_children(block[(i+1):]))
+        return ParentNode(f"h{level}", text_to_children("\n".join(lines)[(level+1):]))
     if block_type is BlockType.CODE:
-        return ParentNode("pre", [ParentNode("code", [text_node_to_html_node(TextNode(block[4:-3], TextType.TEXT))])])
+        return ParentNode("pre", [ParentNode("code", [text_node_to_html_node(TextNode("\n".join(lines)[4:-3], TextType.TEXT))])])
     if block_type is BlockType.QUOTE:
-        return quote_to_html_node(block)
+        return quote_lines_to_html_node(lines)
     if block_type is BlockType.UNORDERED_LIST:
-        return list_to_html_node(block, block_type)
+        return list_lines_to_html_node(lines, block_type)
     if block_type is BlockType.ORDERED_LIST:
-        return list_to_html_node(block, block_type)
+        return list_lines_to_html_node(lines, block_type)
     raise ValueError("Invalid block type")
 
+def block_lines_to_texts(lines):
+    # The inline markdown block_lines_to_htmlnode would parse for this block,
+    # one string per paragraph, heading, quote or list item. Code blocks are
+    # returned as their raw text with the block type, for callers such as
+    # the search index that want the words without the HTML.
+    block_type, level = classify_block_lines(lines)
+    if block_type is BlockType.PARAGRAPH:
+        return block_type, [" ".join(lines)]
+    if block_type is BlockType.HEADING:
+        return block_type, ["\n".join(lines)[(level+1):]]
+    if block_type is BlockType.CODE:
+        return block_type, ["\n".join(lines)[4:-3]]
+    if block_type is BlockType.QUOTE:
+        return block_type, [" ".join(line[1:] for line in lines).strip()]
+    return block_type, [line[line.find(" ") + 1:] for line in lines]
+
+def block_lines_to_textnodes(lines):
+    # block_lines_to_texts with each text tokenized once, for everything that
+    # reads the site before it renders (search terms, link targets): the
+    # block type and a (text, TextNodes) pair per text. The nodes are None
+    # for code blocks, which are not inline markdown, and for text that does
+    # not parse, which is reported when the page renders.
+    block_type, texts = block_lines_to_texts(lines)
+    tokenized = []
+    for text in texts:
+        nodes = None
+        if block_type is not BlockType.CODE:
+            try:
+                nodes = text_to_textnodes(text)
+            except Exception:
+                pass
+        tokenized.append((text, nodes))
+    return block_type, tokenized
+
 def quote_to_html_node(block):
-    new_lines = ""
-    lines = block.split("\n")
-    for line in lines:
-        new_lines += (line[1:] + " ")
+    return quote_lines_to_html_node(block.split("\n"))
+
+def quote_lines_to_html_node(lines):
+    new_lines = " ".join(line[1:] for line in lines)
     return ParentNode("blockquote", text_to_children(new_lines.strip()))
 
 def list_to_html_node(block, list_type):
-    lines = block.split("\n")
+    return list_lines_to_html_node(block.split("\n"), list_type)
+
+def list_lines_to_html_node(lines, list_type):
     li_nodes = []
     for line in lines:
         space_index = line.find(" ")
@@ -87,7 +212,60 @@ def list_to_html_node(block, list_type):
     elif list_type == BlockType.UNORDERED_LIST:
         return ParentNode("ul", li_nodes)
 
+# Optional memo of inline rendering, shared by every page rendered in this
+# process; None when disabled (see set_inline_memo).
+INLINE_MEMO = None
+
+class InlineMemo():
+    # Bounded LRU of inline text -> its HTML nodes, the same nodes an
+    # unmemoized render returns. The image resolver's key and the URL
+    # basepath are part of the key since they set <img> attributes and URLs;
+    # the key is a plain value, so an equal pipeline unpickled in a worker
+    # still hits and stale entries do not hold on to it. Long texts
+    # are rarely repeated, so only texts up to max_text_length are
+    # remembered.
+    def __init__(self, max_entries=10000, max_text_length=256):
+        self.max_entries = max_entries
+        self.max_text_length = max_text_length
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, text):
+        key = (text, textnode.IMAGE_RESOLVER_KEY, textnode.URL_BASEPATH)
+        nodes = self.entries.get(key)
+        if nodes is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return list(nodes)
+        self.misses += 1
+        nodes = render_inline(text)
+        if len(text) <= self.max_text_length:
+            self.entries[key] = nodes
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return list(nodes)
+
+    def shrink(self, max_entries):
+        # Drops the least recently used entries beyond max_entries.
+        while len(self.entries) > max_entries:
+            self.entries.popitem(last=False)
+
+def set_inline_memo(max_entries):
+    global INLINE_MEMO
+    if max_entries <= 0:
+        INLINE_MEMO = None
+    elif INLINE_MEMO is None or INLINE_MEMO.max_entries != max_entries:
+        INLINE_MEMO = InlineMemo(max_entries)
+    return INLINE_MEMO
+
 def text_to_children(text):
+    with profiling.stage("inline"):
+        if INLINE_MEMO is not None:
+            return INLINE_MEMO.render(text)
+        return render_inline(text)
+
+def render_inline(text):
     text_nodes = text_to_textnodes(text) #text_nodes is a LIST of TextNodes, with TextType and URLs
     html_nodes = []
     for node in text_nodes:
@@ -96,9 +274,10 @@ def text_to_children(text):
     return html_nodes
 
 def extract_title(markdown):
-    md_blocks = markdown_to_blocks(markdown)
-    for block in md_blocks:
-        if block_to_blocktype(block) == BlockType.HEADING:
-            match = re.search(r"^(#{1})(?= )", block)
-            if match:
-                return block[2:]
\ No newline at end of file
+    return extract_title_from_lines(iter_lines(markdown))
+
+def extract_title_from_lines(lines):
+    # The first block that starts with "# "; stops reading once found.
+    for block_lines in iter_block_lines(lines):
+        if block_lines[0].startswith("# "):
+            return "\n".join(block_lines)[2:]
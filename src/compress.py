@@ -0,0 +1,163 @@
+import os
+import gzip
+import shutil
+import hashlib
+import threading
+import profiling
+
+from concurrent.futures import ThreadPoolExecutor
+from page_cache import cache_entries, evict_entries
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_CACHE_DIR = ".cache/compressed"
+COMPRESS_CACHE_BYTES = 256 * 1024 * 1024
+COMPRESS_THREADS = 4
+# submit() waits for the pool to drain once this many files per thread are
+# queued, so a sweep over a large tree does not queue every file at once.
+MAX_PENDING_PER_THREAD = 64
+PAGE_EXTENSIONS = (".html", ".css")
+# Other text assets from static/, compressed with --compress-assets.
+ASSET_EXTENSIONS = (".js", ".mjs", ".json", ".svg", ".xml", ".txt", ".map")
+SUFFIXES = {"gzip": ".gz", "br": ".br"}
+
+def gzip_bytes(data):
+    # mtime=0 keeps the output identical for identical input.
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+def brotli_bytes(data):
+    return brotli.compress(data, quality=11)
+
+ENCODERS = {"gzip": gzip_bytes, "br": brotli_bytes}
+
+def available_formats(formats):
+    if "br" in formats and brotli is None:
+        print("brotli is not installed; writing gzip only (pip install brotli)")
+        return [name for name in formats if name != "br"]
+    return list(formats)
+
+def compressed_paths(path, formats=SUFFIXES):
+    return [path + SUFFIXES[name] for name in formats]
+
+class Compressor():
+    # Writes .gz/.br siblings next to output files on a thread pool.
+    #
+    # Siblings are stamped with their file's mtime, and a sibling whose
+    # mtime still matches is left alone, which covers incremental builds.
+    # A full build starts from an empty docs/, so compressed bytes are also
+    # kept in a cache keyed by the file's content hash: a file whose bytes
+    # did not change since the previous build gets its siblings copied from
+    # the cache instead of compressed again. Like the page cache, entries
+    # are touched on use and evict() trims it to max_bytes.
+    def __init__(self, formats=("gzip", "br"), extensions=PAGE_EXTENSIONS, cache_dir=COMPRESS_CACHE_DIR, threads=COMPRESS_THREADS, max_bytes=COMPRESS_CACHE_BYTES):
+        self.formats = available_formats(formats)
+        self.extensions = tuple(extensions)
+        self.cache_dir = cache_dir
+        self.threads = threads
+        self.max_bytes = max_bytes
+        self.executor = None
+        self.pending = []
+        self.failures = []
+        self.submitted = set()
+        self.lock = threading.Lock()
+        self.compressed = 0
+        self.reused = 0
+        self.skipped = 0
+
+    def __getstate__(self):
+        # Worker processes get their own pool and counters.
+        return {"formats": self.formats, "extensions": self.extensions, "cache_dir": self.cache_dir, "threads": self.threads, "max_bytes": self.max_bytes}
+
+    def __setstate__(self, state):
+        self.__init__(state["formats"], state["extensions"], state["cache_dir"], state["threads"], state["max_bytes"])
+
+    def wants(self, path):
+        return bool(self.formats) and str(path).endswith(self.extensions)
+
+    def submit(self, path):
+        # Each path is compressed at most once per build, so a final sweep
+        # over docs/ does not race with pages still being compressed.
+        path = str(path)
+        if not self.wants(path) or path in self.submitted:
+            return
+        self.submitted.add(path)
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.threads)
+        if len(self.pending) >= self.threads * MAX_PENDING_PER_THREAD:
+            self.failures.extend(self.wait())
+        self.pending.append((path, self.executor.submit(self.compress, path)))
+
+    def submit_tree(self, directory):
+        for root, _, names in os.walk(directory):
+            for name in names:
+                self.submit(os.path.join(root, name))
+
+    def wait(self):
+        # Returns (path, error) pairs for files that could not be compressed.
+        failures = self.failures
+        self.failures = []
+        for path, future in self.pending:
+            error = future.exception()
+            if error is not None:
+                failures.append((path, f"{type(error).__name__}: {error}"))
+        self.pending = []
+        return failures
+
+    def close(self):
+        failures = self.wait()
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        return failures
+
+    def compress(self, path):
+        with profiling.stage("compress"):
+            stat = os.stat(path)
+            targets = [(name, path + SUFFIXES[name]) for name in self.formats]
+            stale = [(name, target) for name, target in targets if not is_current(target, stat)]
+            if not stale:
+                self.count("skipped")
+                return
+            with open(path, "rb") as source:
+                data = source.read()
+            digest = hashlib.sha256(data).hexdigest()
+            for name, target in stale:
+                cached = os.path.join(self.cache_dir, digest[:2], digest + SUFFIXES[name])
+                try:
+                    # Marks the entry as used for evict().
+                    os.utime(cached)
+                    self.count("reused")
+                except FileNotFoundError:
+                    write_atomic(cached, ENCODERS[name](data))
+                    self.count("compressed")
+                copy_atomic(cached, target, stat)
+
+    def evict(self):
+        # Returns the size of the cache after trimming it.
+        return evict_entries(cache_entries(self.cache_dir), self.max_bytes)
+
+    def count(self, counter):
+        with self.lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+def is_current(target, stat):
+    try:
+        return os.stat(target).st_mtime_ns == stat.st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+def write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as out:
+        out.write(data)
+    os.replace(tmp_path, path)
+
+def copy_atomic(src, dst, stat):
+    tmp_path = f"{dst}.tmp"
+    shutil.copyfile(src, tmp_path)
+    os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os.replace(tmp_path, dst)
@@ -1,11 +1,21 @@
 import shutil
 import os
+import io
+import threading
+import profiling
 
-from pathlib import Path
-from textnode import TextNode, TextType
+from collections import deque
+
+from datetime import date
+from template import load_template, rewrite_basepath
+from textnode import TextNode, TextType, set_image_resolver, set_url_basepath
+import block_markdown
+from minify import minify_html_chunks
 from block_markdown import (
-    extract_title,
-    markdown_to_html_node
+    extract_title_from_lines,
+    iter_file_lines,
+    iter_markdown_html,
+    set_inline_memo
 )
 
 def prepare_directory(directory):
@@ -23,48 +33,747 @@ def prepare_directory(directory):
         os.mkdir(dir_to_prepare)
         print(f"{dir_to_prepare} created!")
 
-def copy_directory(directory_src, directory_dst):
-    print(f"Source dir: {directory_src}")
-    print(f"Destination dir: {directory_dst}")
-    if not os.path.exists(directory_dst):
-        print(f"{directory_dst} doesn't exist, creating...")
-        os.mkdir(directory_dst)
-        print(f"{directory_dst} created!")
-
-    for item in os.listdir(directory_src):
-        print(f"Source item: {item}")
-        src_item = os.path.join(directory_src, item)
-        dst_item = os.path.join(directory_dst, item)
-        if os.path.isfile(src_item):
-            shutil.copy(src_item, dst_item)
-            print(f"{item} copied!")
-        elif os.path.isdir(src_item):
-            print(f"{item} is dir, recursing...")
-            copy_directory(src_item, dst_item)
-
-def generate_page(from_path, template_path, dest_path, basepath):
-    print(f"Generating page from {from_path} to {dest_path} using {template_path}...")
-    with open(from_path, 'r') as md_file:
-        markdown = md_file.read()
-    with open(template_path, 'r') as temp_file:
-        template = temp_file.read()
-    html_str = markdown_to_html_node(markdown).to_html()
-    page_title = extract_title(markdown)
-    template = template.replace("{{ Title }}", page_title)
-    template = template.replace("{{ Content }}", html_str)
-    template = template.replace('href="/', f'href="{basepath}')
-    template = template.replace('src="/', f'src="{basepath}')
-    with open(dest_path, "w") as html_file:
-        html_file.write(template)
-
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath):
+# Copies are spread over threads once a sync has at least this many files.
+COPY_THREADS = 8
+PARALLEL_COPY_THRESHOLD = 32
+# Linux ioctl that makes dst share src's blocks on copy-on-write filesystems.
+FICLONE = 0x40049409
+
+# Extension -> function applied to a text asset's contents while it is
+# copied, such as minify_css for ".css" (see set_asset_transforms). These
+# files are always written out, never linked.
+ASSET_TRANSFORMS = {}
+
+def set_asset_transforms(transforms):
+    ASSET_TRANSFORMS.clear()
+    ASSET_TRANSFORMS.update(transforms)
+
+def copy_directory(directory_src, directory_dst, link="copy"):
+    return sync_directory(directory_src, directory_dst, link)
+
+def sync_directory(directory_src, directory_dst, link="copy", threads=COPY_THREADS):
+    files = list_files(directory_src, directory_dst)
+    stale = [(src, dst) for src, dst in files if not is_up_to_date(src, dst)]
+    copy_files(stale, link, threads)
+    print(f"Synced {directory_src} to {directory_dst}: {len(stale)} of {len(files)} files copied")
+    return stale
+
+def is_up_to_date(src, dst, src_stat=None):
+    # Same size and mtime as the source, like rsync's quick check. Copies keep
+    # the source mtime (copy2/copystat) and hardlinks share it.
+    if src_stat is None:
+        src_stat = os.stat(src)
+    try:
+        dst_stat = os.stat(dst)
+    except FileNotFoundError:
+        return False
+    if os.path.splitext(dst)[1] in ASSET_TRANSFORMS:
+        # A transformed copy keeps the source mtime but not its size.
+        return dst_stat.st_mtime_ns == src_stat.st_mtime_ns
+    return dst_stat.st_size == src_stat.st_size and dst_stat.st_mtime_ns == src_stat.st_mtime_ns
+
+def copy_files(files, link="copy", threads=COPY_THREADS):
+    for dst_dir in sorted({os.path.dirname(dst) for _, dst in files}):
+        if dst_dir:
+            os.makedirs(dst_dir, exist_ok=True)
+    if threads > 1 and len(files) >= PARALLEL_COPY_THRESHOLD:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(lambda item: copy_file(item[0], item[1], link), files))
+    else:
+        for src, dst in files:
+            copy_file(src, dst, link)
+
+def copy_file(src, dst, link="copy"):
+    with profiling.stage("copy"):
+        transform = ASSET_TRANSFORMS.get(os.path.splitext(dst)[1])
+        if transform is not None:
+            with open(src, "r") as src_file:
+                text = transform(src_file.read())
+            write_output(dst, [text])
+            shutil.copystat(src, dst)
+            return
+        if link == "hard":
+            try:
+                if os.path.lexists(dst):
+                    os.remove(dst)
+                os.link(src, dst)
+                return
+            except OSError:
+                pass
+        elif link == "reflink":
+            try:
+                import fcntl
+                with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+                    fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+                shutil.copystat(src, dst)
+                return
+            except (ImportError, OSError):
+                pass
+        shutil.copy2(src, dst)
+
+class PageOptions():
+    # Per-page build settings shared by every page of a build; passed to
+    # worker processes, so everything here must pickle.
+    def __init__(self, cache=None, inline_memo_size=0, index=None, io_threads=0, compressor=None, minify=False, images=None, memory_budget=None):
+        self.cache = cache
+        # An ImagePipeline whose attributes are added to <img> tags.
+        self.images = images
+        self.minify = minify
+        # A Compressor that writes .gz/.br siblings of each page once it is
+        # written.
+        self.compressor = compressor
+        self.inline_memo_size = inline_memo_size
+        # With io_threads > 0, markdown reads are prefetched and HTML writes
+        # flushed by that many threads while pages render (see
+        # generate_page_jobs).
+        self.io_threads = io_threads
+        # A SiteIndex built before rendering; pages take their title from it
+        # instead of scanning the markdown for it.
+        self.index = index
+        # A MemoryBudget checked between pages; pages are then also fed to
+        # the workers from a bounded queue (see generate_pages_bounded).
+        self.memory_budget = memory_budget
+
+def build_counters(options):
+    # Hit/miss counts of this process's caches, for the build report.
+    counters = {}
+    memo = block_markdown.INLINE_MEMO
+    if memo is not None:
+        counters["inline memo"] = [memo.hits, memo.misses]
+    if options is not None and options.cache is not None:
+        counters["page cache"] = [options.cache.hits, options.cache.misses]
+    if options is not None and options.compressor is not None:
+        # Hits are siblings copied from the compression cache.
+        counters["compress cache"] = [options.compressor.reused, options.compressor.compressed]
+    return counters
+
+def merge_counters(total, counters):
+    for name, (hits, misses) in counters.items():
+        record = total.setdefault(name, [0, 0])
+        record[0] += hits
+        record[1] += misses
+
+def format_counters(counters):
+    lines = []
+    for name, (hits, misses) in sorted(counters.items()):
+        lookups = hits + misses
+        rate = hits / lookups if lookups else 0.0
+        lines.append(f"{name}: {hits} hits, {misses} misses ({rate:.0%} hit rate)")
+    return "\n".join(lines)
+
+def generate_page(from_path, template_path, dest_path, basepath, variables=None, options=None, source=None, writer=None):
+    # source is the (bytes, mtime) of the markdown when it was already read
+    # by read_source; writer is a PageWriter that takes over the write.
+    if options is None:
+        options = PageOptions()
+    if options.inline_memo_size:
+        set_inline_memo(options.inline_memo_size)
+    if options.images is not None:
+        set_image_resolver(options.images.resolve, options.images.fingerprint())
+    else:
+        set_image_resolver(None)
+    # Link and image URLs get the basepath as their nodes are created.
+    set_url_basepath(basepath)
+    with profiling.page(from_path):
+        print(f"Generating page from {from_path} to {dest_path} using {template_path}...")
+        with profiling.stage("template"):
+            template = load_template(template_path, basepath)
+        if source is not None:
+            data, mtime = source
+            # Decodes like open(from_path, "r") would.
+            md_file = io.TextIOWrapper(io.BytesIO(data))
+        else:
+            md_file = open(from_path, 'r')
+            mtime = None
+        with md_file:
+            cached = None
+            if options.cache is not None:
+                if source is not None:
+                    content_hash = hash_bytes(data)
+                else:
+                    content_hash = hash_file(from_path)
+                # Cached bodies already carry the basepath in their URLs.
+                content_hash = f"{content_hash}:{basepath}"
+                cached = options.cache.open(content_hash)
+            info = options.index.get(from_path) if options.index is not None else None
+            if cached is not None:
+                page_title, body = cached
+            else:
+                # The markdown is streamed: one pass for the title, which
+                # stops at the first "# " block, then a second that parses
+                # and writes block by block, so memory is bounded by the
+                # largest block, not the file.
+                if info is not None:
+                    page_title = info.title
+                else:
+                    with profiling.stage("blocks"):
+                        page_title = extract_title_from_lines(iter_file_lines(md_file))
+                    md_file.seek(0)
+                body = iter_markdown_html(iter_file_lines(md_file))
+                if options.cache is not None:
+                    body = options.cache.store(content_hash, page_title, body)
+            if mtime is None:
+                mtime = os.path.getmtime(from_path)
+            context = {
+                "Title": rewrite_basepath(page_title, basepath),
+                "Date": date.fromtimestamp(mtime).isoformat(),
+            }
+            if variables:
+                context.update(variables)
+            context["Content"] = body
+            # Reading, serialization, template substitution and writing are
+            # streamed together, so they are timed as one "render" stage.
+            # With a writer the page is rendered to memory here and written
+            # on a writer thread instead.
+            with profiling.stage("render"):
+                chunks = template.iter_render(context)
+                if options.minify:
+                    chunks = minify_html_chunks(chunks)
+                if writer is not None:
+                    writer.submit(from_path, dest_path, list(chunks))
+                else:
+                    write_output(dest_path, chunks)
+                    if options.compressor is not None:
+                        options.compressor.submit(dest_path)
+
+def write_output(dest_path, chunks):
+    # Write to a temporary file so a failed render never leaves half a page.
+    tmp_path = f"{dest_path}.tmp"
+    try:
+        with open(tmp_path, "w") as html_file:
+            html_file.writelines(chunks)
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        import contextlib
+        # open() may have failed before creating the file.
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+        raise
+
+def read_source(path):
+    # Runs on an I/O thread: the markdown bytes and mtime for generate_page.
+    with profiling.stage("read"):
+        with open(path, "rb") as md_file:
+            return md_file.read(), os.fstat(md_file.fileno()).st_mtime
+
+class PageWriter():
+    # Writes rendered pages from a thread pool. At most max_pending pages
+    # wait in memory; submit blocks until a slot frees up. With a
+    # compressor, each page is compressed on the writer thread after it is
+    # written.
+    def __init__(self, threads, max_pending=None, compressor=None):
+        from concurrent.futures import ThreadPoolExecutor
+        self.executor = ThreadPoolExecutor(max_workers=threads)
+        self.compressor = compressor
+        self.slots = threading.Semaphore(max_pending or threads * 2)
+        self.pending = []
+
+    def submit(self, from_path, dest_path, chunks):
+        self.slots.acquire()
+        try:
+            future = self.executor.submit(self.write, dest_path, chunks)
+        except BaseException:
+            self.slots.release()
+            raise
+        self.pending.append((from_path, future))
+
+    def write(self, dest_path, chunks):
+        try:
+            with profiling.stage("write"):
+                write_output(dest_path, chunks)
+            if self.compressor is not None and self.compressor.wants(dest_path):
+                self.compressor.compress(str(dest_path))
+        finally:
+            self.slots.release()
+
+    def close(self):
+        # Waits for every write; returns (source, error) pairs like
+        # generate_page_jobs.
+        self.executor.shutdown(wait=True)
+        failures = []
+        for from_path, future in self.pending:
+            error = future.exception()
+            if error is not None:
+                failures.append((from_path, f"{type(error).__name__}: {error}"))
+        self.pending = []
+        return failures
+
+def generate_page_jobs(jobs):
+    # Failures are collected rather than raised so one bad page does not
+    # hide the others.
+    io_threads = jobs[0][4].io_threads if jobs and jobs[0][4] is not None else 0
+    if io_threads > 0:
+        failures = generate_page_pipeline(jobs, io_threads)
+    else:
+        failures = []
+        for from_path, template_path, dest_path, basepath, options in jobs:
+            try:
+                generate_page(from_path, template_path, dest_path, basepath, options=options)
+            except Exception as e:
+                failures.append((from_path, f"{type(e).__name__}: {e}"))
+            if options is not None and options.memory_budget is not None:
+                options.memory_budget.check()
+    compressor = jobs[0][4].compressor if jobs and jobs[0][4] is not None else None
+    if compressor is not None:
+        failures.extend(compressor.wait())
+    return failures
+
+def generate_page_pipeline(jobs, io_threads):
+    # Reads run up to 2 * io_threads pages ahead on a thread pool, pages
+    # render on this thread as their source arrives, and a PageWriter
+    # flushes the output, so file latency overlaps with rendering.
+    failures = []
+    writer = PageWriter(io_threads, compressor=jobs[0][4].compressor)
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=io_threads) as readers:
+        queued = iter(jobs)
+        reads = deque()
+        for job in queued:
+            reads.append((job, readers.submit(read_source, job[0])))
+            if len(reads) >= io_threads * 2:
+                break
+        while reads:
+            (from_path, template_path, dest_path, basepath, options), read = reads.popleft()
+            job = next(queued, None)
+            if job is not None:
+                reads.append((job, readers.submit(read_source, job[0])))
+            try:
+                generate_page(from_path, template_path, dest_path, basepath, options=options, source=read.result(), writer=writer)
+            except Exception as e:
+                failures.append((from_path, f"{type(e).__name__}: {e}"))
+            except BaseException:
+                writer.close()
+                raise
+            if options is not None and options.memory_budget is not None:
+                options.memory_budget.check()
+    failures.extend(writer.close())
+    return failures
+
+# The PageOptions of a worker process, set once by init_worker when the pool
+# starts. Batches are sent without them: with a site index they are far
+# larger than the batch itself, and the caches in them keep their state
+# between batches.
+WORKER_OPTIONS = None
+
+def init_worker(options):
+    global WORKER_OPTIONS
+    WORKER_OPTIONS = options
+
+def worker_jobs(jobs):
+    # Jobs as sent to a worker, which fills in WORKER_OPTIONS.
+    return [(src, template_path, dest_path, basepath, None) for src, template_path, dest_path, basepath, _ in jobs]
+
+def generate_page_batch(jobs, profile=False):
+    # Runs in a worker process; profiling records and cache counters for
+    # this batch are sent back for the parent to merge. The inline memo and
+    # the caches live as long as the worker, so only their growth is
+    # reported.
+    jobs = [(src, template_path, dest_path, basepath, WORKER_OPTIONS) for src, template_path, dest_path, basepath, _ in jobs]
+    if profile:
+        profiling.start_profiling()
+    before = build_counters(WORKER_OPTIONS)
+    failures = generate_page_jobs(jobs)
+    snapshot = None
+    if profile:
+        snapshot = profiling.stop_profiling().snapshot()
+    counters = build_counters(WORKER_OPTIONS)
+    for name, (hits, misses) in before.items():
+        counters[name][0] -= hits
+        counters[name][1] -= misses
+    return failures, snapshot, counters
+
+def generate_pages(pages, template_path, basepath, jobs=1, options=None, counters=None):
+    if options is not None and options.memory_budget is not None:
+        return generate_pages_bounded(pages, template_path, basepath, jobs, options, counters)
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+    for _, dest_path in pages:
+        dest_dir = os.path.dirname(dest_path)
+        if dest_dir:
+            os.makedirs(dest_dir, exist_ok=True)
+    page_jobs = [(src, template_path, str(dst), basepath, options) for src, dst in pages]
+    if jobs == 1 or len(page_jobs) < 2:
+        failures = generate_page_jobs(page_jobs)
+        if counters is not None:
+            merge_counters(counters, build_counters(options))
+    else:
+        # Several batches per worker keeps the pool busy when page sizes vary
+        # without paying a round trip per page.
+        batch_size = max(1, len(page_jobs) // (jobs * 4))
+        batches = [worker_jobs(page_jobs[i:i + batch_size]) for i in range(0, len(page_jobs), batch_size)]
+        failures = []
+        profiler = profiling.ACTIVE
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=min(jobs, len(batches)), initializer=init_worker, initargs=(options,)) as executor:
+            results = executor.map(generate_page_batch, batches, [profiler is not None] * len(batches))
+            for batch_failures, snapshot, batch_counters in results:
+                failures.extend(batch_failures)
+                if snapshot is not None:
+                    profiler.merge(snapshot)
+                if counters is not None:
+                    merge_counters(counters, batch_counters)
+    if failures:
+        details = "\n".join(f"  {src}: {error}" for src, error in failures)
+        raise Exception(f"Failed to generate {len(failures)} page(s):\n{details}")
+
+# Pages per batch in generate_pages_bounded; each worker has up to two
+# batches queued.
+BOUNDED_BATCH_SIZE = 32
+
+def page_batches(pages, template_path, basepath, options, batch_size):
+    batch = []
+    for src, dst in pages:
+        dest_dir = os.path.dirname(dst)
+        if dest_dir:
+            os.makedirs(dest_dir, exist_ok=True)
+        batch.append((src, template_path, str(dst), basepath, options))
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def generate_pages_bounded(pages, template_path, basepath, jobs=1, options=None, counters=None, batch_size=BOUNDED_BATCH_SIZE):
+    # generate_pages for a stream of pages, such as iter_content. Pages are
+    # taken from the iterator only as workers free up, with at most two
+    # batches per worker in flight, so neither the job list nor pending
+    # results grow with the size of the site.
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+    failures = []
+    if jobs == 1:
+        for batch in page_batches(pages, template_path, basepath, options, batch_size):
+            failures.extend(generate_page_jobs(batch))
+        if counters is not None:
+            merge_counters(counters, build_counters(options))
+    else:
+        profiler = profiling.ACTIVE
+
+        def collect(done):
+            for future in done:
+                batch_failures, snapshot, batch_counters = future.result()
+                failures.extend(batch_failures)
+                if snapshot is not None:
+                    profiler.merge(snapshot)
+                if counters is not None:
+                    merge_counters(counters, batch_counters)
+
+        from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+        with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(options,)) as executor:
+            pending = set()
+            for batch in page_batches(pages, template_path, basepath, None, batch_size):
+                pending.add(executor.submit(generate_page_batch, batch, profiler is not None))
+                if len(pending) >= jobs * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+            collect(wait(pending).done)
+    if failures:
+        details = "\n".join(f"  {src}: {error}" for src, error in failures)
+        raise Exception(f"Failed to generate {len(failures)} page(s):\n{details}")
+
+def generate_pages_parallel(dir_path_content, template_path, dest_dir_path, basepath, jobs, options=None, counters=None, link="copy"):
+    pages, assets = discover_content(dir_path_content, dest_dir_path)
+    copy_files(assets, link)
+    generate_pages(pages, template_path, basepath, jobs, options, counters)
+
+def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath, options=None, link="copy"):
     for item in os.listdir(dir_path_content):
         print(f"Content item: {item}")
         src_item = os.path.join(dir_path_content, item)
         dst_item = os.path.join(dest_dir_path, item)
         if os.path.isfile(src_item):
-            dest_path = Path(dst_item).with_suffix(".html")
-            generate_page(src_item, template_path, dest_path, basepath)
+            dest_path = page_path(dst_item)
+            generate_page(src_item, template_path, dest_path, basepath, options=options)
+        elif os.path.isdir(src_item):
+            copy_directory(src_item, dst_item, link)
+            generate_pages_recursive(src_item, template_path, dst_item, basepath, options, link)
+
+MANIFEST_PATH = ".cache/manifest.json"
+# Where 'main.py merge' records the per-page timings that balance the next
+# --shard build (see shard.py).
+SHARDS_PATH = ".cache/shards.json"
+
+def hash_bytes(data):
+    import hashlib
+    return hashlib.sha256(data).hexdigest()
+
+def hash_file(path):
+    import hashlib
+    with profiling.stage("hash"):
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+def input_hash(path, hashes):
+    # hashes memoizes hash_file for one build.
+    digest = hashes.get(path)
+    if digest is None:
+        digest = hashes[path] = hash_file(path)
+    return digest
+
+def dependents(manifest, paths):
+    # Sources of the pages whose recorded inputs include any of paths.
+    paths = set(paths)
+    return [src for src, entry in manifest["pages"].items() if paths.intersection(entry.get("inputs", ()))]
+
+def load_manifest(manifest_path):
+    import json
+    empty = {"pages": {}, "assets": {}}
+    if not os.path.exists(manifest_path):
+        return empty
+    try:
+        with open(manifest_path, "r") as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        print(f"Manifest {manifest_path} unreadable, rebuilding everything...")
+        return empty
+    for section in empty:
+        manifest.setdefault(section, {})
+    return manifest
+
+def save_manifest(manifest_path, manifest):
+    import json
+    manifest_dir = os.path.dirname(manifest_path)
+    if manifest_dir:
+        os.makedirs(manifest_dir, exist_ok=True)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=1, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+def reset_manifest(manifest_path=MANIFEST_PATH):
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+def list_files(directory_src, directory_dst):
+    files = []
+    with os.scandir(directory_src) as entries:
+        entries = sorted(entries, key=lambda entry: entry.name)
+    for entry in entries:
+        dst_item = os.path.join(directory_dst, entry.name)
+        if entry.is_file():
+            files.append((entry.path, dst_item))
+        elif entry.is_dir():
+            files.extend(list_files(entry.path, dst_item))
+    return files
+
+def page_path(dst_item):
+    # The HTML output for a content file: "post.md" becomes "post.html".
+    return os.path.splitext(dst_item)[0] + ".html"
+
+def iter_content(dir_path_content, dest_dir_path):
+    # discover_content as a generator of (src, dst, is_page), walking one
+    # directory at a time instead of collecting the whole tree first.
+    stack = [(dir_path_content, dest_dir_path, False)]
+    while stack:
+        directory, dest_dir, nested = stack.pop()
+        subdirs = []
+        with os.scandir(directory) as entries:
+            entries = sorted(entries, key=lambda entry: entry.name)
+        for entry in entries:
+            dst_item = os.path.join(dest_dir, entry.name)
+            if entry.is_file():
+                if nested:
+                    yield entry.path, dst_item, False
+                yield entry.path, page_path(dst_item), True
+            elif entry.is_dir():
+                subdirs.append((entry.path, dst_item, True))
+        stack.extend(reversed(subdirs))
+
+def build_bounded(dir_path_content, template_path, dest_dir_path, basepath, jobs=1, link="copy", options=None, counters=None):
+    # A full build of the content tree that streams pages to
+    # generate_pages_bounded; files of content subdirectories are copied as
+    # they are found.
+    def pages():
+        for src, dst, is_page in iter_content(dir_path_content, dest_dir_path):
+            if is_page:
+                yield src, dst
+            else:
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                copy_file(src, dst, link)
+    generate_pages_bounded(pages(), template_path, basepath, jobs, options, counters)
+
+def source_outputs(src, static_dir, dir_path_content, dest_dir_path):
+    # The (source, destination) pages and assets that discover_content and
+    # list_files find for a single file, for builds given a list of changed
+    # files; a file outside both trees has none.
+    pages = []
+    assets = []
+    rel = os.path.relpath(src, dir_path_content)
+    if not rel.startswith(os.pardir):
+        dst = os.path.join(dest_dir_path, rel)
+        pages.append((src, page_path(dst)))
+        if os.sep in rel:
+            assets.append((src, dst))
+        return pages, assets
+    rel = os.path.relpath(src, static_dir)
+    if not rel.startswith(os.pardir):
+        assets.append((src, os.path.join(dest_dir_path, rel)))
+    return pages, assets
+
+def discover_content(dir_path_content, dest_dir_path):
+    # Mirrors generate_pages_recursive: every file becomes a page, and files
+    # inside content subdirectories are also copied next to their pages.
+    pages = []
+    assets = []
+    for item in sorted(os.listdir(dir_path_content)):
+        src_item = os.path.join(dir_path_content, item)
+        dst_item = os.path.join(dest_dir_path, item)
+        if os.path.isfile(src_item):
+            pages.append((src_item, page_path(dst_item)))
         elif os.path.isdir(src_item):
-            copy_directory(src_item, dst_item)
-            generate_pages_recursive(src_item, template_path, dst_item, basepath)
\ No newline at end of file
+            assets.extend(list_files(src_item, dst_item))
+            sub_pages, _ = discover_content(src_item, dst_item)
+            pages.extend(sub_pages)
+    return pages, assets
+
+def remove_output(path, dest_dir_path):
+    from compress import compressed_paths
+    if os.path.isfile(path):
+        os.remove(path)
+        print(f"{path} removed!")
+    for sibling in compressed_paths(path):
+        if os.path.isfile(sibling):
+            os.remove(sibling)
+    parent = os.path.dirname(path)
+    root = os.path.abspath(dest_dir_path)
+    while os.path.isdir(parent) and os.path.abspath(parent) != root and not os.listdir(parent):
+        os.rmdir(parent)
+        parent = os.path.dirname(parent)
+
+def asset_entry(src_item, dst_item, old_entry):
+    # Assets are compared by size and mtime rather than hashed, so large
+    # image trees cost one stat per file when nothing changed. A transformed
+    # copy keeps the source mtime, so the transform that wrote it is
+    # recorded too and a different one (or none) copies it again. Returns
+    # the manifest entry and whether dst_item needs copying.
+    src_stat = os.stat(src_item)
+    entry = {"size": src_stat.st_size, "mtime_ns": src_stat.st_mtime_ns, "output": dst_item}
+    transform = ASSET_TRANSFORMS.get(os.path.splitext(dst_item)[1])
+    if transform is not None:
+        entry["transform"] = transform.__name__
+    stale = old_entry.get("transform") != entry.get("transform") or not is_up_to_date(src_item, dst_item, src_stat)
+    return entry, stale
+
+# Each page records the inputs it was rendered from and their hashes: its
+# markdown, the template and every partial the template includes, plus the
+# settings that change its HTML and the {{ Date }} taken from the markdown's
+# mtime. A page is rendered again only when one of its own inputs changed,
+# and shared files are hashed once.
+
+def shared_inputs(template_path, basepath, options, hashes):
+    shared = {"basepath": basepath}
+    if options is not None and options.minify:
+        shared["minify"] = True
+    if options is not None and options.images is not None:
+        shared["images"] = options.images.fingerprint()
+    for path in load_template(template_path, basepath).dependencies:
+        shared[path] = input_hash(path, hashes)
+    return shared
+
+def page_entry(src_item, dst_item, shared, hashes):
+    inputs = dict(shared)
+    inputs[src_item] = input_hash(src_item, hashes)
+    inputs["date"] = date.fromtimestamp(os.path.getmtime(src_item)).isoformat()
+    return {"inputs": inputs, "output": dst_item}
+
+def build_incremental(static_dir, dir_path_content, template_path, dest_dir_path, basepath, manifest_path=MANIFEST_PATH, jobs=1, link="copy", options=None, counters=None, keep=()):
+    old_manifest = load_manifest(manifest_path)
+    new_manifest = {"pages": {}, "assets": {}}
+    os.makedirs(dest_dir_path, exist_ok=True)
+
+    pages, content_assets = discover_content(dir_path_content, dest_dir_path)
+    assets = list_files(static_dir, dest_dir_path) + content_assets
+
+    stale_assets = []
+    for src_item, dst_item in assets:
+        entry, stale = asset_entry(src_item, dst_item, old_manifest["assets"].get(src_item, {}))
+        if stale:
+            stale_assets.append((src_item, dst_item))
+        new_manifest["assets"][src_item] = entry
+    copy_files(stale_assets, link)
+    print(f"{len(stale_assets)} of {len(assets)} assets copied")
+
+    hashes = {}
+    shared = shared_inputs(template_path, basepath, options, hashes)
+    stale_pages = []
+    for src_item, dst_item in pages:
+        entry = page_entry(src_item, dst_item, shared, hashes)
+        if old_manifest["pages"].get(src_item) != entry or not os.path.exists(dst_item):
+            stale_pages.append((src_item, dst_item))
+        new_manifest["pages"][src_item] = entry
+    print(f"{len(stale_pages)} of {len(pages)} pages stale")
+    generate_pages(stale_pages, template_path, basepath, jobs, options, counters)
+    if options is not None and options.images is not None:
+        # Variants the image pipeline wrote before any page rendered.
+        new_manifest["images"] = options.images.manifest_entries()
+
+    # Sections owned by later steps of this build, such as generated
+    # listings, are kept for them to compare against. The outputs of any
+    # other section belong to a step that no longer runs and are removed.
+    for section in keep:
+        new_manifest.setdefault(section, old_manifest.get(section, {}))
+    outputs = set()
+    for section in new_manifest.values():
+        outputs.update(entry["output"] for entry in section.values())
+    for section in old_manifest:
+        for src_item, entry in old_manifest[section].items():
+            if src_item not in new_manifest.get(section, {}) and entry["output"] not in outputs:
+                remove_output(entry["output"], dest_dir_path)
+
+    save_manifest(manifest_path, new_manifest)
+    return new_manifest
+
+def update_incremental(manifest, changed, removed, static_dir, dir_path_content, template_path, dest_dir_path, basepath, link="copy", options=None):
+    # build_incremental for a known list of changed and removed files, such
+    # as the dev server's watcher reports: only those are stat'ed and hashed,
+    # and every other manifest entry is carried forward. A changed template
+    # or partial re-renders the pages that recorded it. The manifest is
+    # updated in place and not saved.
+    for src_item in removed:
+        for section in ("pages", "assets"):
+            entry = manifest[section].pop(src_item, None)
+            if entry is not None:
+                remove_output(entry["output"], dest_dir_path)
+
+    pages = []
+    stale_assets = []
+    # Changed files outside static/ and content/: the template and partials.
+    other = []
+    for src_item in changed:
+        src_pages, src_assets = source_outputs(src_item, static_dir, dir_path_content, dest_dir_path)
+        if not src_pages and not src_assets:
+            other.append(src_item)
+        pages.extend(src_pages)
+        for _, dst_item in src_assets:
+            entry, stale = asset_entry(src_item, dst_item, manifest["assets"].get(src_item, {}))
+            if stale:
+                stale_assets.append((src_item, dst_item))
+            manifest["assets"][src_item] = entry
+    copy_files(stale_assets, link)
+
+    hashes = {}
+    shared = shared_inputs(template_path, basepath, options, hashes)
+    stale_pages = []
+    for src_item, dst_item in pages:
+        entry = page_entry(src_item, dst_item, shared, hashes)
+        if manifest["pages"].get(src_item) != entry or not os.path.exists(dst_item):
+            stale_pages.append((src_item, dst_item))
+        manifest["pages"][src_item] = entry
+    # Pages that used a changed template file keep their recorded markdown
+    # hash and date, since their source did not change.
+    rendered = {src_item for src_item, _ in pages}
+    for src_item in dependents(manifest, other) if other else ():
+        if src_item in rendered:
+            continue
+        entry = manifest["pages"][src_item]
+        inputs = dict(shared)
+        for key in (src_item, "date"):
+            inputs[key] = entry["inputs"].get(key)
+        manifest["pages"][src_item] = {"inputs": inputs, "output": entry["output"]}
+        stale_pages.append((src_item, entry["output"]))
+    generate_pages(stale_pages, template_path, basepath, options=options)
+    return stale_pages
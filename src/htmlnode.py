@@ -1,4 +1,6 @@
 class HTMLNode():
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
@@ -10,16 +12,21 @@ class HTMLNode():
 
     def to_html(self):
         raise NotImplementedError
+
+    def iter_html(self):
+        yield self.to_html()
+
+    def write_html(self, fp):
+        fp.writelines(self.iter_html())
     
     def props_to_html(self):
-        return_str = ""
-        if self.props == None:
-            return return_str
-        for key in self.props:
-            return_str += f' {key}="{self.props[key]}"'
-        return return_str
+        if not self.props:
+            return ""
+        return "".join(f' {key}="{value}"' for key, value in self.props.items())
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         super().__init__(tag=tag, value=value, props=props)
 
@@ -34,22 +41,42 @@ class LeafNode(HTMLNode):
         return f"LeafNode({self.tag}, {self.value}, {self.props})"
     
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag=tag, children=children, props=props)
     
     def to_html(self):
+        return "".join(self.iter_html())
+
+    def iter_html(self):
+        # Walks the tree with an explicit stack so every piece is yielded once,
+        # rather than each level concatenating its children's strings again.
+        self.check()
+        yield f"<{self.tag}{self.props_to_html()}>"
+        stack = [(self, iter(self.children))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if isinstance(child, ParentNode):
+                    child.check()
+                    yield f"<{child.tag}{child.props_to_html()}>"
+                    stack.append((child, iter(child.children)))
+                    break
+                yield from child.iter_html()
+            else:
+                stack.pop()
+                yield f"</{node.tag}>"
+
+    def check(self):
         if not self.tag:
             raise ValueError("No tag found, parent node must include a tag")
         if not self.children:
             raise ValueError("No children found, parent node must have children")
-        return f"<{self.tag}{self.props_to_html()}>{self.get_children()}</{self.tag}>"
         
     def get_children(self):
-        return_str = ""
-        for node in self.children:
-            return_str += node.to_html()
-        return return_str
+        return "".join(chunk for node in self.children for chunk in node.iter_html())
         
     def __repr__(self):
         return f"ParentNode({self.tag}, children: {self.children}, {self.props})"
-    
\ No newline at end of file
+    
@@ -0,0 +1,239 @@
+import os
+import json
+import struct
+import hashlib
+import profiling
+
+from generate_pages import copy_file, hash_file, is_up_to_date, list_files, write_output
+from page_cache import cache_entries, evict_entries
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+IMAGE_CACHE_DIR = ".cache/images"
+IMAGE_CACHE_BYTES = 512 * 1024 * 1024
+# Source path -> [size, mtime_ns, sha256] as of the last build, in the
+# cache directory next to the derivatives.
+DIGESTS_FILE = "digests.json"
+IMAGE_WIDTHS = (480, 960, 1440)
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+# Part of every derivative's cache key; bump it when encoding settings change.
+ENCODER_VERSION = "1"
+SAVE_OPTIONS = {
+    ".png": {"optimize": True},
+    ".jpg": {"quality": 82, "optimize": True, "progressive": True},
+    ".jpeg": {"quality": 82, "optimize": True, "progressive": True},
+    ".webp": {"quality": 80, "method": 6},
+}
+
+class ImagePipeline():
+    # Responsive variants of the images under static/. process() runs once
+    # per build, before any page renders: it writes resized, re-encoded
+    # copies next to each image in docs/ and records the <img> attributes
+    # for its URL. Pages then only look those up (see resolve), so worker
+    # processes never touch image files.
+    #
+    # Derivatives are cached in cache_dir by source hash and width, so an
+    # unchanged image is never decoded again, and a source with the size and
+    # mtime of the last build is not even hashed. evict() trims the cache to
+    # max_bytes. Without Pillow only width, height and lazy loading are
+    # emitted.
+    def __init__(self, static_dir, dest_dir, basepath="/", widths=IMAGE_WIDTHS, cache_dir=IMAGE_CACHE_DIR, max_bytes=IMAGE_CACHE_BYTES):
+        self.static_dir = static_dir
+        self.dest_dir = dest_dir
+        self.basepath = basepath
+        self.widths = tuple(sorted(widths))
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.images = {}
+        # Variant output path -> source, recorded in the build manifest so
+        # the variants of a removed image are removed too.
+        self.variants = {}
+        self.known_digests = {}
+        self.digests = {}
+        self.encoded = 0
+        self.reused = 0
+        # fingerprint() of the current table; reset by process().
+        self.images_fingerprint = None
+
+    def __getstate__(self):
+        # Workers only need the lookup table.
+        return {"basepath": self.basepath, "images": self.images, "fingerprint": self.fingerprint()}
+
+    def __setstate__(self, state):
+        self.basepath = state["basepath"]
+        self.images = state["images"]
+        self.images_fingerprint = state["fingerprint"]
+
+    def fingerprint(self):
+        # Changes whenever any page's <img> attributes would, for cache keys
+        # of rendered pages and of the inline memo.
+        if self.images_fingerprint is None:
+            digest = hashlib.sha256(self.basepath.encode("utf-8"))
+            for url, props in sorted(self.images.items()):
+                digest.update(repr((url, sorted(props.items()))).encode("utf-8"))
+            self.images_fingerprint = digest.hexdigest()[:16]
+        return self.images_fingerprint
+
+    def resolve(self, url):
+        return self.images.get(url)
+
+    def manifest_entries(self):
+        return {output: {"source": src, "output": output} for output, src in sorted(self.variants.items())}
+
+    def load_digests(self):
+        path = os.path.join(self.cache_dir, DIGESTS_FILE)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, "r") as digests_file:
+                return json.load(digests_file)
+        except (OSError, ValueError):
+            return {}
+
+    def save_digests(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        write_output(os.path.join(self.cache_dir, DIGESTS_FILE), [json.dumps(self.digests, sort_keys=True)])
+
+    def source_digest(self, src):
+        # Like rsync's quick check: a source whose size and mtime match the
+        # last build keeps its recorded hash instead of being read again.
+        stat = os.stat(src)
+        known = self.known_digests.get(src)
+        if known is not None and known[:2] == [stat.st_size, stat.st_mtime_ns]:
+            digest = known[2]
+        else:
+            digest = hash_file(src)
+        self.digests[src] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+    def evict(self):
+        # Entries are not touched on use, since docs/ copies are compared to
+        # them by mtime; those of images seen this build count as the most
+        # recently used instead. Returns the size of the cache after
+        # trimming it.
+        used = {digest for _, _, digest in self.digests.values()}
+        entries = []
+        for mtime, size, path in cache_entries(self.cache_dir):
+            if os.path.basename(path).split("-", 1)[0] in used:
+                mtime = float("inf")
+            entries.append((mtime, size, path))
+        return evict_entries(entries, self.max_bytes)
+
+    def process(self):
+        if Image is None:
+            print("Pillow is not installed; images get width/height and lazy loading but no resized variants (pip install Pillow)")
+        with profiling.stage("images"):
+            self.known_digests = self.load_digests()
+            self.digests = {}
+            self.variants = {}
+            for src, dst in list_files(self.static_dir, self.dest_dir):
+                if not src.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                url = "/" + os.path.relpath(src, self.static_dir).replace(os.sep, "/")
+                props = self.process_image(src, dst)
+                if props:
+                    self.images[url] = props
+            if self.digests or self.known_digests:
+                self.save_digests()
+            self.images_fingerprint = None
+        print(f"Images: {len(self.images)} found, {self.encoded} variants encoded, {self.reused} reused from cache")
+        return self.images
+
+    def process_image(self, src, dst):
+        size = image_size(src)
+        if size is None:
+            return None
+        width, height = size
+        props = {"width": str(width), "height": str(height), "loading": "lazy", "decoding": "async"}
+        if Image is not None:
+            try:
+                variants = self.write_variants(src, dst, width)
+            except OSError as e:
+                # A header that parses but an image Pillow cannot decode.
+                print(f"{src}: no resized variants ({e})")
+                variants = []
+            if variants:
+                prefix = self.basepath.rstrip("/")
+                root = os.path.abspath(self.dest_dir)
+                props["srcset"] = ", ".join(
+                    f"{prefix}/{os.path.relpath(os.path.abspath(path), root).replace(os.sep, '/')} {variant_width}w"
+                    for path, variant_width in variants
+                )
+                props["sizes"] = f"(max-width: {width}px) 100vw, {width}px"
+        return props
+
+    def write_variants(self, src, dst, width):
+        # Every configured width below the original, plus the original width
+        # re-encoded. Returns (output path, width) pairs.
+        widths = [w for w in self.widths if w < width] + [width]
+        stem, ext = os.path.splitext(dst)
+        ext = ext.lower()
+        digest = self.source_digest(src)
+        variants = []
+        for variant_width in widths:
+            cached = os.path.join(self.cache_dir, digest[:2], f"{digest}-{ENCODER_VERSION}-{variant_width}{ext}")
+            if os.path.exists(cached):
+                self.reused += 1
+            else:
+                encode_variant(src, cached, variant_width, ext)
+                self.encoded += 1
+            output = f"{stem}-{variant_width}w{ext}"
+            if not is_up_to_date(cached, output):
+                os.makedirs(os.path.dirname(output), exist_ok=True)
+                copy_file(cached, output)
+            self.variants[output] = src
+            variants.append((output, variant_width))
+        return variants
+
+def encode_variant(src, dest, width, ext):
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp_path = f"{dest}.{os.getpid()}.tmp"
+    with Image.open(src) as image:
+        if image.width != width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.LANCZOS)
+        if ext in (".jpg", ".jpeg") and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.save(tmp_path, format=Image.registered_extensions()[ext], **SAVE_OPTIONS[ext])
+    os.replace(tmp_path, dest)
+
+def image_size(path):
+    # (width, height) from the file header; Pillow is only needed for
+    # formats other than PNG and JPEG.
+    with open(path, "rb") as image_file:
+        head = image_file.read(26)
+        if head.startswith(b"\x89PNG\r\n\x1a\n") and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        if head.startswith(b"\xff\xd8"):
+            image_file.seek(2)
+            return jpeg_size(image_file)
+    if Image is not None:
+        try:
+            with Image.open(path) as image:
+                return image.size
+        except OSError:
+            return None
+    return None
+
+def jpeg_size(image_file):
+    # Walks the JPEG segments up to the first start-of-frame marker.
+    while True:
+        marker = image_file.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        if marker[1] in (0xD8, 0x01) or 0xD0 <= marker[1] <= 0xD7:
+            continue
+        length_bytes = image_file.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack(">H", length_bytes)[0]
+        if 0xC0 <= marker[1] <= 0xCF and marker[1] not in (0xC4, 0xC8, 0xCC):
+            frame = image_file.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">HH", frame[1:5])
+            return width, height
+        image_file.seek(length - 2, os.SEEK_CUR)
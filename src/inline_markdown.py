@@ -2,6 +2,13 @@ import re
 
 from textnode import TextNode, TextType
 
+IMAGE_PATTERN = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+LINK_PATTERN = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+# Matches the bracket part of both images and links; a "!" just before the
+# match makes it an image. Starting on a literal "[" lets the regex engine
+# skip ahead quickly, unlike a lookbehind or an alternation.
+BRACKET_PATTERN = re.compile(r"\[([^\[\]]*)\]\(([^\(\)]*)\)")
+
 #node = TextNode("This is text with a `code block` word", TextType.TEXT)
 #new_nodes = split_nodes_delimiter([node], "`", TextType.CODE)
 #return = 
@@ -26,63 +33,128 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
     return new_list
 
 def split_nodes_image(old_nodes):
-    new_list = []
-    for node in old_nodes:
-        if node.text_type != TextType.TEXT:
-            new_list.append(node)
-            continue
-        image_text = extract_markdown_images(node.text)
-        current_text_to_process = node.text
-        for image in image_text:
-            split_node_text = current_text_to_process.split(f"![{image[0]}]({image[1]})", 1)
-            if split_node_text[0] == '':
-                new_list.append(TextNode(image[0], TextType.IMAGE, image[1]))
-            else:
-                new_list.append(TextNode(split_node_text[0], TextType.TEXT))
-                new_list.append(TextNode(image[0], TextType.IMAGE, image[1]))
-            current_text_to_process = split_node_text[1]
-        if current_text_to_process != "":
-            new_list.append(TextNode(current_text_to_process, TextType.TEXT))
-    return new_list
+    return split_nodes_pattern(old_nodes, IMAGE_PATTERN, TextType.IMAGE)
 
 def split_nodes_link(old_nodes):
+    return split_nodes_pattern(old_nodes, LINK_PATTERN, TextType.LINK)
+
+def split_nodes_pattern(old_nodes, pattern, text_type):
     new_list = []
     for node in old_nodes:
         if node.text_type != TextType.TEXT:
             new_list.append(node)
             continue
-        link_text = extract_markdown_links(node.text)
-        current_text_to_process = node.text
-        for link in link_text:
-            split_node_text = current_text_to_process.split(f"[{link[0]}]({link[1]})", 1)
-            if split_node_text[0] == '':
-                new_list.append(TextNode(link[0], TextType.LINK, link[1]))
-            else:
-                new_list.append(TextNode(split_node_text[0], TextType.TEXT))
-                new_list.append(TextNode(link[0], TextType.LINK, link[1]))
-            current_text_to_process = split_node_text[1]
-        if current_text_to_process != "":
-            new_list.append(TextNode(current_text_to_process, TextType.TEXT))
+        append_matches(new_list, node.text, pattern, text_type)
     return new_list
 
+def append_matches(new_list, text, pattern, text_type):
+    # Walks the match positions directly instead of re-splitting the text
+    # for every match, so long paragraphs with many links stay linear.
+    last_end = 0
+    for match in pattern.finditer(text):
+        start = match.start()
+        if start > last_end:
+            new_list.append(TextNode(text[last_end:start], TextType.TEXT))
+        new_list.append(TextNode(match.group(1), text_type, match.group(2)))
+        last_end = match.end()
+    if last_end < len(text):
+        new_list.append(TextNode(text[last_end:], TextType.TEXT))
+
+def append_images_and_links(new_list, text):
+    last_end = 0
+    for match in BRACKET_PATTERN.finditer(text):
+        start = match.start()
+        if start > 0 and text[start - 1] == "!":
+            start -= 1
+            text_type = TextType.IMAGE
+        else:
+            text_type = TextType.LINK
+        if start > last_end:
+            new_list.append(TextNode(text[last_end:start], TextType.TEXT))
+        new_list.append(TextNode(match.group(1), text_type, match.group(2)))
+        last_end = match.end()
+    if last_end < len(text):
+        new_list.append(TextNode(text[last_end:], TextType.TEXT))
+
 def text_to_textnodes(text):
-    text_node = [TextNode(text, TextType.TEXT)]
-    text_node = split_nodes_delimiter(text_node, "**", TextType.BOLD)
-    text_node = split_nodes_delimiter(text_node, "_", TextType.ITALIC)
-    text_node = split_nodes_delimiter(text_node, "`", TextType.CODE)
-    text_node = split_nodes_image(text_node)
-    text_node = split_nodes_link(text_node)
-    return text_node
+    return tokenize_inline(text)
+
+# Single left-to-right scan producing the same nodes as chaining
+# split_nodes_delimiter for "**", "_" and "`", then split_nodes_image and
+# split_nodes_link. That chain gives "**" priority over "_" over "`", and the
+# contents of bold, italic and code spans are never split further, so:
+#   - a bold span runs to the next "**" whatever it contains,
+#   - an italic span must close before the next "**",
+#   - a code span must close before the next "**" or "_",
+#   - images and links are only searched for in plain text between spans.
+# Unclosed delimiters raise the same errors, with the same precedence.
+def tokenize_inline(text):
+    if text.count("**") % 2 != 0:
+        raise Exception("Invalid Markdown syntax: no matching closing delimiter for '**'")
+    nodes = []
+    length = len(text)
+    code_error = False
+    # Position of the next "**", "_" and "`" at or after pos, refreshed only
+    # once pos moves past them so each character is searched a bounded
+    # number of times.
+    next_bold = next_italic = next_code = -1
+    pos = 0
+    while True:
+        if next_bold < pos:
+            next_bold = text.find("**", pos)
+            if next_bold == -1:
+                next_bold = length
+        if next_italic < pos:
+            next_italic = text.find("_", pos)
+            if next_italic == -1:
+                next_italic = length
+        if next_code < pos:
+            next_code = text.find("`", pos)
+            if next_code == -1:
+                next_code = length
+        end = min(next_bold, next_italic, next_code)
+        if end > pos:
+            append_images_and_links(nodes, text[pos:end])
+        if end == length:
+            break
+        if end == next_bold:
+            start = end + 2
+            close = text.find("**", start)
+            text_type = TextType.BOLD
+            pos = close + 2
+        elif end == next_italic:
+            start = end + 1
+            close = text.find("_", start)
+            if close == -1 or close >= next_bold:
+                raise Exception("Invalid Markdown syntax: no matching closing delimiter for '_'")
+            text_type = TextType.ITALIC
+            pos = close + 1
+        else:
+            start = end + 1
+            close = text.find("`", start, min(next_bold, next_italic))
+            if close == -1:
+                # The chain reports unmatched "_" before unmatched "`", so
+                # keep scanning as plain text and only fail at the end.
+                code_error = True
+                pos = start
+                continue
+            text_type = TextType.CODE
+            pos = close + 1
+        if close > start:
+            nodes.append(TextNode(text[start:close], text_type))
+    if code_error:
+        raise Exception("Invalid Markdown syntax: no matching closing delimiter for '`'")
+    return nodes
 
 #text = "This is text with a ![rick roll](https://i.imgur.com/aKaOqIh.gif) and ![obi wan](https://i.imgur.com/fJRm4Vk.jpeg)"
 #print(extract_markdown_images(text))
 # [("rick roll", "https://i.imgur.com/aKaOqIh.gif"), ("obi wan", "https://i.imgur.com/fJRm4Vk.jpeg")]
 def extract_markdown_images(text):
-    return re.findall(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    return IMAGE_PATTERN.findall(text)
 
 #text = "This is text with a link [to boot dev](https://www.boot.dev) and [to youtube](https://www.youtube.com/@bootdotdev)"
 #print(extract_markdown_links(text))
 # [("to boot dev", "https://www.boot.dev"), ("to youtube", "https://www.youtube.com/@bootdotdev")]
 def extract_markdown_links(text):
-    return re.findall(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    return LINK_PATTERN.findall(text)
 
@@ -0,0 +1,135 @@
+import os
+import re
+import posixpath
+import profiling
+
+from urllib.parse import unquote, urlsplit
+from textnode import TextType
+
+# A site-absolute path that is already normalized: no "." or ".." segments,
+# empty segments, escapes, query or fragment. Most internal links look like
+# this and skip urlsplit and normpath.
+PLAIN_PATH_PATTERN = re.compile(r"(?:/[^/?#%.][^/?#%]*)*/?")
+
+class PageLinks():
+    # Link and image targets of one page, taken from the TextNodes of each
+    # block while the site index reads the markdown, so code blocks are
+    # skipped and links and images are told apart.
+    __slots__ = ("links", "images")
+
+    def __init__(self):
+        self.links = []
+        self.images = []
+
+    def add_block(self, block):
+        # block comes from block_lines_to_textnodes; code blocks and invalid
+        # markdown have no nodes.
+        _, tokenized = block
+        for _, nodes in tokenized:
+            for node in nodes or ():
+                if node.text_type is TextType.LINK:
+                    self.links.append(node.url)
+                elif node.text_type is TextType.IMAGE:
+                    self.images.append(node.url)
+
+class LinkReport():
+    def __init__(self, dangling, orphans, unused_images, checked):
+        self.dangling = dangling
+        self.orphans = orphans
+        self.unused_images = unused_images
+        self.checked = checked
+
+    def format(self, limit=20):
+        lines = [f"Checked {self.checked} internal links: {len(self.dangling)} broken, {len(self.orphans)} orphan pages, {len(self.unused_images)} unused images"]
+        sections = (
+            ("Broken links", [f"{src}: {target}" for src, target in self.dangling]),
+            ("Orphan pages", self.orphans),
+            ("Unused images", self.unused_images),
+        )
+        for title, entries in sections:
+            if not entries:
+                continue
+            lines.append(f"{title}:")
+            lines.extend(f"  {entry}" for entry in entries[:limit])
+            if len(entries) > limit:
+                lines.append(f"  ... and {len(entries) - limit} more")
+        return "\n".join(lines)
+
+class LinkGraph():
+    # Outgoing links and images of every page, keyed by page URL. check()
+    # resolves the internal ones against a set of the files in docs/, so
+    # each target costs a few hash lookups however large the site is.
+    def __init__(self):
+        self.pages = {}
+
+    def add_page(self, info, page_links):
+        self.pages[info.url] = (info.src, info.dest, page_links)
+
+    def check(self, dest_root, images=()):
+        # images are the output paths of images that pages should use.
+        with profiling.stage("links"):
+            files = output_files(dest_root)
+            page_urls = {site_path(dest, dest_root): url for url, (_, dest, _) in self.pages.items()}
+            inbound = dict.fromkeys(self.pages, 0)
+            used = set()
+            dangling = []
+            checked = 0
+            for url, (src, _, page_links) in self.pages.items():
+                for target in page_links.links + page_links.images:
+                    path = resolve_target(url, target)
+                    if path is None:
+                        continue
+                    checked += 1
+                    found = find_file(path, files)
+                    if found is None:
+                        dangling.append((src, target))
+                        continue
+                    used.add(found)
+                    linked = page_urls.get(found)
+                    if linked is not None and linked != url:
+                        inbound[linked] += 1
+            orphans = sorted(url for url, count in inbound.items() if count == 0 and url != "/")
+            unused_images = sorted(path for path in (site_path(image, dest_root) for image in images) if path not in used)
+        return LinkReport(dangling, orphans, unused_images, checked)
+
+def site_path(path, dest_root):
+    return "/" + os.path.relpath(path, dest_root).replace(os.sep, "/")
+
+def output_files(dest_root):
+    files = set()
+    for root, _, names in os.walk(dest_root):
+        for name in names:
+            files.add(site_path(os.path.join(root, name), dest_root))
+    return files
+
+def resolve_target(page_url, target):
+    # Site path of an internal target, or None for external URLs, other
+    # schemes and same-page fragments.
+    if target.startswith("/") and PLAIN_PATH_PATTERN.fullmatch(target):
+        return target
+    parts = urlsplit(target)
+    if parts.scheme or parts.netloc or not parts.path:
+        return None
+    path = unquote(parts.path)
+    if not path.startswith("/"):
+        base = page_url if page_url.endswith("/") else posixpath.dirname(page_url) + "/"
+        path = base + path
+    trailing = path.endswith("/")
+    path = posixpath.normpath(path)
+    if path.startswith("//"):
+        path = path[1:]
+    if trailing and path != "/":
+        path += "/"
+    return path
+
+def find_file(path, files):
+    # The file a static server would answer path with: directories serve
+    # their index.html, and "/about" may be "about.html".
+    if path.endswith("/"):
+        candidates = (path + "index.html",)
+    else:
+        candidates = (path, path + "/index.html", path + ".html")
+    for candidate in candidates:
+        if candidate in files:
+            return candidate
+    return None
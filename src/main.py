@@ -1,18 +1,235 @@
+import os
 import sys
+import argparse
+import profiling
 
 from generate_pages import (
     prepare_directory,
     copy_directory,
-    generate_pages_recursive
+    generate_pages_recursive,
+    generate_pages_parallel,
+    build_bounded,
+    build_incremental,
+    reset_manifest,
+    save_manifest,
+    discover_content,
+    list_files,
+    build_counters,
+    merge_counters,
+    format_counters,
+    set_asset_transforms,
+    PageOptions,
+    MANIFEST_PATH,
+    SHARDS_PATH
 )
 
+# Feature modules are imported where their flags are handled, so a plain
+# build or --help does not pay for gzip, multiprocessing, hashing or
+# optional dependency lookups it never uses (see benchmarks/bench_startup.py).
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Build the static site from content/ into docs/. Use 'main.py serve --watch' for the dev server.")
+    parser.add_argument("basepath", nargs="?", default="/", help="URL prefix the site is served under")
+    parser.add_argument("--incremental", action="store_true", help="only rebuild pages and assets whose inputs changed")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="render pages in N worker processes (0 = one per CPU)")
+    parser.add_argument("--io-threads", type=int, default=0, metavar="N", help="prefetch markdown and write HTML on N threads while pages render (0 = off)")
+    parser.add_argument("--shard", metavar="I/N", help="render only slice I of N of the site into --shard-dir; combine the slices with 'main.py merge'")
+    parser.add_argument("--shard-dir", metavar="DIR", help="output directory for --shard (default shards/I)")
+    parser.add_argument("--shard-timings", default=SHARDS_PATH, metavar="PATH", help="page timings from a previous merge, used to balance --shard (default %(default)s)")
+    parser.add_argument("--link", choices=["copy", "hard", "reflink"], default="copy", help="how static files are placed in docs/ (hard/reflink fall back to copying)")
+    parser.add_argument("--cache", action="store_true", help="reuse rendered page bodies from .cache/pages when the markdown is unchanged")
+    parser.add_argument("--cache-size", type=int, default=512, metavar="MB", help="size limit of the page cache (default 512)")
+    parser.add_argument("--listings", action="store_true", help="generate listing pages for directories without an index.md, and tag pages")
+    parser.add_argument("--sitemap", metavar="URL", help="write docs/sitemap.xml with page URLs under this site origin")
+    parser.add_argument("--search", nargs="?", const="/", metavar="PREFIX", help="write a search index of the pages under PREFIX (default all, e.g. /blog/) to docs/search")
+    parser.add_argument("--images", action="store_true", help="add width/height, lazy loading and (with Pillow) resized srcset variants to images from static/")
+    parser.add_argument("--image-widths", metavar="W,W,...", help="variant widths for --images (default 480,960,1440)")
+    parser.add_argument("--image-cache-size", type=int, default=512, metavar="MB", help="size limit of the image variant cache in .cache/images (default 512)")
+    parser.add_argument("--minify", action="store_true", help="collapse whitespace in HTML outside <pre>/<code> and minify CSS")
+    parser.add_argument("--check-links", nargs="?", const="warn", choices=["warn", "error"], help="report broken internal links, orphan pages and unused images ('error' fails the build on broken links)")
+    parser.add_argument("--compress", metavar="FORMATS", help="write precompressed siblings, e.g. 'gzip,br', for HTML and CSS in docs/")
+    parser.add_argument("--compress-assets", action="store_true", help="with --compress, also compress other text assets (js, json, svg, xml, txt)")
+    parser.add_argument("--compress-cache-size", type=int, default=256, metavar="MB", help="size limit of the compressed file cache in .cache/compressed (default 256)")
+    parser.add_argument("--memory-budget", type=int, metavar="MB", help="keep each build process under MB of resident memory: stream pages through a bounded queue, release caches when over, and report peak RSS")
+    parser.add_argument("--memo-inline", type=int, default=0, metavar="N", help="remember the HTML of up to N repeated inline fragments per process (0 = off)")
+    parser.add_argument("--profile", action="store_true", help="report time spent per pipeline stage and the slowest pages")
+    parser.add_argument("--profile-top", type=int, default=10, metavar="N", help="number of slowest pages to list (default 10)")
+    parser.add_argument("--profile-folded", metavar="PATH", help="write stage timings as collapsed stacks for flamegraph tools")
+    parser.add_argument("--cprofile", metavar="PATH", help="run the build under cProfile and dump the stats to PATH")
+    return parser.parse_args(argv)
+
+def process_images(images, options):
+    # Runs after static/ is synced and before any page renders; the page
+    # cache key changes with the image attributes.
+    images.process()
+    options.images = images
+    if options.cache is not None:
+        options.cache.salt = images.fingerprint()
+
+def build_shard_only(args, options):
+    # Steps that need the whole site (the index, listings, search, link
+    # checks, images) do not fit a slice of it.
+    site_wide = [flag for flag, value in (
+        ("--incremental", args.incremental), ("--listings", args.listings), ("--sitemap", args.sitemap),
+        ("--search", args.search), ("--images", args.images), ("--check-links", args.check_links),
+    ) if value]
+    if site_wide:
+        raise ValueError(f"--shard cannot be combined with {', '.join(site_wide)}")
+    from shard import build_shard, parse_shard
+    index, count = parse_shard(args.shard)
+    shard_dir = args.shard_dir or os.path.join("shards", str(index))
+    counters = {}
+    build_shard("static", "content/", "template.html", shard_dir, args.basepath, index, count, args.shard_timings, args.jobs, args.link, options, counters)
+    if options.compressor is not None:
+        compressor = options.compressor
+        compressor.submit_tree(shard_dir)
+        failures = compressor.close()
+        compressor.evict()
+        if failures:
+            details = "\n".join(f"  {path}: {error}" for path, error in failures)
+            raise Exception(f"Failed to compress {len(failures)} file(s):\n{details}")
+    if options.cache is not None:
+        options.cache.evict()
+    if counters:
+        print(format_counters(counters))
+    if options.memory_budget is not None:
+        from memory import rss_report
+        print(rss_report(options.memory_budget, args.jobs != 1))
+
+def build(args):
+    basepath = args.basepath
+    options = PageOptions(inline_memo_size=args.memo_inline, io_threads=args.io_threads, minify=args.minify)
+    if args.minify:
+        from minify import minify_css
+        set_asset_transforms({".css": minify_css})
+    if args.memory_budget:
+        from memory import MemoryBudget
+        options.memory_budget = MemoryBudget(args.memory_budget * 1024 * 1024)
+    if args.cache:
+        from page_cache import PageCache
+        options.cache = PageCache(max_bytes=args.cache_size * 1024 * 1024)
+    if args.compress:
+        from compress import ASSET_EXTENSIONS, PAGE_EXTENSIONS, Compressor
+        formats = [name.strip() for name in args.compress.split(",") if name.strip()]
+        unknown = [name for name in formats if name not in ("gzip", "br")]
+        if unknown:
+            raise ValueError(f"Unknown compression format(s): {', '.join(unknown)}")
+        extensions = PAGE_EXTENSIONS + ASSET_EXTENSIONS if args.compress_assets else PAGE_EXTENSIONS
+        options.compressor = Compressor(formats, extensions, max_bytes=args.compress_cache_size * 1024 * 1024)
+    if args.shard:
+        build_shard_only(args, options)
+        return
+    images = None
+    if args.images:
+        from images import IMAGE_WIDTHS, ImagePipeline
+        widths = [int(width) for width in args.image_widths.split(",") if width.strip()] if args.image_widths else IMAGE_WIDTHS
+        images = ImagePipeline("static", "docs/", basepath, widths, max_bytes=args.image_cache_size * 1024 * 1024)
+    search = None
+    if args.search:
+        from search_index import SearchIndex
+        search = SearchIndex(args.search)
+    links = None
+    if args.check_links:
+        from link_check import LinkGraph
+        links = LinkGraph()
+    if args.listings or args.sitemap or search is not None or links is not None:
+        from site_index import build_index, write_listings, write_sitemap
+        pages, content_assets = discover_content("content/", "docs/")
+        options.index = build_index(pages, "docs/", search, links)
+    counters = {}
+    manifest = None
+    if args.incremental:
+        if images is not None:
+            os.makedirs("docs", exist_ok=True)
+            process_images(images, options)
+        # Outputs of the site-wide steps below are recorded in sections of
+        # their own, kept while the step runs and removed once it does not.
+        keep = [section for section, wanted in (("generated", args.listings), ("sitemap", args.sitemap), ("search", search is not None)) if wanted]
+        manifest = build_incremental("static", "content/", "template.html", "docs/", basepath, jobs=args.jobs, link=args.link, options=options, counters=counters, keep=keep)
+    else:
+        reset_manifest()
+        prepare_directory("docs")
+        copy_directory("static", "docs", args.link)
+        if images is not None:
+            process_images(images, options)
+        if options.memory_budget is not None:
+            build_bounded("content/", "template.html", "docs/", basepath, args.jobs, args.link, options, counters)
+        elif args.jobs == 1 and not args.io_threads:
+            generate_pages_recursive("content/", "template.html", "docs/", basepath, options, args.link)
+            merge_counters(counters, build_counters(options))
+        else:
+            generate_pages_parallel("content/", "template.html", "docs/", basepath, args.jobs, options, counters, args.link)
+    if options.index is not None:
+        generated = []
+        if args.listings:
+            records = manifest.setdefault("generated", {}) if manifest is not None else None
+            generated = write_listings(options.index, "template.html", basepath, args.minify, records)
+        if args.sitemap:
+            sitemap_path = write_sitemap(options.index, args.sitemap, basepath, generated)
+            if manifest is not None:
+                manifest["sitemap"] = {sitemap_path: {"output": sitemap_path}}
+        if search is not None:
+            search.write("docs/", basepath)
+            if manifest is not None:
+                from search_index import SEARCH_DIR
+                search_dir = os.path.join("docs/", SEARCH_DIR)
+                manifest["search"] = {src: {"output": src} for src, _ in list_files(search_dir, search_dir)}
+        if manifest is not None:
+            save_manifest(MANIFEST_PATH, manifest)
+        if links is not None:
+            from images import IMAGE_EXTENSIONS
+            image_files = [dst for _, dst in list_files("static", "docs/") + content_assets if dst.lower().endswith(IMAGE_EXTENSIONS)]
+            report = links.check("docs/", image_files)
+            print(report.format())
+            if report.dangling and args.check_links == "error":
+                raise Exception(f"{len(report.dangling)} broken link(s)")
+    if options.compressor is not None:
+        # Static files and generated listings were not compressed as they
+        # were written; pages already handled in this process are skipped.
+        compressor = options.compressor
+        reused, compressed = compressor.reused, compressor.compressed
+        compressor.submit_tree("docs/")
+        failures = compressor.close()
+        compressor.evict()
+        merge_counters(counters, {"compress cache": [compressor.reused - reused, compressor.compressed - compressed]})
+        if failures:
+            details = "\n".join(f"  {path}: {error}" for path, error in failures)
+            raise Exception(f"Failed to compress {len(failures)} file(s):\n{details}")
+    if options.cache is not None:
+        options.cache.evict()
+    if images is not None:
+        images.evict()
+    if counters:
+        print(format_counters(counters))
+    if options.memory_budget is not None:
+        from memory import rss_report
+        print(rss_report(options.memory_budget, args.jobs != 1))
+
 def main():
-    if len(sys.argv) > 1:
-        basepath = sys.argv[1]
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        import serve
+        serve.main(sys.argv[2:])
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "merge":
+        import shard
+        shard.main(sys.argv[2:])
+        return
+    args = parse_args(sys.argv[1:])
+    if args.profile or args.profile_folded:
+        profiling.start_profiling()
+    if args.cprofile:
+        import cProfile
+        cProfile.runctx("build(args)", globals(), {"args": args}, args.cprofile)
     else:
-        basepath = "/"
-    prepare_directory("docs")
-    copy_directory("static", "docs")
-    generate_pages_recursive("content/", "template.html", "docs/", basepath)
+        build(args)
+    profiler = profiling.stop_profiling()
+    if profiler is not None:
+        print(profiler.report(args.profile_top))
+        if not args.memory_budget:
+            from memory import rss_report
+            print(rss_report(workers=args.jobs != 1))
+        if args.profile_folded:
+            profiler.write_folded(args.profile_folded)
 
-main()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
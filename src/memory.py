@@ -0,0 +1,92 @@
+import gc
+import os
+import sys
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import block_markdown
+
+def current_rss():
+    # Resident set size of this process in bytes, or None where /proc is
+    # not available.
+    try:
+        with open("/proc/self/statm", "r") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+def peak_rss(children=False):
+    # Highest resident set size of this process, or of the largest worker
+    # process it waited for, in bytes; None without the resource module.
+    if resource is None:
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def format_bytes(size):
+    return f"{size / (1024 * 1024):.1f} MB"
+
+class MemoryBudget():
+    # A per-process limit on resident memory. check() runs between pages;
+    # over the limit it drops half of the inline memo and runs the garbage
+    # collector. The page queue in front of it is bounded separately (see
+    # generate_pages_bounded), so memory does not grow with the site.
+    def __init__(self, limit):
+        self.limit = limit
+        self.releases = 0
+        self.checks = 0
+        self.next_release = 0
+        self.backoff = 1
+        self.warned = False
+
+    def __getstate__(self):
+        # Each worker process counts its own releases.
+        return {"limit": self.limit}
+
+    def __setstate__(self, state):
+        self.__init__(state["limit"])
+
+    def over(self):
+        rss = current_rss()
+        return rss is not None and rss > self.limit
+
+    def check(self):
+        self.checks += 1
+        if self.checks < self.next_release or not self.over():
+            return False
+        self.release()
+        if self.over():
+            # What holds the memory is not a cache; back off instead of
+            # collecting after every page.
+            if not self.warned:
+                print(f"Memory still over the {format_bytes(self.limit)} budget after releasing caches")
+                self.warned = True
+            self.backoff = min(self.backoff * 2, 1024)
+        else:
+            self.backoff = 1
+        self.next_release = self.checks + self.backoff
+        return True
+
+    def release(self):
+        self.releases += 1
+        memo = block_markdown.INLINE_MEMO
+        if memo is not None:
+            memo.shrink(len(memo.entries) // 2)
+        gc.collect()
+
+def rss_report(budget=None, workers=False):
+    peak = peak_rss()
+    if peak is None:
+        return "Peak RSS: not available on this platform"
+    report = f"Peak RSS: {format_bytes(peak)}"
+    worker_peak = peak_rss(children=True) if workers else None
+    if worker_peak:
+        report += f", largest worker {format_bytes(worker_peak)}"
+    if budget is not None:
+        report += f" (budget {format_bytes(budget.limit)} per process, caches released {budget.releases} times here)"
+    return report
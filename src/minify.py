@@ -0,0 +1,151 @@
+import re
+
+# Whitespace inside these elements is kept as is. Code blocks come out of
+# block_to_htmlnode as <pre><code>, and inline code as <code>.
+PRESERVE_TAGS = {"pre", "code", "textarea", "script", "style"}
+# Whitespace next to these tags never renders, so it is dropped rather than
+# collapsed to a single space.
+BLOCK_TAGS = {
+    "!doctype", "html", "head", "body", "title", "meta", "link", "base",
+    "script", "style", "div", "p", "ul", "ol", "li", "h1", "h2", "h3", "h4",
+    "h5", "h6", "blockquote", "pre", "article", "section", "header",
+    "footer", "nav", "main", "aside", "figure", "figcaption", "table",
+    "thead", "tbody", "tr", "td", "th", "hr", "br", "form",
+}
+TAG_NAME_PATTERN = re.compile(r"<(/?)([A-Za-z!][\w!-]*)")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+def collapse(text):
+    return WHITESPACE_PATTERN.sub(" ", text)
+
+def minify_html_chunks(chunks):
+    # Collapses whitespace in a stream of HTML chunks without joining them:
+    # only an unfinished tag or a trailing run of whitespace is carried
+    # over to the next chunk. Text inside PRESERVE_TAGS passes through
+    # untouched, up to its closing tag.
+    buffer = ""
+    preserve = None     # closing tag ("</pre") that ends preserved text
+    after_block = True  # the text so far follows a block tag
+    text_started = False
+    for chunk in chunks:
+        buffer += chunk
+        out = []
+        pos = 0
+        while True:
+            if preserve is not None:
+                end = buffer.lower().find(preserve, pos)
+                if end == -1:
+                    # Keep enough to match a closing tag split across chunks.
+                    keep = max(pos, len(buffer) - len(preserve))
+                    out.append(buffer[pos:keep])
+                    pos = keep
+                    break
+                out.append(buffer[pos:end])
+                pos = end
+                preserve = None
+                text_started = True
+                after_block = False
+                continue
+            lt = find_tag_start(buffer, pos)
+            if lt == -1:
+                text = buffer[pos:]
+                head = text.rstrip()
+                if head:
+                    out.append(text_piece(head, after_block and not text_started, False))
+                    text_started = True
+                pos += len(head)
+                break
+            gt = tag_end(buffer, lt)
+            if gt == -1:
+                text = buffer[pos:lt]
+                head = text.rstrip()
+                if head:
+                    out.append(text_piece(head, after_block and not text_started, False))
+                    text_started = True
+                pos += len(head)
+                break
+            tag = buffer[lt:gt]
+            closing, name = tag_name(tag)
+            block = name in BLOCK_TAGS
+            out.append(text_piece(buffer[pos:lt], after_block and not text_started, block))
+            out.append(tag)
+            pos = gt
+            after_block = block
+            text_started = False
+            if not closing and name in PRESERVE_TAGS and not tag.endswith("/>"):
+                preserve = f"</{name}"
+        buffer = buffer[pos:]
+        piece = "".join(out)
+        if piece:
+            yield piece
+    if buffer:
+        if preserve is not None:
+            yield buffer
+        else:
+            yield text_piece(buffer, after_block and not text_started, True)
+
+def find_tag_start(text, pos):
+    # "<" followed by a letter, "/" or "!"; a lone "<" is text.
+    while True:
+        lt = text.find("<", pos)
+        if lt == -1 or lt + 1 >= len(text):
+            return lt
+        if text[lt + 1].isalpha() or text[lt + 1] in "/!":
+            return lt
+        pos = lt + 1
+
+def tag_end(text, lt):
+    # Index just past the tag starting at lt, or -1 if it is not complete.
+    if text.startswith("<!--", lt):
+        end = text.find("-->", lt + 4)
+        return -1 if end == -1 else end + 3
+    if lt + 1 >= len(text):
+        return -1
+    end = text.find(">", lt)
+    return -1 if end == -1 else end + 1
+
+def tag_name(tag):
+    match = TAG_NAME_PATTERN.match(tag)
+    if match is None:
+        return False, ""
+    return bool(match.group(1)), match.group(2).lower()
+
+def text_piece(text, strip_start, strip_end):
+    text = collapse(text)
+    if strip_start:
+        text = text.lstrip(" ")
+    if strip_end:
+        text = text.rstrip(" ")
+    return text
+
+CSS_TOKEN_PATTERN = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|(/\*.*?\*/)|(\s+)|([{};,>])""", re.S)
+
+def minify_css(css):
+    # Drops comments, collapses whitespace and removes it around braces,
+    # semicolons, commas and child combinators. Strings are left alone, and
+    # so is a space before ":" since "a :hover" and "a:hover" differ.
+    out = []
+    pos = 0
+    for match in CSS_TOKEN_PATTERN.finditer(css):
+        if match.start() > pos:
+            out.append(css[pos:match.start()])
+        pos = match.end()
+        string, comment, space, punctuation = match.groups()
+        if string is not None:
+            out.append(string)
+        elif space is not None:
+            out.append(" ")
+        elif punctuation is not None:
+            while out and out[-1] == " ":
+                out.pop()
+            if punctuation == "}" and out and out[-1] == ";":
+                out.pop()
+            out.append(punctuation)
+    out.append(css[pos:])
+    result = []
+    for piece in out:
+        # A space right after punctuation or a colon is never needed.
+        if piece == " " and (not result or result[-1][-1:] in "{};,>: "):
+            continue
+        result.append(piece)
+    return "".join(result).strip()
@@ -0,0 +1,141 @@
+import os
+import json
+import hashlib
+
+CACHE_DIR = ".cache/pages"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Modules whose code decides what a page's body looks like; their source is
+# part of every cache key so a parser change never serves stale HTML.
+PARSER_MODULES = ("block_markdown.py", "inline_markdown.py", "textnode.py", "htmlnode.py")
+PARSER_VERSION = None
+
+def parser_version():
+    global PARSER_VERSION
+    if PARSER_VERSION is None:
+        digest = hashlib.sha256()
+        src_dir = os.path.dirname(os.path.abspath(__file__))
+        for name in PARSER_MODULES:
+            with open(os.path.join(src_dir, name), "rb") as module_file:
+                digest.update(module_file.read())
+        PARSER_VERSION = digest.hexdigest()[:16]
+    return PARSER_VERSION
+
+class PageCache():
+    # Rendered page bodies on disk, keyed by markdown content hash and parser
+    # version. Each entry is a JSON header line ({"title": ...}) followed by
+    # the body HTML. Entries are touched on use and the least recently used
+    # ones are evicted once the directory grows past max_bytes.
+    def __init__(self, directory=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, salt=""):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # Anything besides the markdown that changes page bodies, such as
+        # the image pipeline's fingerprint.
+        self.salt = salt
+        self.hits = 0
+        self.misses = 0
+        self.total_bytes = None
+
+    def __getstate__(self):
+        # Worker processes get a fresh view: counters and the size total are
+        # per process.
+        return {"directory": self.directory, "max_bytes": self.max_bytes, "salt": self.salt}
+
+    def __setstate__(self, state):
+        self.__init__(state["directory"], state["max_bytes"], state["salt"])
+
+    def entry_path(self, content_hash):
+        key = hashlib.sha256(f"{parser_version()}:{self.salt}:{content_hash}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key[:2], key)
+
+    def open(self, content_hash):
+        # Returns (title, body chunks) for a cached page, or None.
+        path = self.entry_path(content_hash)
+        try:
+            entry_file = open(path, "r")
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        try:
+            os.utime(path)
+            header = json.loads(entry_file.readline())
+        except (OSError, ValueError):
+            entry_file.close()
+            self.hits -= 1
+            self.misses += 1
+            return None
+        return header["title"], read_chunks(entry_file)
+
+    def store(self, content_hash, title, chunks):
+        # Passes the body chunks through while writing them to the cache; the
+        # entry only appears once every chunk was written.
+        path = self.entry_path(content_hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        entry_file = open(tmp_path, "w")
+        try:
+            entry_file.write(json.dumps({"title": title}) + "\n")
+            for chunk in chunks:
+                entry_file.write(chunk)
+                yield chunk
+        except BaseException:
+            entry_file.close()
+            os.remove(tmp_path)
+            raise
+        entry_file.close()
+        os.replace(tmp_path, path)
+        if self.total_bytes is None:
+            self.evict()
+        else:
+            self.total_bytes += os.path.getsize(path)
+            if self.total_bytes > self.max_bytes:
+                self.evict()
+
+    def entries(self):
+        return cache_entries(self.directory)
+
+    def evict(self):
+        self.total_bytes = evict_entries(self.entries(), self.max_bytes)
+        return self.total_bytes
+
+def cache_entries(directory):
+    # (mtime, size, path) of the entries of a cache laid out as
+    # directory/<bucket>/<entry>. Entries are touched on use, so the mtime
+    # is their last use.
+    entries = []
+    if not os.path.isdir(directory):
+        return entries
+    for bucket in os.scandir(directory):
+        if not bucket.is_dir():
+            continue
+        for entry in os.scandir(bucket.path):
+            if entry.name.endswith(".tmp"):
+                continue
+            stat = entry.stat()
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+    return entries
+
+def evict_entries(entries, max_bytes):
+    # Drops the least recently used entries until the cache is back under
+    # 90% of its budget, so eviction does not run on every store. Returns
+    # the size of what is left.
+    total = sum(size for _, size, _ in entries)
+    if total > max_bytes:
+        target = max_bytes * 0.9
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+    return total
+
+def read_chunks(entry_file, size=1 << 16):
+    with entry_file:
+        while True:
+            chunk = entry_file.read(size)
+            if not chunk:
+                return
+            yield chunk
@@ -0,0 +1,149 @@
+import time
+import threading
+
+# The profiler recording the current build, or None. Pipeline code wraps its
+# work in stage(...) and page(...), which cost one global lookup when no
+# profiler is active.
+ACTIVE = None
+
+class NullStage():
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NULL_STAGE = NullStage()
+
+class Stage():
+    __slots__ = ("profiler", "name", "page", "start", "child_time")
+
+    def __init__(self, profiler, name, page=None):
+        self.profiler = profiler
+        self.name = name
+        self.page = page
+        self.child_time = 0.0
+
+    def __enter__(self):
+        self.profiler.stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        self.profiler.finish(self, elapsed)
+        return False
+
+class Profiler():
+    def __init__(self):
+        self.stages = {}
+        self.pages = {}
+        self.folded = {}
+        # Stages nest per thread: copy and I/O threads time their own work
+        # without landing inside whatever the main thread is doing.
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.hooks = []
+        self.started = time.perf_counter()
+        self.total = None
+
+    @property
+    def stack(self):
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def add_hook(self, callback):
+        # callback(stage, page, seconds) runs after every stage; page is the
+        # source path of the page being built, or None outside a page.
+        self.hooks.append(callback)
+
+    def remove_hook(self, callback):
+        self.hooks.remove(callback)
+
+    def finish(self, stage, elapsed):
+        stack = self.stack
+        stack.pop()
+        self_time = elapsed - stage.child_time
+        if stack:
+            stack[-1].child_time += elapsed
+        path = ";".join(s.page or s.name for s in stack + [stage])
+        with self.lock:
+            record = self.stages.setdefault(stage.name, [0.0, 0])
+            record[0] += self_time
+            record[1] += 1
+            self.folded[path] = self.folded.get(path, 0.0) + self_time
+            if stage.page is not None:
+                self.pages[stage.page] = self.pages.get(stage.page, 0.0) + elapsed
+        page = stage.page or self.current_page()
+        for hook in self.hooks:
+            hook(stage.name, page, elapsed)
+
+    def current_page(self):
+        for stage in reversed(self.stack):
+            if stage.page is not None:
+                return stage.page
+        return None
+
+    def snapshot(self):
+        return {"stages": self.stages, "pages": self.pages, "folded": self.folded}
+
+    def merge(self, snapshot):
+        # Folds in the records of a profiler that ran in a worker process.
+        for name, (seconds, calls) in snapshot["stages"].items():
+            record = self.stages.setdefault(name, [0.0, 0])
+            record[0] += seconds
+            record[1] += calls
+        for path, seconds in snapshot["folded"].items():
+            self.folded[path] = self.folded.get(path, 0.0) + seconds
+        for page_path, seconds in snapshot["pages"].items():
+            self.pages[page_path] = self.pages.get(page_path, 0.0) + seconds
+            for hook in self.hooks:
+                hook("page", page_path, seconds)
+
+    def stop(self):
+        self.total = time.perf_counter() - self.started
+
+    def report(self, top=10):
+        total = self.total if self.total is not None else time.perf_counter() - self.started
+        lines = [f"Build took {total:.3f}s"]
+        lines.append(f"  {'stage':<12}{'seconds':>10}{'calls':>10}{'share':>8}")
+        stage_total = sum(seconds for seconds, _ in self.stages.values()) or 1.0
+        for name, (seconds, calls) in sorted(self.stages.items(), key=lambda item: -item[1][0]):
+            lines.append(f"  {name:<12}{seconds:>10.3f}{calls:>10}{seconds / stage_total:>8.1%}")
+        if self.pages:
+            lines.append(f"Slowest {min(top, len(self.pages))} of {len(self.pages)} pages:")
+            for page_path, seconds in sorted(self.pages.items(), key=lambda item: -item[1])[:top]:
+                lines.append(f"  {seconds:>10.4f}s  {page_path}")
+        return "\n".join(lines)
+
+    def write_folded(self, path):
+        # One "frame;frame;frame microseconds" line per stack, the collapsed
+        # format read by flamegraph.pl and speedscope.
+        with open(path, "w") as folded_file:
+            for stack, seconds in sorted(self.folded.items()):
+                folded_file.write(f"{stack} {round(seconds * 1_000_000)}\n")
+
+def start_profiling():
+    global ACTIVE
+    ACTIVE = Profiler()
+    return ACTIVE
+
+def stop_profiling():
+    global ACTIVE
+    profiler = ACTIVE
+    ACTIVE = None
+    if profiler is not None:
+        profiler.stop()
+    return profiler
+
+def stage(name):
+    if ACTIVE is None:
+        return NULL_STAGE
+    return Stage(ACTIVE, name)
+
+def page(path):
+    if ACTIVE is None:
+        return NULL_STAGE
+    return Stage(ACTIVE, "page", str(path))
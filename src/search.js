@@ -0,0 +1,164 @@
+// Client for the search index written by search_index.py.
+//
+// search/index.json lists the pages, the number of hash buckets and the
+// names of the non-empty shards; each shard maps the terms of one bucket to
+// a flat, delta-encoded postings list: page id delta, position count,
+// position deltas, repeated. Only the shards of the query's terms are
+// fetched, and each is fetched once.
+//
+// Usage: <script src="/search/search.js"></script>, then
+//   SiteSearch.search("tom bombadil").then(results => ...)
+// or add <input data-search-input> and <ul data-search-results> to a page.
+(function () {
+  "use strict";
+
+  var script = document.currentScript;
+  var base = script ? script.src.replace(/[^/]*$/, "") : "/search/";
+  var metaPromise = null;
+  var shardPromises = {};
+
+  function fetchJSON(name) {
+    return fetch(base + name).then(function (response) {
+      if (!response.ok) {
+        throw new Error("Failed to load " + name + ": " + response.status);
+      }
+      return response.json();
+    });
+  }
+
+  function loadMeta() {
+    if (!metaPromise) {
+      metaPromise = fetchJSON("index.json");
+    }
+    return metaPromise;
+  }
+
+  function termHash(term) {
+    // 32-bit FNV-1a over the code points of term, as term_hash in
+    // search_index.py.
+    var hash = 0x811c9dc5;
+    for (var i = 0; i < term.length; i++) {
+      var code = term.codePointAt(i);
+      if (code > 0xffff) {
+        i++;
+      }
+      hash = Math.imul(hash ^ code, 0x01000193) >>> 0;
+    }
+    return hash;
+  }
+
+  function shardKey(meta, term) {
+    return String(termHash(term) % meta.buckets);
+  }
+
+  function loadShard(meta, key) {
+    if (meta.shards.indexOf(key) === -1) {
+      return Promise.resolve({});
+    }
+    if (!shardPromises[key]) {
+      shardPromises[key] = fetchJSON(key + ".json");
+    }
+    return shardPromises[key];
+  }
+
+  function decode(encoded) {
+    // page id -> positions
+    var postings = {};
+    var page = 0;
+    var i = 0;
+    while (i < encoded.length) {
+      page += encoded[i];
+      var count = encoded[i + 1];
+      var positions = [];
+      var position = 0;
+      for (var j = 0; j < count; j++) {
+        position += encoded[i + 2 + j];
+        positions.push(position);
+      }
+      postings[page] = positions;
+      i += 2 + count;
+    }
+    return postings;
+  }
+
+  function tokenize(query) {
+    return (query.toLowerCase().match(/[\p{L}\p{N}_]+/gu) || []);
+  }
+
+  function adjacentPairs(first, second) {
+    // How often a word of the second list directly follows one of the first.
+    var following = {};
+    first.forEach(function (position) { following[position + 1] = true; });
+    return second.filter(function (position) { return following[position]; }).length;
+  }
+
+  // Pages containing every query term, ranked by term frequency with a
+  // bonus for terms appearing next to each other in query order.
+  function search(query) {
+    var terms = tokenize(query);
+    if (!terms.length) {
+      return Promise.resolve([]);
+    }
+    return loadMeta().then(function (meta) {
+      var keys = terms.map(function (term) { return shardKey(meta, term); });
+      return Promise.all(keys.map(function (key) { return loadShard(meta, key); }))
+        .then(function (shards) {
+          var lists = terms.map(function (term, i) {
+            var encoded = shards[i][term];
+            return encoded ? decode(encoded) : {};
+          });
+          var results = [];
+          Object.keys(lists[0]).forEach(function (page) {
+            var score = 0;
+            for (var i = 0; i < lists.length; i++) {
+              var positions = lists[i][page];
+              if (!positions) {
+                return;
+              }
+              score += positions.length;
+              if (i > 0) {
+                score += 5 * adjacentPairs(lists[i - 1][page], positions);
+              }
+            }
+            var entry = meta.pages[page];
+            results.push({ url: entry[0], title: entry[1], score: score });
+          });
+          results.sort(function (a, b) { return b.score - a.score; });
+          return results;
+        });
+    });
+  }
+
+  function bind() {
+    var input = document.querySelector("[data-search-input]");
+    var list = document.querySelector("[data-search-results]");
+    if (!input || !list) {
+      return;
+    }
+    var latest = 0;
+    input.addEventListener("input", function () {
+      var request = ++latest;
+      search(input.value).then(function (results) {
+        if (request !== latest) {
+          return;
+        }
+        list.textContent = "";
+        results.slice(0, 20).forEach(function (result) {
+          var item = document.createElement("li");
+          var link = document.createElement("a");
+          link.href = result.url;
+          link.textContent = result.title;
+          item.appendChild(link);
+          list.appendChild(item);
+        });
+      });
+    });
+  }
+
+  window.SiteSearch = { search: search };
+  if (document.readyState === "loading") {
+    document.addEventListener("DOMContentLoaded", bind);
+  } else {
+    bind();
+  }
+})();
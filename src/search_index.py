@@ -0,0 +1,150 @@
+import os
+import re
+import json
+import shutil
+import profiling
+
+from textnode import TextType
+
+SEARCH_DIR = "search"
+CLIENT_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "search.js")
+TERM_PATTERN = re.compile(r"\w+")
+# Image alt text and link URLs are not part of the readable text.
+INDEXED_TYPES = (TextType.TEXT, TextType.BOLD, TextType.ITALIC, TextType.CODE, TextType.LINK)
+# Rough size of one shard. Terms are hashed into as many buckets as it takes
+# to keep shards near this size, so a query fetches about the same number
+# of bytes per term however large the site grows.
+SHARD_BYTES = 32 * 1024
+
+def term_hash(term):
+    # 32-bit FNV-1a over the code points of term; search.js computes the
+    # same value to find the shard of a query term.
+    value = 0x811c9dc5
+    for char in term:
+        value = ((value ^ ord(char)) * 0x01000193) & 0xffffffff
+    return value
+
+def shard_key(term, buckets):
+    return str(term_hash(term) % buckets)
+
+def encoded_size(term, encoded):
+    # Bytes the entry takes in a shard's JSON: "term":[n,n,...],
+    return len(term.encode("utf-8")) + 4 + sum(len(str(number)) + 1 for number in encoded)
+
+def block_words(block):
+    # Lowercased words of a block from block_lines_to_textnodes, taken from
+    # the text nodes the renderer would produce. Code blocks and text that
+    # does not parse as inline markdown are indexed as they are.
+    _, tokenized = block
+    for text, nodes in tokenized:
+        if nodes is None:
+            pieces = [text]
+        else:
+            pieces = [node.text for node in nodes if node.text_type in INDEXED_TYPES]
+        for piece in pieces:
+            for match in TERM_PATTERN.finditer(piece):
+                yield match.group().lower()
+
+class PageTerms():
+    # Word positions of one page, filled block by block while the site
+    # index reads the markdown.
+    __slots__ = ("positions", "count")
+
+    def __init__(self):
+        self.positions = {}
+        self.count = 0
+
+    def add_block(self, block):
+        for term in block_words(block):
+            self.positions.setdefault(term, []).append(self.count)
+            self.count += 1
+
+class SearchIndex():
+    # Inverted index: term -> [(page id, positions)], with page ids in the
+    # order pages were added.
+    def __init__(self, prefix="/", shard_bytes=SHARD_BYTES):
+        self.prefix = prefix
+        self.shard_bytes = shard_bytes
+        self.pages = []
+        self.postings = {}
+
+    def wants(self, url):
+        return url.startswith(self.prefix)
+
+    def add_page(self, info, terms):
+        page_id = len(self.pages)
+        self.pages.append((info.url, info.title or info.url))
+        for term, positions in terms.positions.items():
+            self.postings.setdefault(term, []).append((page_id, positions))
+
+    def shards(self):
+        # The number of hash buckets and the non-empty shards by name.
+        encoded = {term: encode_postings(self.postings[term]) for term in sorted(self.postings)}
+        total = sum(encoded_size(term, numbers) for term, numbers in encoded.items())
+        buckets = max(1, -(-total // self.shard_bytes))
+        shards = {}
+        for term, numbers in encoded.items():
+            shards.setdefault(shard_key(term, buckets), {})[term] = numbers
+        return buckets, shards
+
+    def write(self, dest_root, basepath="/"):
+        # Writes search/index.json (pages and shard names), one JSON shard
+        # per key and the client script. Returns the number of bytes
+        # written for the index itself.
+        with profiling.stage("search"):
+            search_dir = os.path.join(dest_root, SEARCH_DIR)
+            if os.path.isdir(search_dir):
+                shutil.rmtree(search_dir)
+            os.makedirs(search_dir)
+            buckets, shards = self.shards()
+            prefix = basepath.rstrip("/")
+            meta = {
+                "version": 2,
+                "pages": [[prefix + url, title] for url, title in self.pages],
+                "buckets": buckets,
+                "shards": sorted(shards, key=int),
+            }
+            total = write_json(os.path.join(search_dir, "index.json"), meta)
+            for key, shard in shards.items():
+                total += write_json(os.path.join(search_dir, f"{key}.json"), shard)
+            shutil.copyfile(CLIENT_SOURCE, os.path.join(search_dir, "search.js"))
+        print(f"Indexed {len(self.postings)} terms from {len(self.pages)} pages into {search_dir} ({total} bytes)")
+        return total
+
+def encode_postings(postings):
+    # Flat, delta-encoded list: for each page the page id delta, the number
+    # of positions, then the position deltas. Small numbers keep the JSON
+    # short.
+    encoded = []
+    last_page = 0
+    for page_id, positions in postings:
+        encoded.append(page_id - last_page)
+        encoded.append(len(positions))
+        last_position = 0
+        for position in positions:
+            encoded.append(position - last_position)
+            last_position = position
+        last_page = page_id
+    return encoded
+
+def decode_postings(encoded):
+    postings = []
+    page_id = 0
+    i = 0
+    while i < len(encoded):
+        page_id += encoded[i]
+        count = encoded[i + 1]
+        positions = []
+        position = 0
+        for delta in encoded[i + 2:i + 2 + count]:
+            position += delta
+            positions.append(position)
+        postings.append((page_id, positions))
+        i += 2 + count
+    return postings
+
+def write_json(path, value):
+    data = json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+    with open(path, "w", encoding="utf-8") as json_file:
+        json_file.write(data)
+    return len(data.encode("utf-8"))
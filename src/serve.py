@@ -0,0 +1,345 @@
+import os
+import sys
+import time
+import argparse
+import threading
+import traceback
+
+from collections import OrderedDict
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from template import load_template
+from generate_pages import (
+    PageOptions,
+    build_incremental,
+    load_manifest,
+    save_manifest,
+    set_asset_transforms,
+    update_incremental,
+    MANIFEST_PATH
+)
+
+STATIC_DIR = "static"
+CONTENT_DIR = "content"
+TEMPLATE_PATH = "template.html"
+DEST_DIR = "docs"
+LIVERELOAD_PATH = "/__livereload"
+LIVERELOAD_SCRIPT = (
+    "<script>new EventSource(\"" + LIVERELOAD_PATH + "\").onmessage = function () { location.reload(); };</script>"
+)
+
+# Paths stat'ed per poll besides those TreeWatch checks every time, and
+# how many recently changed paths it keeps checking every time.
+SWEEP_PATHS = 2000
+HOT_PATHS = 256
+# A directory modified this recently is listed again on the next poll too:
+# an entry added within the same timestamp tick as the listing would not
+# move its mtime again.
+RACY_NS = 2_000_000_000
+# Seconds without changes before the watcher writes the manifest.
+SAVE_DELAY = 2.0
+
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def directory_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+class TreeWatch():
+    # Changed and removed files under some directories, without stat'ing
+    # every file and directory on every poll. A directory's mtime moves
+    # when an entry is created, removed or renamed into it, so a directory
+    # is only listed again, and its files stat'ed, once its mtime changed.
+    #
+    # Directories that hold other directories (content/, content/blog/)
+    # are checked on every poll, so new pages and new page directories show
+    # up at once, and so are the files and directories that changed
+    # recently. Everything else, such as a page's own directory or a file
+    # written in place, is checked SWEEP_PATHS at a time in turn.
+    def __init__(self, directories, files=(), sweep=SWEEP_PATHS):
+        # Directory -> (mtime, its files, its subdirectories).
+        self.dirs = {}
+        # File -> (mtime, size).
+        self.files = {}
+        self.parents = set()
+        self.hot = OrderedDict()
+        self.sweep = sweep
+        self.order = None
+        self.cursor = 0
+        for directory in directories:
+            self.scan(directory, [], [])
+        for path in files:
+            self.check(path, [], [])
+        self.hot.clear()
+
+    def mark_hot(self, path):
+        self.hot[path] = True
+        self.hot.move_to_end(path)
+        if len(self.hot) > HOT_PATHS:
+            self.hot.popitem(last=False)
+
+    def scan(self, directory, changed, removed):
+        _, old_files, old_subdirs = self.dirs.pop(directory, (None, set(), set()))
+        self.parents.discard(directory)
+        self.order = None
+        mtime = directory_mtime(directory)
+        entries = []
+        if mtime is not None:
+            try:
+                with os.scandir(directory) as found:
+                    entries = list(found)
+            except (FileNotFoundError, NotADirectoryError):
+                mtime = None
+        files = {entry.path for entry in entries if entry.is_file()}
+        subdirs = {entry.path for entry in entries if entry.is_dir(follow_symlinks=False)}
+        for path in (old_files - files) | files:
+            self.check(path, changed, removed)
+        if mtime is not None:
+            if time.time_ns() - mtime < RACY_NS:
+                mtime = None
+            self.dirs[directory] = (mtime, files, subdirs)
+            self.mark_hot(directory)
+            if subdirs:
+                self.parents.add(directory)
+        for path in (old_subdirs - subdirs) | (subdirs - old_subdirs):
+            self.scan(path, changed, removed)
+
+    def check(self, path, changed, removed):
+        if path in self.dirs:
+            # Listed again once its mtime moved, or while it is too recent
+            # to trust (see RACY_NS).
+            mtime = self.dirs[path][0]
+            if mtime is None or directory_mtime(path) != mtime:
+                self.scan(path, changed, removed)
+            return
+        signature = file_signature(path)
+        old = self.files.get(path)
+        if signature == old:
+            return
+        if signature is None:
+            del self.files[path]
+            removed.append(path)
+        else:
+            self.files[path] = signature
+            changed.append(path)
+            self.mark_hot(path)
+        if old is None or signature is None:
+            self.order = None
+
+    def due(self):
+        # The next slice of every watched path.
+        if self.order is None:
+            self.order = [*self.dirs, *self.files]
+        if self.cursor >= len(self.order):
+            self.cursor = 0
+        batch = self.order[self.cursor:self.cursor + self.sweep]
+        self.cursor += self.sweep
+        return batch
+
+    def poll(self, files=()):
+        # Returns sorted (changed, removed) paths since the last poll; files
+        # are stat'ed every time, for paths outside the directories.
+        changed = []
+        removed = []
+        for path in [*self.parents, *self.hot, *files, *self.due()]:
+            self.check(path, changed, removed)
+        return sorted(set(changed)), sorted(set(removed))
+
+class Reloader():
+    # Counts rebuilds; live-reload connections wait for the count to move.
+    def __init__(self):
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def notify(self):
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, version, timeout):
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+def unsupported_options(manifest, options):
+    # Build flags recorded in the manifest that a rebuild with options would
+    # silently undo, e.g. --images attributes on pages re-rendered without
+    # the pipeline.
+    flags = []
+    inputs = [entry["inputs"] for entry in manifest["pages"].values()]
+    if any("images" in page_inputs for page_inputs in inputs):
+        flags.append("--images")
+    if manifest.get("generated"):
+        flags.append("--listings")
+    if not options.minify and any(page_inputs.get("minify") for page_inputs in inputs):
+        flags.append("--minify")
+    return flags
+
+class Watcher():
+    # Starts from the manifest of the initial build, which it keeps current
+    # in memory; it is written out once the watched files were quiet for
+    # SAVE_DELAY, so saving it never delays a reload.
+    def __init__(self, basepath, reloader, options, interval=0.05):
+        self.basepath = basepath
+        self.reloader = reloader
+        # The PageOptions of the initial build, so rebuilt pages match it.
+        self.options = options
+        self.interval = interval
+        self.manifest = load_manifest(MANIFEST_PATH)
+        self.unsaved = False
+        self.last_change = time.monotonic()
+        self.templates = self.template_files()
+        self.tree = TreeWatch((STATIC_DIR, CONTENT_DIR), self.templates)
+
+    def template_files(self):
+        # The template and the partials it includes.
+        try:
+            return load_template(TEMPLATE_PATH, self.basepath).dependencies
+        except (OSError, ValueError):
+            # A missing partial or an include cycle; the rebuild reports it.
+            return [TEMPLATE_PATH]
+
+    def poll(self):
+        changed, removed = self.tree.poll(self.templates)
+        if not changed and not removed:
+            if time.monotonic() - self.last_change >= SAVE_DELAY:
+                self.save()
+            return False
+        self.last_change = time.monotonic()
+        start = time.perf_counter()
+        try:
+            self.rebuild(changed, removed)
+        except Exception:
+            traceback.print_exc()
+            return False
+        print(f"Rebuilt {len(changed) + len(removed)} changed file(s) in {(time.perf_counter() - start) * 1000:.0f} ms")
+        self.reloader.notify()
+        return True
+
+    def rebuild(self, changed, removed):
+        # Only the changed files are looked at: a page or asset is rendered
+        # or copied again, a removed source loses its outputs, and a template
+        # or partial re-renders the pages that used it.
+        self.unsaved = True
+        try:
+            update_incremental(self.manifest, changed, removed, STATIC_DIR, CONTENT_DIR, TEMPLATE_PATH, DEST_DIR, self.basepath, options=self.options)
+        finally:
+            if set(self.templates).intersection(changed + removed):
+                self.templates = self.template_files()
+
+    def save(self):
+        # Keeps the manifest current for the next run of main.py.
+        if self.unsaved:
+            save_manifest(MANIFEST_PATH, self.manifest)
+            self.unsaved = False
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            self.poll()
+
+def make_handler(reloader, basepath, live_reload):
+    class DevRequestHandler(SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=DEST_DIR, **kwargs)
+
+        def translate_path(self, path):
+            # Serve the site under its basepath as well as at the root.
+            if basepath != "/" and path.startswith(basepath):
+                path = "/" + path[len(basepath):]
+            return super().translate_path(path)
+
+        def do_GET(self):
+            if live_reload and self.path == LIVERELOAD_PATH:
+                self.stream_reload_events()
+                return
+            path = self.translate_path(self.path)
+            if os.path.isdir(path) and self.path.endswith("/"):
+                path = os.path.join(path, "index.html")
+            if live_reload and path.endswith(".html") and os.path.isfile(path):
+                self.send_html(path)
+                return
+            super().do_GET()
+
+        def send_html(self, path):
+            with open(path, "rb") as html_file:
+                body = html_file.read()
+            script = LIVERELOAD_SCRIPT.encode("utf-8")
+            if b"</body>" in body:
+                body = body.replace(b"</body>", script + b"</body>", 1)
+            else:
+                body += script
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            self.wfile.write(body)
+
+        def stream_reload_events(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-store")
+            self.end_headers()
+            version = reloader.version
+            try:
+                while True:
+                    new_version = reloader.wait(version, timeout=15)
+                    if new_version != version:
+                        version = new_version
+                        self.wfile.write(b"data: reload\n\n")
+                    else:
+                        self.wfile.write(b": ping\n\n")
+                    self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    return DevRequestHandler
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="main.py serve", description="Serve docs/ locally, optionally rebuilding on change.")
+    parser.add_argument("basepath", nargs="?", default="/", help="URL prefix the site is built for")
+    parser.add_argument("--watch", action="store_true", help="rebuild changed pages and live-reload open browsers")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between change polls (default 0.05)")
+    parser.add_argument("--minify", action="store_true", help="build and rebuild like 'main.py --minify'")
+    return parser.parse_args(argv)
+
+def main(argv):
+    args = parse_args(argv)
+    options = PageOptions(minify=args.minify)
+    if args.minify:
+        from minify import minify_css
+        set_asset_transforms({".css": minify_css})
+    # serve builds and rebuilds with its own options only; a docs/ built
+    # with others would come out as a mix of both.
+    flags = unsupported_options(load_manifest(MANIFEST_PATH), options)
+    if flags:
+        raise Exception(f"{DEST_DIR}/ was built with {', '.join(flags)}, which serve would drop from rebuilt pages; "
+                        f"build without them first (serve itself accepts --minify)")
+    build_incremental(STATIC_DIR, CONTENT_DIR, TEMPLATE_PATH, DEST_DIR, args.basepath, options=options)
+    reloader = Reloader()
+    server = ThreadingHTTPServer(("", args.port), make_handler(reloader, args.basepath, args.watch))
+    server.daemon_threads = True
+    if args.watch:
+        watcher = Watcher(args.basepath, reloader, options, args.interval)
+        threading.Thread(target=watcher.run, daemon=True).start()
+        print(f"Watching {STATIC_DIR}/, {CONTENT_DIR}/, {TEMPLATE_PATH} and its partials for changes...")
+    print(f"Serving {DEST_DIR}/ at http://localhost:{args.port}{args.basepath}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.watch:
+            watcher.save()
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,208 @@
+import os
+import json
+import heapq
+import shutil
+import hashlib
+import argparse
+import profiling
+
+from compress import compressed_paths
+from generate_pages import (
+    copy_files,
+    discover_content,
+    generate_pages,
+    list_files,
+    save_manifest,
+    SHARDS_PATH
+)
+
+# Written into every shard's output directory and left out of the merge.
+SHARD_MANIFEST = "shard.json"
+
+def parse_shard(spec):
+    # "2/4" -> (2, 4); shards are numbered from 1.
+    try:
+        index, count = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"Invalid shard {spec!r}, expected i/N such as 1/4")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard {spec!r}, i must be between 1 and N")
+    return index, count
+
+def portable_path(path):
+    # Independent of the OS, so every machine agrees on the partition.
+    return path.replace(os.sep, "/")
+
+def stable_hash(path):
+    # hash() is salted per process; this is the same on every machine.
+    return int(hashlib.sha256(portable_path(path).encode("utf-8")).hexdigest()[:16], 16)
+
+def page_costs(sources, timings):
+    # Seconds each page took in a previous build. Pages it did not see are
+    # estimated from their size at the average seconds per byte.
+    sizes = {src: os.path.getsize(src) for src in sources}
+    timed = [src for src in sources if portable_path(src) in timings]
+    timed_bytes = sum(sizes[src] for src in timed)
+    if timed_bytes:
+        rate = sum(timings[portable_path(src)] for src in timed) / timed_bytes
+    else:
+        rate = 1.0
+    return {src: timings.get(portable_path(src), sizes[src] * rate) for src in sources}
+
+def partition(sources, count, costs=None):
+    # Splits sources into count lists. Without costs each source goes to
+    # the shard its hash picks; with costs the most expensive sources are
+    # placed first, each on the least loaded shard. Both only depend on the
+    # inputs, so every machine computes the same partition.
+    shards = [[] for _ in range(count)]
+    if costs is None:
+        for src in sources:
+            shards[stable_hash(src) % count].append(src)
+        return shards
+    loads = [(0.0, i) for i in range(count)]
+    for src in sorted(sources, key=lambda src: (-costs[src], portable_path(src))):
+        load, i = heapq.heappop(loads)
+        shards[i].append(src)
+        heapq.heappush(loads, (load + costs[src], i))
+    return shards
+
+def load_timings(path=SHARDS_PATH):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as timings_file:
+            return json.load(timings_file).get("timings", {})
+    except (OSError, ValueError):
+        print(f"Shard timings {path} unreadable, partitioning by hash...")
+        return {}
+
+def build_shard(static_dir, dir_path_content, template_path, shard_dir, basepath, index, count, timings_path=SHARDS_PATH, jobs=1, link="copy", options=None, counters=None):
+    # Renders shard index of count into shard_dir, which is emptied first.
+    # Pages are balanced by the timings of a previous merge when there are
+    # any; static and content assets are split by hash.
+    if os.path.exists(shard_dir):
+        shutil.rmtree(shard_dir)
+    os.makedirs(shard_dir)
+    pages, content_assets = discover_content(dir_path_content, shard_dir)
+    assets = list_files(static_dir, shard_dir) + content_assets
+    timings = load_timings(timings_path)
+    sources = [src for src, _ in pages]
+    costs = page_costs(sources, timings) if timings else None
+    mine = set(partition(sources, count, costs)[index - 1])
+    pages = [(src, dst) for src, dst in pages if src in mine]
+    mine = set(partition([src for src, _ in assets], count)[index - 1])
+    assets = [(src, dst) for src, dst in assets if src in mine]
+    print(f"Shard {index}/{count}: {len(pages)} pages, {len(assets)} assets")
+    outputs = {}
+    collisions = []
+    for src, dst in pages + assets:
+        relative = os.path.relpath(dst, shard_dir).replace(os.sep, "/")
+        if relative in outputs:
+            collisions.append(f"{relative}: {outputs[relative]} and {portable_path(src)}")
+        outputs[relative] = portable_path(src)
+    if collisions:
+        details = "\n".join(f"  {collision}" for collision in collisions)
+        raise Exception(f"{len(collisions)} output(s) written from more than one source:\n{details}")
+
+    copy_files(assets, link)
+    # Page times are taken from a profiler; one runs for the shard if the
+    # build is not already profiled.
+    owned = profiling.ACTIVE is None
+    profiler = profiling.start_profiling() if owned else profiling.ACTIVE
+    try:
+        generate_pages(pages, template_path, basepath, jobs, options, counters)
+    finally:
+        if owned:
+            profiling.stop_profiling()
+    manifest = {
+        "shard": index,
+        "count": count,
+        "basepath": basepath,
+        "outputs": outputs,
+        "timings": {portable_path(src): round(profiler.pages.get(src, 0.0), 6) for src, _ in pages},
+    }
+    save_manifest(os.path.join(shard_dir, SHARD_MANIFEST), manifest)
+    return manifest
+
+def load_shard_manifest(shard_dir):
+    path = os.path.join(shard_dir, SHARD_MANIFEST)
+    try:
+        with open(path, "r") as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError) as e:
+        raise Exception(f"{shard_dir} is not a shard output: {e}")
+
+def shard_files(shard_dir):
+    # Relative path -> full path of every output file of a shard, including
+    # compressed siblings that are not in its manifest.
+    own = {SHARD_MANIFEST, *compressed_paths(SHARD_MANIFEST)}
+    files = {}
+    for root, _, names in os.walk(shard_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            relative = os.path.relpath(path, shard_dir).replace(os.sep, "/")
+            if relative not in own:
+                files[relative] = path
+    return files
+
+def merge_shards(shard_dirs, dest_dir, timings_path=SHARDS_PATH, link="copy"):
+    # Checks that the shard outputs belong to one build and do not overlap,
+    # then replaces dest_dir with their union and records the combined page
+    # timings for balancing the next build. dest_dir is left alone if a
+    # check fails.
+    manifests = [load_shard_manifest(shard_dir) for shard_dir in shard_dirs]
+    counts = {manifest["count"] for manifest in manifests}
+    basepaths = {manifest["basepath"] for manifest in manifests}
+    if len(counts) != 1 or len(basepaths) != 1:
+        raise Exception("Shards come from different builds: " + ", ".join(
+            f"{shard_dir} is {manifest['shard']}/{manifest['count']} for {manifest['basepath']}"
+            for shard_dir, manifest in zip(shard_dirs, manifests)
+        ))
+    count = counts.pop()
+    seen = sorted(manifest["shard"] for manifest in manifests)
+    if seen != list(range(1, count + 1)):
+        missing = sorted(set(range(1, count + 1)) - set(seen))
+        duplicated = sorted({shard for shard in seen if seen.count(shard) > 1})
+        raise Exception(f"Expected shards 1 to {count} once each; missing {missing}, duplicated {duplicated}")
+
+    owners = {}
+    collisions = []
+    missing = []
+    for shard_dir, manifest in zip(shard_dirs, manifests):
+        files = shard_files(shard_dir)
+        missing.extend(f"{shard_dir}: {relative}" for relative in manifest["outputs"] if relative not in files)
+        for relative, path in files.items():
+            if relative in owners:
+                collisions.append(f"{relative}: {owners[relative][0]} and {shard_dir}")
+            else:
+                owners[relative] = (shard_dir, path)
+    if collisions:
+        details = "\n".join(f"  {collision}" for collision in sorted(collisions))
+        raise Exception(f"{len(collisions)} output(s) written by more than one shard:\n{details}")
+    if missing:
+        details = "\n".join(f"  {path}" for path in sorted(missing))
+        raise Exception(f"{len(missing)} output(s) listed in a shard manifest are missing:\n{details}")
+
+    if os.path.exists(dest_dir):
+        shutil.rmtree(dest_dir)
+    os.makedirs(dest_dir)
+    copy_files([(path, os.path.join(dest_dir, relative)) for relative, (_, path) in sorted(owners.items())], link)
+    merged = {"count": count, "basepath": basepaths.pop(), "outputs": {}, "timings": {}}
+    for manifest in manifests:
+        merged["outputs"].update(manifest["outputs"])
+        merged["timings"].update(manifest["timings"])
+    save_manifest(timings_path, merged)
+    loads = ", ".join(f"{manifest['shard']}: {sum(manifest['timings'].values()):.2f}s" for manifest in sorted(manifests, key=lambda m: m["shard"]))
+    print(f"Merged {count} shards, {len(owners)} files into {dest_dir} (render time per shard {loads})")
+    return merged
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="main.py merge", description="Combine the outputs of 'main.py --shard i/N' builds into docs/.")
+    parser.add_argument("shard_dirs", nargs="+", metavar="DIR", help="output directory of each shard")
+    parser.add_argument("--timings", default=SHARDS_PATH, metavar="PATH", help="where to write page timings for balancing the next build (default %(default)s)")
+    parser.add_argument("--link", choices=["copy", "hard", "reflink"], default="copy", help="how shard files are placed in docs/")
+    return parser.parse_args(argv)
+
+def main(argv):
+    args = parse_args(argv)
+    merge_shards(args.shard_dirs, "docs/", args.timings, args.link)
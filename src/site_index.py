@@ -0,0 +1,257 @@
+import os
+import re
+import hashlib
+import profiling
+
+from datetime import date
+from html import escape
+from pathlib import PurePosixPath
+from block_markdown import block_lines_to_textnodes, iter_block_lines, iter_file_lines
+from generate_pages import input_hash, remove_output, write_output
+from htmlnode import LeafNode, ParentNode
+from minify import minify_html_chunks
+from link_check import PageLinks
+from search_index import PageTerms
+from template import load_template, rewrite_basepath
+
+# A paragraph consisting of a single "Tags: a, b" line tags its page. The
+# line still renders as part of the page.
+TAGS_PATTERN = re.compile(r"^Tags:\s*(.+)$")
+SLUG_PATTERN = re.compile(r"[^a-z0-9]+")
+# Words of the raw markdown, so markup such as "#" or "-" is not counted.
+WORD_PATTERN = re.compile(r"\w+(?:['’-]\w+)*")
+
+class PageInfo():
+    # Outgoing links are not kept here: only --check-links needs them, and
+    # it collects them in the same read into its LinkGraph (see build_index).
+    __slots__ = ("src", "dest", "url", "title", "mtime", "words", "tags")
+
+    def __init__(self, src, dest, url, title=None, mtime=0.0, words=0, tags=None):
+        self.src = src
+        self.dest = dest
+        self.url = url
+        self.title = title
+        self.mtime = mtime
+        self.words = words
+        self.tags = tags if tags is not None else []
+
+    def __repr__(self):
+        return f"PageInfo({self.url}, {self.title}, {self.words} words, tags: {self.tags})"
+
+class SiteIndex():
+    # Every page of the site, gathered once before rendering so listings,
+    # tag pages and the sitemap never go back to the markdown.
+    def __init__(self, pages, dest_root):
+        self.pages = pages
+        self.dest_root = dest_root
+        self.by_src = {os.path.normpath(page.src): page for page in pages}
+
+    def get(self, src):
+        return self.by_src.get(os.path.normpath(src))
+
+    def tags(self):
+        tags = {}
+        for page in self.pages:
+            for tag in page.tags:
+                tags.setdefault(tag, []).append(page)
+        return tags
+
+def relative_output(dest_path, dest_root):
+    return PurePosixPath(os.path.relpath(dest_path, dest_root).replace(os.sep, "/"))
+
+def page_url(dest_path, dest_root):
+    # Site-relative URL of an output file; index.html is served as its
+    # directory.
+    rel = relative_output(dest_path, dest_root)
+    if rel.name == "index.html":
+        return "/" if rel.parent.name == "" else f"/{rel.parent}/"
+    return f"/{rel}"
+
+def index_page(src, dest, dest_root, block_handlers=()):
+    # One read of the markdown: the title follows extract_title_from_lines
+    # (the first block starting with "# "), and words and tags are counted
+    # on the raw lines. Each of block_handlers also sees every block,
+    # tokenized once for all of them by block_lines_to_textnodes.
+    title = None
+    words = 0
+    tags = []
+    with open(src, "r") as md_file:
+        for block_lines in iter_block_lines(iter_file_lines(md_file)):
+            if title is None and block_lines[0].startswith("# "):
+                title = "\n".join(block_lines)[2:]
+            if len(block_lines) == 1:
+                match = TAGS_PATTERN.match(block_lines[0])
+                if match:
+                    tags.extend(tag.strip() for tag in match.group(1).split(",") if tag.strip())
+            if block_handlers:
+                block = block_lines_to_textnodes(block_lines)
+                for handler in block_handlers:
+                    handler(block)
+            for line in block_lines:
+                words += len(WORD_PATTERN.findall(line))
+    return PageInfo(src, dest, page_url(dest, dest_root), title, os.path.getmtime(src), words, tags)
+
+def build_index(pages, dest_root, search=None, links=None):
+    # pages are the (source, destination) pairs from discover_content. A
+    # SearchIndex and a LinkGraph, when given, are filled in the same read.
+    infos = []
+    with profiling.stage("index"):
+        for src, dest in pages:
+            handlers = []
+            terms = None
+            if search is not None and search.wants(page_url(dest, dest_root)):
+                terms = PageTerms()
+                handlers.append(terms.add_block)
+            page_links = None
+            if links is not None:
+                page_links = PageLinks()
+                handlers.append(page_links.add_block)
+            info = index_page(src, dest, dest_root, handlers)
+            if terms is not None:
+                search.add_page(info, terms)
+            if page_links is not None:
+                links.add_page(info, page_links)
+            infos.append(info)
+    return SiteIndex(infos, dest_root)
+
+def slugify(text):
+    return SLUG_PATTERN.sub("-", text.lower()).strip("-") or "tag"
+
+def unique_slug(text, used):
+    # Tags such as "C" and "C++" share a slug; later ones get a numeric
+    # suffix so each keeps its own page. used is updated.
+    base = slug = slugify(text)
+    suffix = 2
+    while slug in used:
+        slug = f"{base}-{suffix}"
+        suffix += 1
+    used.add(slug)
+    return slug
+
+def page_list_node(pages):
+    items = []
+    for page in sorted(pages, key=lambda page: (-page.mtime, page.url)):
+        day = date.fromtimestamp(page.mtime).isoformat()
+        items.append(ParentNode("li", [
+            LeafNode("a", escape(page.title or page.url), {"href": page.url}),
+            LeafNode(None, " "),
+            LeafNode("time", day, {"datetime": day}),
+            LeafNode(None, f" · {page.words} words"),
+        ]))
+    return ParentNode("ul", items)
+
+def write_generated_page(template, dest_path, basepath, title, body, minify=False):
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    context = {
+        "Title": title,
+        "Date": date.today().isoformat(),
+        "Content": rewrite_basepath(body, basepath),
+    }
+    chunks = template.iter_render(context)
+    if minify:
+        chunks = minify_html_chunks(chunks)
+    write_output(dest_path, chunks)
+
+def listing_directories(index):
+    # Output directories (relative to dest_root) that hold pages but have no
+    # index.html of their own, mapped to every page beneath them.
+    outputs = [relative_output(page.dest, index.dest_root) for page in index.pages]
+    own_index = {rel.parent for rel in outputs if rel.name == "index.html"}
+    listings = {}
+    for page, rel in zip(index.pages, outputs):
+        directory = rel.parent.parent if rel.name == "index.html" else rel.parent
+        for ancestor in [directory, *directory.parents]:
+            if ancestor not in own_index:
+                listings.setdefault(ancestor, []).append(page)
+    return listings
+
+def write_listings(index, template_path, basepath, minify=False, records=None):
+    # Returns the URLs of the pages written, for the sitemap.
+    #
+    # records is the manifest's section for generated pages on incremental
+    # builds: each listing records the hash of the index entries it shows
+    # next to the template files it used, and is only written again when
+    # one of those changed. It is updated in place.
+    template = load_template(template_path, basepath)
+    hashes = {}
+    shared = {"basepath": basepath, "date": date.today().isoformat()}
+    if minify:
+        shared["minify"] = True
+    for path in template.dependencies:
+        shared[path] = input_hash(path, hashes)
+    current = {}
+    skipped = 0
+
+    def write(dest_path, title, body):
+        nonlocal skipped
+        digest = hashlib.sha256(f"{title}\n{body}".encode("utf-8")).hexdigest()
+        entry = {"inputs": dict(shared, index=digest), "output": dest_path}
+        current[dest_path] = entry
+        if records is not None and records.get(dest_path) == entry and os.path.exists(dest_path):
+            skipped += 1
+            return
+        write_generated_page(template, dest_path, basepath, title, body, minify)
+
+    written = []
+    with profiling.stage("listings"):
+        for directory, pages in sorted(listing_directories(index).items()):
+            dest_path = os.path.normpath(os.path.join(index.dest_root, directory, "index.html"))
+            name = directory.name or "Index"
+            title = escape(name.replace("-", " ").title())
+            body = ParentNode("div", [LeafNode("h1", title), page_list_node(pages)]).to_html()
+            print(f"Generating listing {dest_path}...")
+            write(dest_path, title, body)
+            written.append((page_url(dest_path, index.dest_root), max(page.mtime for page in pages)))
+        tags = index.tags()
+        if tags:
+            tags_dir = os.path.join(index.dest_root, "tags")
+            entries = []
+            slugs = set()
+            for tag, pages in sorted(tags.items(), key=lambda item: (item[0].lower(), item[0])):
+                slug = unique_slug(tag, slugs)
+                dest_path = os.path.join(tags_dir, slug, "index.html")
+                title = f"Tagged: {escape(tag)}"
+                body = ParentNode("div", [LeafNode("h1", title), page_list_node(pages)]).to_html()
+                write(dest_path, title, body)
+                url = page_url(dest_path, index.dest_root)
+                written.append((url, max(page.mtime for page in pages)))
+                entries.append(ParentNode("li", [
+                    LeafNode("a", escape(tag), {"href": url}),
+                    LeafNode(None, f" ({len(pages)})"),
+                ]))
+            dest_path = os.path.join(tags_dir, "index.html")
+            print(f"Generating tag pages under {tags_dir}...")
+            body = ParentNode("div", [LeafNode("h1", "Tags"), ParentNode("ul", entries)]).to_html()
+            write(dest_path, "Tags", body)
+            written.append((page_url(dest_path, index.dest_root), max(page.mtime for page in index.pages)))
+    if records is not None:
+        # A directory that gained its own index.md loses its listing, but
+        # the page rendered in its place must stay.
+        page_outputs = {os.path.normpath(page.dest) for page in index.pages}
+        for dest_path in set(records) - set(current):
+            if os.path.normpath(dest_path) not in page_outputs:
+                remove_output(dest_path, index.dest_root)
+        records.clear()
+        records.update(current)
+        print(f"{len(current) - skipped} of {len(current)} generated pages stale")
+    return written
+
+def write_sitemap(index, site_url, basepath, extra=()):
+    # extra holds (url, mtime) pairs for generated pages such as listings.
+    prefix = site_url.rstrip("/") + basepath.rstrip("/")
+    entries = [(page.url, page.mtime) for page in index.pages]
+    entries.extend(extra)
+    os.makedirs(index.dest_root, exist_ok=True)
+    dest_path = os.path.join(index.dest_root, "sitemap.xml")
+    tmp_path = f"{dest_path}.tmp"
+    with profiling.stage("sitemap"):
+        with open(tmp_path, "w") as sitemap_file:
+            sitemap_file.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+            sitemap_file.write('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+            for url, mtime in sorted(entries):
+                lastmod = date.fromtimestamp(mtime).isoformat()
+                sitemap_file.write(f"  <url><loc>{escape(prefix + url)}</loc><lastmod>{lastmod}</lastmod></url>\n")
+            sitemap_file.write("</urlset>\n")
+        os.replace(tmp_path, dest_path)
+    print(f"Wrote {len(entries)} URLs to {dest_path}")
+    return dest_path
@@ -0,0 +1,94 @@
+import os
+import re
+
+PLACEHOLDER_PATTERN = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+# {{> partials/nav.html }} is replaced by that file, relative to the file
+# that includes it.
+INCLUDE_PATTERN = re.compile(r"\{\{>\s*([^\s}]+)\s*\}\}")
+
+# Compiled templates keyed by (path, basepath); each entry remembers the
+# mtime and size of the template and its partials so an edit to any of them
+# is picked up on the next page.
+TEMPLATE_CACHE = {}
+
+def rewrite_basepath(html, basepath):
+    if basepath == "/":
+        return html
+    html = html.replace('href="/', f'href="{basepath}')
+    return html.replace('src="/', f'src="{basepath}')
+
+class Template():
+    def __init__(self, source, basepath="/", dependencies=()):
+        # split() with a capturing group alternates literal text and
+        # placeholder names: [literal, name, literal, ..., literal]
+        parts = PLACEHOLDER_PATTERN.split(source)
+        for i in range(0, len(parts), 2):
+            parts[i] = rewrite_basepath(parts[i], basepath)
+        self.parts = parts
+        self.names = parts[1::2]
+        # Files the source was read from: the template, then its partials.
+        self.dependencies = list(dependencies)
+
+    def __repr__(self):
+        return f"Template({self.names})"
+
+    def render(self, context):
+        return "".join(self.iter_render(context))
+
+    def write(self, fp, context):
+        fp.writelines(self.iter_render(context))
+
+    def iter_render(self, context):
+        # Variables are either strings or iterables of string chunks (such as
+        # a streamed page body). Iterables used more than once are collected
+        # the first time so every placeholder gets the full value.
+        context = dict(context)
+        for i, part in enumerate(self.parts):
+            if i % 2 == 0:
+                if part:
+                    yield part
+                continue
+            value = context.get(part, "")
+            if isinstance(value, str):
+                yield value
+            elif self.names.count(part) > 1:
+                value = context[part] = "".join(value)
+                yield value
+            else:
+                yield from value
+
+def expand_includes(source, path, stack=()):
+    # Returns the source with partials inlined and the partials it used, in
+    # order of first use.
+    stack = stack + (os.path.abspath(path),)
+    partials = []
+    def include(match):
+        partial = os.path.normpath(os.path.join(os.path.dirname(path), match.group(1)))
+        if os.path.abspath(partial) in stack:
+            raise ValueError(f"Template {path} includes itself through {partial}")
+        with open(partial, "r") as partial_file:
+            text, nested = expand_includes(partial_file.read(), partial, stack)
+        for dependency in [partial, *nested]:
+            if dependency not in partials:
+                partials.append(dependency)
+        return text
+    return INCLUDE_PATTERN.sub(include, source), partials
+
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def load_template(template_path, basepath="/"):
+    key = (template_path, basepath)
+    cached = TEMPLATE_CACHE.get(key)
+    if cached is not None and all(file_signature(path) == signature for path, signature in cached[0]):
+        return cached[1]
+    with open(template_path, "r") as temp_file:
+        source, partials = expand_includes(temp_file.read(), template_path)
+    dependencies = [template_path, *partials]
+    template = Template(source, basepath, dependencies)
+    TEMPLATE_CACHE[key] = ([(path, file_signature(path)) for path in dependencies], template)
+    return template
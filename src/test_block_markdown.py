@@ -1,11 +1,19 @@
+import io
 import unittest
 
 from block_markdown import (
     markdown_to_blocks,
     markdown_to_html_node,
     block_to_blocktype, 
+    extract_title,
+    iter_block_nodes,
+    iter_file_lines,
+    iter_markdown_html,
+    set_inline_memo,
+    InlineMemo,
     BlockType
 )
+from textnode import set_image_resolver
 
 class TestInlineMarkdown(unittest.TestCase):
 
@@ -392,5 +400,123 @@ There are many like it
             "<div><ul><li>This is a list</li><li>with items</li><li>and <i>more</i> items</li></ul><ol><li>This is an <code>ordered</code> list</li><li>with items</li><li>and more items</li></ol></div>",
         )
 
+    def test_whitespace_only_line_does_not_split_blocks(self):
+        md = "  first line\n   \nsecond line  \n\n\n\n \nthird"
+        self.assertEqual(markdown_to_blocks(md), ["first line\n   \nsecond line", "third"])
+
+    def test_heading_line_inside_block(self):
+        md = "intro line\n## Heading"
+        self.assertEqual(block_to_blocktype(md), BlockType.HEADING)
+        self.assertEqual(markdown_to_html_node(md).to_html(), "<div><h2>ro line\n## Heading</h2></div>")
+
+    def test_large_document(self):
+        md = "\n\n".join(f"- item {i}\n- other {i}" for i in range(50000))
+        node = markdown_to_html_node(md)
+        self.assertEqual(len(node.children), 50000)
+        self.assertEqual(node.children[-1].to_html(), "<ul><li>item 49999</li><li>other 49999</li></ul>")
+
+    #STREAMING TESTS
+
+    def test_iter_markdown_html_matches_full_parse(self):
+        md = "# Title\n\nSome **bold** text\n\n- a\n- b\n\n```\ncode\n```\n"
+        streamed = "".join(iter_markdown_html(iter_file_lines(io.StringIO(md))))
+        self.assertEqual(streamed, markdown_to_html_node(md).to_html())
+
+    def test_iter_block_nodes_is_lazy(self):
+        consumed = []
+        def lines():
+            for i in range(1000):
+                consumed.append(i)
+                yield f"paragraph {i}"
+                yield ""
+        nodes = iter_block_nodes(lines())
+        first = next(nodes)
+        self.assertEqual(first.to_html(), "<p>paragraph 0</p>")
+        self.assertLess(len(consumed), 3)
+
+    def test_iter_markdown_html_empty_raises(self):
+        with self.assertRaises(ValueError):
+            "".join(iter_markdown_html(iter_file_lines(io.StringIO("\n\n"))))
+
+    #EXTRACT TITLE TESTS
+
+    def test_extract_title(self):
+        md = "Intro paragraph\n\n## Subheading\n\n# The Title\n\n# Another"
+        self.assertEqual(extract_title(md), "The Title")
+
+    def test_extract_title_missing(self):
+        self.assertIsNone(extract_title("## Only a subheading\n\ntext"))
+
+    #INLINE MEMO TESTS
+
+    def tearDown(self):
+        set_inline_memo(0)
+
+    def test_inline_memo_matches_unmemoized(self):
+        md = "# Title\n\n- **bold** item\n- **bold** item\n\n> a `quote`\n> a `quote`\n\n1. [link](/x)\n2. ![img](/y.png)"
+        expected = markdown_to_html_node(md).to_html()
+        memo = set_inline_memo(100)
+        self.assertEqual(markdown_to_html_node(md).to_html(), expected)
+        self.assertEqual(markdown_to_html_node(md).to_html(), expected)
+        self.assertGreater(memo.hits, 0)
+
+    def test_inline_memo_is_bounded(self):
+        memo = InlineMemo(max_entries=2, max_text_length=5)
+        memo.render("a")
+        memo.render("b")
+        memo.render("a")
+        memo.render("c")
+        self.assertEqual([key[0] for key in memo.entries], ["a", "c"])
+        memo.render("too long")
+        self.assertNotIn(("too long", None, "/"), memo.entries)
+        self.assertEqual((memo.hits, memo.misses), (1, 4))
+
+    def test_inline_memo_returns_the_same_nodes(self):
+        md = "a **bold** [link](/x) and ![img](/y.png)"
+        expected = markdown_to_html_node(md)
+        set_inline_memo(100)
+        markdown_to_html_node(md)
+        self.assertEqual(repr(markdown_to_html_node(md)), repr(expected))
+
+    def test_inline_memo_is_keyed_by_image_resolver(self):
+        memo = set_inline_memo(100)
+        md = "![img](/y.png)"
+        plain = markdown_to_html_node(md).to_html()
+        set_image_resolver(lambda url: {"width": "10"})
+        try:
+            self.assertIn('width="10"', markdown_to_html_node(md).to_html())
+        finally:
+            set_image_resolver(None)
+        self.assertEqual(markdown_to_html_node(md).to_html(), plain)
+        self.assertEqual((memo.hits, memo.misses), (1, 2))
+
+    def test_inline_memo_hits_across_equal_resolvers(self):
+        # Such as the same image pipeline unpickled for each batch.
+        memo = set_inline_memo(100)
+        md = "![img](/y.png)"
+        try:
+            for _ in range(2):
+                set_image_resolver(lambda url: {"width": "10"}, "fingerprint")
+                self.assertIn('width="10"', markdown_to_html_node(md).to_html())
+        finally:
+            set_image_resolver(None)
+        self.assertEqual((memo.hits, memo.misses), (1, 1))
+        self.assertEqual(next(iter(memo.entries))[1], "fingerprint")
+
+    def test_inline_memo_does_not_cache_errors(self):
+        memo = set_inline_memo(100)
+        for _ in range(2):
+            with self.assertRaises(Exception):
+                markdown_to_html_node("unclosed **bold")
+        self.assertEqual(len(memo.entries), 0)
+
+    def test_inline_memo_empty_text_still_raises(self):
+        with self.assertRaises(ValueError) as expected:
+            markdown_to_html_node("- ****").to_html()
+        set_inline_memo(100)
+        with self.assertRaises(ValueError) as memoized:
+            markdown_to_html_node("- ****").to_html()
+        self.assertEqual(str(memoized.exception), str(expected.exception))
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
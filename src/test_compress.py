@@ -0,0 +1,119 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from compress import MAX_PENDING_PER_THREAD, Compressor, is_current
+
+
+class TestCompressor(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.cache_dir = os.path.join(self.root, "cache")
+        self.docs = os.path.join(self.root, "docs")
+        os.makedirs(os.path.join(self.docs, "blog"))
+        self.page = os.path.join(self.docs, "blog", "index.html")
+        self.write(self.page, "<p>hello</p>" * 100)
+        self.write(os.path.join(self.docs, "index.css"), "body { color: red; }")
+        self.write(os.path.join(self.docs, "app.js"), "console.log(1);")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def compressor(self, **kwargs):
+        return Compressor(("gzip",), cache_dir=self.cache_dir, **kwargs)
+
+    def test_writes_gzip_siblings_for_pages_and_css(self):
+        compressor = self.compressor()
+        compressor.submit_tree(self.docs)
+        self.assertEqual(compressor.close(), [])
+        with gzip.open(self.page + ".gz", "rt") as f:
+            self.assertEqual(f.read(), "<p>hello</p>" * 100)
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "index.css.gz")))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "app.js.gz")))
+        self.assertTrue(is_current(self.page + ".gz", os.stat(self.page)))
+
+    def test_pending_queue_is_bounded(self):
+        compressor = self.compressor(threads=1)
+        for i in range(MAX_PENDING_PER_THREAD * 2 + 1):
+            path = os.path.join(self.docs, f"page{i}.html")
+            self.write(path, "<p>x</p>")
+            compressor.submit(path)
+            self.assertLessEqual(len(compressor.pending), MAX_PENDING_PER_THREAD)
+        self.assertEqual(compressor.close(), [])
+        self.assertTrue(os.path.exists(os.path.join(self.docs, f"page{i}.html.gz")))
+
+    def test_assets_are_optional(self):
+        compressor = self.compressor(extensions=(".js",))
+        compressor.submit_tree(self.docs)
+        compressor.close()
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "app.js.gz")))
+
+    def test_unchanged_files_are_skipped(self):
+        first = self.compressor()
+        first.submit_tree(self.docs)
+        first.close()
+        second = self.compressor()
+        second.submit_tree(self.docs)
+        second.close()
+        self.assertEqual((second.compressed, second.reused, second.skipped), (0, 0, 2))
+
+    def test_rewritten_files_reuse_cache(self):
+        first = self.compressor()
+        first.submit(self.page)
+        first.close()
+        # A full build deletes docs/ and writes the same bytes again.
+        os.remove(self.page + ".gz")
+        self.write(self.page, "<p>hello</p>" * 100)
+        second = self.compressor()
+        second.submit(self.page)
+        second.close()
+        self.assertEqual((second.compressed, second.reused), (0, 1))
+        self.write(self.page, "<p>changed</p>")
+        os.utime(self.page, ns=(0, 1))
+        third = self.compressor()
+        third.submit(self.page)
+        third.close()
+        self.assertEqual(third.compressed, 1)
+        with gzip.open(self.page + ".gz", "rt") as f:
+            self.assertEqual(f.read(), "<p>changed</p>")
+
+    def test_cache_evicts_least_recently_used(self):
+        pages = [os.path.join(self.docs, f"page{i}.html") for i in range(4)]
+        first = self.compressor()
+        for i, page in enumerate(pages):
+            self.write(page, f"<p>{i}</p>" * 200)
+            first.submit(page)
+        first.close()
+        entries = [os.path.join(root, name) for root, _, names in os.walk(self.cache_dir) for name in names]
+        self.assertEqual(len(entries), 4)
+        for entry in entries:
+            os.utime(entry, ns=(1, 1))
+        os.remove(pages[0] + ".gz")
+        second = self.compressor(max_bytes=2 * os.path.getsize(entries[0]))
+        second.submit(pages[0])
+        second.close()
+        self.assertEqual(second.reused, 1)
+        second.evict()
+        left = [name for _, _, names in os.walk(self.cache_dir) for name in names]
+        self.assertEqual(len(left), 1)
+        third = self.compressor()
+        os.remove(pages[0] + ".gz")
+        third.submit(pages[0])
+        third.close()
+        self.assertEqual((third.compressed, third.reused), (0, 1))
+
+    def test_failures_are_reported(self):
+        compressor = self.compressor()
+        compressor.submit(os.path.join(self.docs, "missing.html"))
+        failures = compressor.close()
+        self.assertEqual(len(failures), 1)
+        self.assertIn("missing.html", failures[0][0])
+
+if __name__ == "__main__":
+    unittest.main()
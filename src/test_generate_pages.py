@@ -0,0 +1,390 @@
+import os
+import tempfile
+import unittest
+
+from datetime import date
+from generate_pages import PageOptions, PageWriter, build_bounded, build_incremental, dependents, discover_content, generate_pages, generate_pages_bounded, generate_pages_parallel, generate_pages_recursive, iter_content, load_manifest, save_manifest, set_asset_transforms, sync_directory, write_output
+from memory import MemoryBudget, current_rss
+from page_cache import PageCache
+
+
+class TestIncrementalBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.static = os.path.join(root, "static")
+        self.content = os.path.join(root, "content")
+        self.docs = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        self.manifest = os.path.join(root, ".cache", "manifest.json")
+        os.makedirs(os.path.join(self.static, "images"))
+        os.makedirs(os.path.join(self.content, "blog", "post"))
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "a.png"), "png")
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n[post](/blog/post)")
+        self.write(os.path.join(self.content, "blog", "post", "index.md"), "# Post\n\nHello")
+        self.write(self.template, "<title>{{ Title }}</title><body>{{ Content }}</body>")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def build(self, basepath="/"):
+        return build_incremental(self.static, self.content, self.template, self.docs, basepath, self.manifest)
+
+    def mtimes(self):
+        result = {}
+        for dirpath, _, filenames in os.walk(self.docs):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                result[path] = os.stat(path).st_mtime_ns
+        return result
+
+    def test_first_build_writes_everything(self):
+        self.build()
+        self.assertEqual(
+            self.read(os.path.join(self.docs, "index.html")),
+            '<title>Home</title><body><div><h1>Home</h1><p><a href="/blog/post">post</a></p></div></body>',
+        )
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "images", "a.png")))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "blog", "post", "index.html")))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "blog", "post", "index.md")))
+        manifest = load_manifest(self.manifest)
+        self.assertEqual(len(manifest["pages"]), 2)
+
+    def test_unchanged_build_touches_nothing(self):
+        self.build()
+        before = self.mtimes()
+        os.utime(self.template)
+        self.build()
+        self.assertEqual(before, self.mtimes())
+
+    def test_changed_page_only_rebuilds_that_page(self):
+        self.build()
+        before = self.mtimes()
+        self.write(os.path.join(self.content, "blog", "post", "index.md"), "# Post\n\nChanged")
+        self.build()
+        after = self.mtimes()
+        post = os.path.join(self.docs, "blog", "post", "index.html")
+        self.assertIn("Changed", self.read(post))
+        self.assertEqual(before[os.path.join(self.docs, "index.html")], after[os.path.join(self.docs, "index.html")])
+        self.assertEqual(before[os.path.join(self.docs, "index.css")], after[os.path.join(self.docs, "index.css")])
+
+    def test_basepath_change_rebuilds_pages(self):
+        self.build()
+        self.build("/site/")
+        self.assertIn('href="/site/blog/post"', self.read(os.path.join(self.docs, "index.html")))
+
+    def test_template_change_rebuilds_pages(self):
+        self.build()
+        self.write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.build()
+        self.assertTrue(self.read(os.path.join(self.docs, "index.html")).startswith("<h1>Home</h1>"))
+
+    def test_partial_change_rebuilds_pages_using_it(self):
+        partial = os.path.join(self.tmp.name, "footer.html")
+        self.write(partial, "<footer>v1</footer>")
+        self.write(self.template, "<title>{{ Title }}</title><body>{{ Content }}{{> footer.html }}</body>")
+        manifest = self.build()
+        self.assertEqual(sorted(dependents(manifest, [partial])), sorted(manifest["pages"]))
+        self.assertEqual(dependents(manifest, [os.path.join(self.content, "index.md")]), [os.path.join(self.content, "index.md")])
+        before = self.mtimes()
+        self.write(partial, "<footer>v2</footer>")
+        self.build()
+        after = self.mtimes()
+        self.assertIn("<footer>v2</footer>", self.read(os.path.join(self.docs, "index.html")))
+        css = os.path.join(self.docs, "index.css")
+        self.assertEqual(before[css], after[css])
+
+    def test_toggling_asset_transforms_recopies_assets(self):
+        css = os.path.join(self.docs, "index.css")
+        self.build()
+        set_asset_transforms({".css": str.upper})
+        try:
+            self.build()
+            self.assertEqual(self.read(css), "BODY {}")
+            self.assertEqual(load_manifest(self.manifest)["assets"][os.path.join(self.static, "index.css")]["transform"], "upper")
+            before = self.mtimes()
+            self.build()
+            self.assertEqual(before, self.mtimes())
+        finally:
+            set_asset_transforms({})
+        self.build()
+        self.assertEqual(self.read(css), "body {}")
+
+    def test_removed_sources_remove_outputs(self):
+        self.build()
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        os.remove(os.path.join(self.content, "blog", "post", "index.md"))
+        self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "images")))
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "blog")))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "index.html")))
+
+    def test_sections_of_steps_that_no_longer_run_are_removed(self):
+        manifest = self.build()
+        listing = os.path.join(self.docs, "blog", "index.html")
+        self.write(listing, "<ul></ul>")
+        manifest["generated"] = {"blog": {"inputs": {}, "output": listing}}
+        save_manifest(self.manifest, manifest)
+        build_incremental(self.static, self.content, self.template, self.docs, "/", self.manifest, keep=("generated",))
+        self.assertTrue(os.path.exists(listing))
+        self.assertIn("generated", load_manifest(self.manifest))
+        self.build()
+        self.assertFalse(os.path.exists(listing))
+        self.assertNotIn("generated", load_manifest(self.manifest))
+
+    def test_source_date_change_rebuilds_page(self):
+        self.write(self.template, "<time>{{ Date }}</time>{{ Content }}")
+        post = os.path.join(self.content, "blog", "post", "index.md")
+        os.utime(post, (1_700_000_000, 1_700_000_000))
+        self.build()
+        os.utime(post, (1_710_000_000, 1_710_000_000))
+        self.build()
+        html = self.read(os.path.join(self.docs, "blog", "post", "index.html"))
+        self.assertIn(f"<time>{date.fromtimestamp(1_710_000_000).isoformat()}</time>", html)
+
+    def test_bounded_build_matches_discover_content(self):
+        pages, assets = discover_content(self.content, self.docs)
+        streamed = list(iter_content(self.content, self.docs))
+        self.assertEqual(sorted((src, dst) for src, dst, is_page in streamed if is_page), sorted(pages))
+        self.assertEqual(sorted((src, dst) for src, dst, is_page in streamed if not is_page), sorted(assets))
+        build_bounded(self.content, self.template, self.docs, "/")
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "blog", "post", "index.html")))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "blog", "post", "index.md")))
+
+    def test_deleted_output_is_regenerated(self):
+        self.build()
+        os.remove(os.path.join(self.docs, "index.html"))
+        self.build()
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "index.html")))
+
+
+class TestParallelBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.template = os.path.join(self.root, "template.html")
+        with open(self.template, "w") as f:
+            f.write("<title>{{ Title }}</title>{{ Content }}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_pages(self, count):
+        pages = []
+        for i in range(count):
+            src = os.path.join(self.root, f"page{i}.md")
+            with open(src, "w") as f:
+                f.write(f"# Page {i}\n\nBody **{i}**")
+            pages.append((src, os.path.join(self.root, "out", f"page{i}.html")))
+        return pages
+
+    def test_parallel_matches_serial(self):
+        pages = self.make_pages(6)
+        generate_pages(pages, self.template, "/", jobs=1)
+        serial = {}
+        for _, dst in pages:
+            with open(dst) as f:
+                serial[dst] = f.read()
+            os.remove(dst)
+        generate_pages(pages, self.template, "/", jobs=3)
+        for _, dst in pages:
+            with open(dst) as f:
+                self.assertEqual(serial[dst], f.read())
+
+    def test_failure_names_source_file(self):
+        pages = self.make_pages(4)
+        with open(pages[2][0], "w") as f:
+            f.write("# Broken\n\nunclosed **bold")
+        with self.assertRaises(Exception) as ctx:
+            generate_pages(pages, self.template, "/", jobs=2)
+        self.assertIn(pages[2][0], str(ctx.exception))
+        self.assertNotIn(pages[1][0], str(ctx.exception))
+
+    def test_io_pipeline_matches_serial(self):
+        pages = self.make_pages(9)
+        generate_pages(pages, self.template, "/", jobs=1)
+        serial = {}
+        for _, dst in pages:
+            with open(dst) as f:
+                serial[dst] = f.read()
+            os.remove(dst)
+        generate_pages(pages, self.template, "/", jobs=1, options=PageOptions(io_threads=2))
+        for _, dst in pages:
+            with open(dst) as f:
+                self.assertEqual(serial[dst], f.read())
+        self.assertFalse([name for name in os.listdir(os.path.join(self.root, "out")) if name.endswith(".tmp")])
+
+    def test_bounded_matches_serial(self):
+        pages = self.make_pages(9)
+        generate_pages(pages, self.template, "/", jobs=1)
+        serial = {}
+        for _, dst in pages:
+            with open(dst) as f:
+                serial[dst] = f.read()
+            os.remove(dst)
+        for jobs in (1, 2):
+            generate_pages_bounded(iter(pages), self.template, "/", jobs, batch_size=2)
+            for _, dst in pages:
+                with open(dst) as f:
+                    self.assertEqual(serial[dst], f.read())
+                os.remove(dst)
+
+    def test_workers_count_cache_lookups_once(self):
+        # Workers keep their options between batches; each batch reports
+        # only its own lookups.
+        pages = self.make_pages(9)
+        cache = PageCache(os.path.join(self.root, "cache"))
+        for expected in ([0, 9], [9, 0]):
+            counters = {}
+            generate_pages_bounded(iter(pages), self.template, "/", 2, PageOptions(cache=cache), counters, batch_size=2)
+            self.assertEqual(counters["page cache"], expected)
+
+    def test_content_assets_use_link_mode(self):
+        content = os.path.join(self.root, "content")
+        os.makedirs(os.path.join(content, "blog"))
+        for name in ("index.md", os.path.join("blog", "post.md")):
+            with open(os.path.join(content, name), "w") as f:
+                f.write("# Page")
+        builds = {
+            "recursive": lambda dest: generate_pages_recursive(content, self.template, dest, "/", link="hard"),
+            "parallel": lambda dest: generate_pages_parallel(content, self.template, dest, "/", 2, link="hard"),
+        }
+        for name, build in builds.items():
+            dest = os.path.join(self.root, name)
+            build(dest)
+            asset = os.path.join(dest, "blog", "post.md")
+            self.assertEqual(os.stat(asset).st_ino, os.stat(os.path.join(content, "blog", "post.md")).st_ino)
+            self.assertTrue(os.path.exists(os.path.join(dest, "blog", "post.html")))
+
+    def test_memory_budget_releases_caches(self):
+        pages = self.make_pages(3)
+        budget = MemoryBudget(0)
+        generate_pages(pages, self.template, "/", options=PageOptions(inline_memo_size=100, memory_budget=budget))
+        self.assertTrue(os.path.exists(pages[2][1]))
+        if current_rss() is not None:
+            # Still over a zero budget after releasing, so it backs off.
+            self.assertEqual(budget.releases, 2)
+            self.assertEqual(budget.backoff, 4)
+
+    def test_io_pipeline_reports_read_and_write_failures(self):
+        pages = self.make_pages(5)
+        os.remove(pages[1][0])
+        os.makedirs(pages[3][1])
+        with self.assertRaises(Exception) as ctx:
+            generate_pages(pages, self.template, "/", jobs=1, options=PageOptions(io_threads=2))
+        message = str(ctx.exception)
+        self.assertIn("Failed to generate 2 page(s)", message)
+        self.assertIn(pages[1][0], message)
+        self.assertIn(pages[3][0], message)
+        self.assertTrue(os.path.isfile(pages[4][1]))
+
+    def test_page_writer_bounds_pending_pages(self):
+        writer = PageWriter(1, max_pending=1)
+        dst = os.path.join(self.root, "a.html")
+        for i in range(3):
+            writer.submit("a.md", dst, ["page ", str(i)])
+        self.assertEqual(writer.close(), [])
+        with open(dst) as f:
+            self.assertEqual(f.read(), "page 2")
+
+
+class TestWriteOutput(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def chunks(self):
+        yield "<p>half"
+        raise ValueError("render failed")
+
+    def test_failed_render_keeps_old_output(self):
+        path = os.path.join(self.tmp.name, "index.html")
+        write_output(path, ["old"])
+        with self.assertRaisesRegex(ValueError, "render failed"):
+            write_output(path, self.chunks())
+        with open(path) as f:
+            self.assertEqual(f.read(), "old")
+        self.assertEqual(os.listdir(self.tmp.name), ["index.html"])
+
+    def test_failed_replace_removes_temporary_file(self):
+        path = os.path.join(self.tmp.name, "index.html")
+        os.makedirs(os.path.join(path, "child"))
+        with self.assertRaises(OSError):
+            write_output(path, ["new"])
+        self.assertEqual(os.listdir(self.tmp.name), ["index.html"])
+
+    def test_failed_open_raises_its_own_error(self):
+        path = os.path.join(self.tmp.name, "missing", "index.html")
+        with self.assertRaises(FileNotFoundError) as raised:
+            write_output(path, ["new"])
+        self.assertIsNone(raised.exception.__context__)
+
+
+class TestSyncDirectory(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.src = os.path.join(self.tmp.name, "static")
+        self.dst = os.path.join(self.tmp.name, "docs")
+        os.makedirs(os.path.join(self.src, "images"))
+        for name in ("index.css", os.path.join("images", "a.png"), os.path.join("images", "b.png")):
+            with open(os.path.join(self.src, name), "w") as f:
+                f.write(name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_skips_unchanged_files(self):
+        self.assertEqual(len(sync_directory(self.src, self.dst)), 3)
+        self.assertEqual(sync_directory(self.src, self.dst), [])
+        with open(os.path.join(self.src, "images", "a.png"), "w") as f:
+            f.write("changed and longer")
+        copied = sync_directory(self.src, self.dst)
+        self.assertEqual([os.path.relpath(src, self.src) for src, _ in copied], [os.path.join("images", "a.png")])
+        with open(os.path.join(self.dst, "images", "a.png")) as f:
+            self.assertEqual(f.read(), "changed and longer")
+
+    def test_asset_transforms(self):
+        set_asset_transforms({".css": str.upper})
+        try:
+            self.assertEqual(len(sync_directory(self.src, self.dst, link="hard")), 3)
+            with open(os.path.join(self.dst, "index.css")) as f:
+                self.assertEqual(f.read(), "INDEX.CSS")
+            self.assertNotEqual(os.stat(os.path.join(self.src, "index.css")).st_ino, os.stat(os.path.join(self.dst, "index.css")).st_ino)
+            self.assertEqual(sync_directory(self.src, self.dst), [])
+        finally:
+            set_asset_transforms({})
+
+    def test_hard_links(self):
+        sync_directory(self.src, self.dst, link="hard")
+        src_stat = os.stat(os.path.join(self.src, "index.css"))
+        dst_stat = os.stat(os.path.join(self.dst, "index.css"))
+        self.assertEqual(src_stat.st_ino, dst_stat.st_ino)
+        self.assertEqual(sync_directory(self.src, self.dst, link="hard"), [])
+
+    def test_reflink_falls_back_to_copy(self):
+        sync_directory(self.src, self.dst, link="reflink")
+        with open(os.path.join(self.dst, "images", "b.png")) as f:
+            self.assertEqual(f.read(), os.path.join("images", "b.png"))
+
+    def test_parallel_copy(self):
+        for i in range(40):
+            with open(os.path.join(self.src, f"file{i}.txt"), "w") as f:
+                f.write(str(i))
+        self.assertEqual(len(sync_directory(self.src, self.dst, threads=4)), 43)
+        with open(os.path.join(self.dst, "file39.txt")) as f:
+            self.assertEqual(f.read(), "39")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from htmlnode import HTMLNode, LeafNode, ParentNode
@@ -44,6 +45,10 @@ class TestHTMLNode(unittest.TestCase):
         self.assertIsNone(node.children)
         self.assertIsNone(node.props)
 
+    def test_no_instance_dict(self):
+        for node in (HTMLNode("p"), LeafNode("b", "x"), ParentNode("div", [LeafNode(None, "x")])):
+            self.assertFalse(hasattr(node, "__dict__"))
+
     def test_to_html_raises_not_implemented(self):
         node = HTMLNode("p", "test")
         with self.assertRaises(NotImplementedError):
@@ -152,5 +157,37 @@ class TestHTMLNode(unittest.TestCase):
             '<div class="container"><span>child</span></div>'
         )
 
+    #STREAMING TESTS
+
+    def test_iter_html_matches_to_html(self):
+        parent_node = ParentNode("div", [
+            ParentNode("p", [LeafNode(None, "text "), LeafNode("a", "link", {"href": "/x"})]),
+            ParentNode("ul", [ParentNode("li", [LeafNode("b", "item")])]),
+        ])
+        chunks = list(parent_node.iter_html())
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(
+            "".join(chunks),
+            '<div><p>text <a href="/x">link</a></p><ul><li><b>item</b></li></ul></div>'
+        )
+
+    def test_write_html(self):
+        buffer = io.StringIO()
+        ParentNode("p", [LeafNode("i", "hi")]).write_html(buffer)
+        self.assertEqual(buffer.getvalue(), "<p><i>hi</i></p>")
+
+    def test_iter_html_very_deep_nesting(self):
+        node = LeafNode("b", "deep")
+        for _ in range(5000):
+            node = ParentNode("span", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<span><span>"))
+        self.assertTrue(html.endswith("</span></span>"))
+
+    def test_iter_html_invalid_child_raises(self):
+        parent_node = ParentNode("div", [ParentNode("p", [])])
+        with self.assertRaises(ValueError):
+            list(parent_node.iter_html())
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,146 @@
+import os
+import pickle
+import struct
+import tempfile
+import unittest
+
+import images
+from generate_pages import PageOptions, build_incremental
+from images import ImagePipeline, image_size
+from textnode import TextNode, TextType, set_image_resolver, text_node_to_html_node
+
+
+def png_bytes(width, height):
+    ihdr = struct.pack(">II", width, height) + b"\x08\x06\x00\x00\x00"
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + ihdr + b"\x00" * 4
+
+
+def jpeg_bytes(width, height):
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+    sof = b"\xff\xc0" + struct.pack(">HBHHB", 11, 8, height, width, 1) + b"\x01\x11\x00"
+    return b"\xff\xd8" + app0 + sof + b"\xff\xd9"
+
+
+class TestImages(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.tmp.name, "static")
+        self.docs = os.path.join(self.tmp.name, "docs")
+        os.makedirs(os.path.join(self.static, "images"))
+        self.write(os.path.join(self.static, "images", "a.png"), png_bytes(1100, 438))
+        self.write(os.path.join(self.static, "images", "b.jpg"), jpeg_bytes(640, 480))
+        self.write(os.path.join(self.static, "index.css"), b"body {}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+        set_image_resolver(None)
+
+    def write(self, path, data):
+        with open(path, "wb") as f:
+            f.write(data)
+
+    def test_image_size_from_headers(self):
+        self.assertEqual(image_size(os.path.join(self.static, "images", "a.png")), (1100, 438))
+        self.assertEqual(image_size(os.path.join(self.static, "images", "b.jpg")), (640, 480))
+        self.assertIsNone(image_size(os.path.join(self.static, "index.css")))
+
+    @unittest.skipIf(images.Image is not None, "Pillow writes real variants")
+    def test_attributes_without_pillow(self):
+        pipeline = ImagePipeline(self.static, self.docs, "/site/", cache_dir=os.path.join(self.tmp.name, "cache"))
+        pipeline.process()
+        self.assertEqual(sorted(pipeline.images), ["/images/a.png", "/images/b.jpg"])
+        self.assertEqual(pipeline.resolve("/images/a.png"), {"width": "1100", "height": "438", "loading": "lazy", "decoding": "async"})
+        self.assertIsNone(pipeline.resolve("https://example.org/c.png"))
+
+    def test_img_nodes_use_resolver(self):
+        pipeline = ImagePipeline(self.static, self.docs, cache_dir=os.path.join(self.tmp.name, "cache"))
+        pipeline.process()
+        set_image_resolver(pipeline.resolve)
+        html = text_node_to_html_node(TextNode("alt", TextType.IMAGE, "/images/b.jpg")).to_html()
+        self.assertIn('src="/images/b.jpg" alt="alt" width="640" height="480" loading="lazy"', html)
+        html = text_node_to_html_node(TextNode("alt", TextType.IMAGE, "/missing.png")).to_html()
+        self.assertEqual(html, '<img src="/missing.png" alt="alt"></img>')
+
+    def test_fingerprint_follows_attributes(self):
+        pipeline = ImagePipeline(self.static, self.docs, cache_dir=os.path.join(self.tmp.name, "cache"))
+        pipeline.process()
+        before = pipeline.fingerprint()
+        self.write(os.path.join(self.static, "images", "a.png"), png_bytes(1200, 438))
+        pipeline.process()
+        self.assertNotEqual(pipeline.fingerprint(), before)
+        self.assertEqual(pickle.loads(pickle.dumps(pipeline)).fingerprint(), pipeline.fingerprint())
+
+    @unittest.skipIf(images.Image is None, "needs Pillow")
+    def test_variants_are_cached(self):
+        image = images.Image.new("RGB", (1100, 438), "red")
+        image.save(os.path.join(self.static, "images", "a.png"))
+        cache_dir = os.path.join(self.tmp.name, "cache")
+        first = ImagePipeline(self.static, self.docs, "/", (480, 960), cache_dir)
+        first.process()
+        props = first.resolve("/images/a.png")
+        self.assertEqual(props["srcset"], "/images/a-480w.png 480w, /images/a-960w.png 960w, /images/a-1100w.png 1100w")
+        with images.Image.open(os.path.join(self.docs, "images", "a-480w.png")) as variant:
+            self.assertEqual(variant.size, (480, 191))
+        second = ImagePipeline(self.static, self.docs, "/", (480, 960), cache_dir)
+        second.process()
+        self.assertEqual(second.encoded, 0)
+        self.assertGreater(second.reused, 0)
+
+    def test_unchanged_sources_are_not_hashed_again(self):
+        src = os.path.join(self.static, "images", "a.png")
+        cache_dir = os.path.join(self.tmp.name, "cache")
+        hashed = []
+        hash_file = images.hash_file
+        images.hash_file = lambda path: hashed.append(path) or hash_file(path)
+        try:
+            first = ImagePipeline(self.static, self.docs, cache_dir=cache_dir)
+            digest = first.source_digest(src)
+            first.save_digests()
+            second = ImagePipeline(self.static, self.docs, cache_dir=cache_dir)
+            second.known_digests = second.load_digests()
+            self.assertEqual(second.source_digest(src), digest)
+            self.assertEqual(hashed, [src])
+            self.write(src, png_bytes(1200, 438))
+            os.utime(src, ns=(1, 1))
+            self.assertNotEqual(second.source_digest(src), digest)
+            self.assertEqual(hashed, [src, src])
+        finally:
+            images.hash_file = hash_file
+
+    def test_evict_keeps_variants_of_current_images(self):
+        cache_dir = os.path.join(self.tmp.name, "cache")
+        pipeline = ImagePipeline(self.static, self.docs, cache_dir=cache_dir, max_bytes=1500)
+        digest = pipeline.source_digest(os.path.join(self.static, "images", "a.png"))
+        for name in (f"{digest}-1-480.png", "0" * 64 + "-1-480.png", "1" * 64 + "-1-480.png"):
+            path = os.path.join(cache_dir, name[:2], name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.write(path, b"x" * 1000)
+        self.assertEqual(pipeline.evict(), 1000)
+        self.assertTrue(os.path.exists(os.path.join(cache_dir, digest[:2], f"{digest}-1-480.png")))
+
+    @unittest.skipIf(images.Image is None, "needs Pillow")
+    def test_removed_image_removes_its_variants(self):
+        image = images.Image.new("RGB", (1100, 438), "red")
+        image.save(os.path.join(self.static, "images", "a.png"))
+        os.remove(os.path.join(self.static, "images", "b.jpg"))
+        content = os.path.join(self.tmp.name, "content")
+        os.makedirs(content)
+        self.write(os.path.join(content, "index.md"), b"# Home\n\n![a](/images/a.png)")
+        template = os.path.join(self.tmp.name, "template.html")
+        self.write(template, b"{{ Content }}")
+        manifest = os.path.join(self.tmp.name, "manifest.json")
+
+        def build():
+            pipeline = ImagePipeline(self.static, self.docs, "/", (480,), os.path.join(self.tmp.name, "cache"))
+            pipeline.process()
+            return build_incremental(self.static, content, template, self.docs, "/", manifest, options=PageOptions(images=pipeline))
+
+        variant = os.path.join(self.docs, "images", "a-480w.png")
+        self.assertIn(variant, build()["images"])
+        self.assertTrue(os.path.exists(variant))
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        build()
+        self.assertFalse(os.path.exists(variant))
+
+if __name__ == "__main__":
+    unittest.main()
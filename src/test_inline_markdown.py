@@ -462,5 +462,60 @@ class TestInlineMarkdown(unittest.TestCase):
             text_nodes
         )
 
+    def test_text_to_textnodes_spans_are_not_split(self):
+        text = "**bold [link](url)** and _italic `code`_ then `[not](link)`"
+        text_nodes = text_to_textnodes(text)
+        self.assertListEqual(
+            [
+                TextNode("bold [link](url)", TextType.BOLD),
+                TextNode(" and ", TextType.TEXT),
+                TextNode("italic `code`", TextType.ITALIC),
+                TextNode(" then ", TextType.TEXT),
+                TextNode("[not](link)", TextType.CODE),
+            ],
+            text_nodes
+        )
+
+    def test_text_to_textnodes_image_next_to_link(self):
+        text = "![img](a.png)[link](b)!![img2](c.png)"
+        text_nodes = text_to_textnodes(text)
+        self.assertListEqual(
+            [
+                TextNode("img", TextType.IMAGE, "a.png"),
+                TextNode("link", TextType.LINK, "b"),
+                TextNode("!", TextType.TEXT),
+                TextNode("img2", TextType.IMAGE, "c.png"),
+            ],
+            text_nodes
+        )
+
+    def test_text_to_textnodes_delimiter_precedence(self):
+        text = "[a_b](url) c_d"
+        text_nodes = text_to_textnodes(text)
+        self.assertListEqual(
+            [
+                TextNode("[a", TextType.TEXT),
+                TextNode("b](url) c", TextType.ITALIC),
+                TextNode("d", TextType.TEXT),
+            ],
+            text_nodes
+        )
+
+    def test_text_to_textnodes_unclosed_errors(self):
+        with self.assertRaisesRegex(Exception, r"'\*\*'"):
+            text_to_textnodes("_a_ **b")
+        with self.assertRaisesRegex(Exception, "'_'"):
+            text_to_textnodes("_a **b** c_")
+        with self.assertRaisesRegex(Exception, "'_'"):
+            text_to_textnodes("`a` `b c_")
+        with self.assertRaisesRegex(Exception, "'`'"):
+            text_to_textnodes("`a **b** c`")
+
+    def test_text_to_textnodes_many_links(self):
+        text = " ".join(f"[l{i}](u{i})" for i in range(2000))
+        text_nodes = text_to_textnodes(text)
+        self.assertEqual(len(text_nodes), 3999)
+        self.assertEqual(text_nodes[-1], TextNode("l1999", TextType.LINK, "u1999"))
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+
+from block_markdown import block_lines_to_textnodes
+from link_check import LinkGraph, PageLinks, find_file, resolve_target
+from site_index import build_index
+
+
+class TestLinkCheck(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.content = os.path.join(self.tmp.name, "content")
+        self.docs = os.path.join(self.tmp.name, "docs")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def add_page(self, rel_dir, markdown):
+        src_dir = os.path.join(self.content, rel_dir)
+        dest_dir = os.path.join(self.docs, rel_dir)
+        os.makedirs(src_dir, exist_ok=True)
+        os.makedirs(dest_dir, exist_ok=True)
+        src = os.path.join(src_dir, "index.md")
+        dest = os.path.join(dest_dir, "index.html")
+        with open(src, "w") as f:
+            f.write(markdown)
+        with open(dest, "w") as f:
+            f.write("<html></html>")
+        return src, dest
+
+    def add_file(self, rel_path):
+        path = os.path.join(self.docs, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write("x")
+        return path
+
+    def test_page_links_come_from_text_nodes(self):
+        page_links = PageLinks()
+        for block_lines in (["[a](/a) and ![img](/i.png) and `[not](/code)`"], ["```", "[also not](/code)", "```"], ["- [item](/b)"], ["[bad **link](/c)"]):
+            page_links.add_block(block_lines_to_textnodes(block_lines))
+        self.assertEqual(page_links.links, ["/a", "/b"])
+        self.assertEqual(page_links.images, ["/i.png"])
+
+    def test_resolve_target(self):
+        self.assertEqual(resolve_target("/blog/tom/", "../majesty/"), "/blog/majesty/")
+        self.assertEqual(resolve_target("/blog/tom/", "img.png"), "/blog/tom/img.png")
+        self.assertEqual(resolve_target("/about.html", "contact"), "/contact")
+        self.assertEqual(resolve_target("/", "/a%20b.png#top"), "/a b.png")
+        self.assertIsNone(resolve_target("/", "https://example.org/"))
+        self.assertIsNone(resolve_target("/", "mailto:me@example.org"))
+        self.assertIsNone(resolve_target("/", "#section"))
+
+    def test_find_file(self):
+        files = {"/index.html", "/blog/tom/index.html", "/about.html"}
+        self.assertEqual(find_file("/", files), "/index.html")
+        self.assertEqual(find_file("/blog/tom", files), "/blog/tom/index.html")
+        self.assertEqual(find_file("/about", files), "/about.html")
+        self.assertIsNone(find_file("/blog/", files))
+
+    def test_report(self):
+        pages = [
+            self.add_page("", "# Home\n\n[tom](/blog/tom/) [gone](/blog/gone/) ![pic](/images/used.png)"),
+            self.add_page("blog/tom", "# Tom\n\n[home](/) [self](./) [ext](https://example.org)"),
+            self.add_page("blog/orphan", "# Orphan\n\n[tom](../tom)"),
+        ]
+        used = self.add_file("images/used.png")
+        unused = self.add_file("images/unused.png")
+        links = LinkGraph()
+        build_index(pages, self.docs, links=links)
+        report = links.check(self.docs, [used, unused])
+        self.assertEqual(report.dangling, [(pages[0][0], "/blog/gone/")])
+        self.assertEqual(report.orphans, ["/blog/orphan/"])
+        self.assertEqual(report.unused_images, ["/images/unused.png"])
+        self.assertEqual(report.checked, 6)
+        self.assertIn("1 broken", report.format())
+
+if __name__ == "__main__":
+    unittest.main()
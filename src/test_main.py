@@ -0,0 +1,68 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from main import build, parse_args
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Only needed by flags that are off by default; importing main.py must not
+# load them (see benchmarks/bench_startup.py).
+LAZY_MODULES = [
+    "compress", "gzip", "hashlib", "images", "json", "link_check", "memory",
+    "multiprocessing", "concurrent.futures", "page_cache", "pathlib",
+    "search_index", "shard", "site_index",
+]
+
+
+class TestStartup(unittest.TestCase):
+    def test_main_imports_no_optional_modules(self):
+        code = (
+            "import sys\n"
+            "before = set(sys.modules)\n"
+            "import main\n"
+            f"print(' '.join(sorted(name for name in {LAZY_MODULES!r} if name in sys.modules and name not in before)))\n"
+        )
+        result = subprocess.run([sys.executable, "-c", code], cwd=SRC_DIR, capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.split(), [])
+
+
+class TestIncrementalSteps(unittest.TestCase):
+    # build() works on the fixed static/, content/ and docs/ paths of a site
+    # checkout, so each test runs in a temporary one.
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        os.makedirs("static")
+        os.makedirs(os.path.join("content", "blog"))
+        self.write(os.path.join("content", "index.md"), "# Home\n\nHello")
+        self.write(os.path.join("content", "blog", "post.md"), "# Post\n\nWorld")
+        self.write("template.html", "<title>{{ Title }}</title>{{ Content }}")
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def test_outputs_of_dropped_steps_are_removed(self):
+        sitemap = os.path.join("docs", "sitemap.xml")
+        search = os.path.join("docs", "search")
+        build(parse_args(["--incremental", "--sitemap", "https://example.org", "--search"]))
+        self.assertTrue(os.path.exists(sitemap))
+        self.assertTrue(os.path.exists(os.path.join(search, "index.json")))
+        build(parse_args(["--incremental", "--sitemap", "https://example.org"]))
+        self.assertTrue(os.path.exists(sitemap))
+        self.assertFalse(os.path.exists(search))
+        build(parse_args(["--incremental"]))
+        self.assertFalse(os.path.exists(sitemap))
+        self.assertTrue(os.path.exists(os.path.join("docs", "blog", "post.html")))
+
+
+if __name__ == "__main__":
+    unittest.main()
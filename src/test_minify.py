@@ -0,0 +1,43 @@
+import unittest
+
+from minify import minify_css, minify_html_chunks
+
+
+def minify(html, size=None):
+    if size is None:
+        return "".join(minify_html_chunks([html]))
+    return "".join(minify_html_chunks(html[i:i + size] for i in range(0, len(html), size)))
+
+
+class TestMinifyHTML(unittest.TestCase):
+    def test_collapses_whitespace_between_blocks(self):
+        html = "<!doctype html>\n<html>\n  <head>\n    <title> Title </title>\n  </head>\n  <body>\n    <p>Some   <b>bold</b>\n text</p>\n  </body>\n</html>\n"
+        self.assertEqual(minify(html), "<!doctype html><html><head><title>Title</title></head><body><p>Some <b>bold</b> text</p></body></html>")
+
+    def test_keeps_space_between_inline_elements(self):
+        self.assertEqual(minify("<p><a href=\"/\">a</a>   <i>b</i></p>"), "<p><a href=\"/\">a</a> <i>b</i></p>")
+
+    def test_preserves_pre_and_code(self):
+        html = "<div>\n<pre><code>def f():\n    return a < b\n</code></pre>\n<p>x  <code>a   b</code>  y</p>\n</div>"
+        self.assertEqual(minify(html), "<div><pre><code>def f():\n    return a < b\n</code></pre><p>x <code>a   b</code> y</p></div>")
+
+    def test_lone_angle_bracket_is_text(self):
+        self.assertEqual(minify("<p>1  <  2</p>"), "<p>1 < 2</p>")
+
+    def test_same_result_for_any_chunking(self):
+        html = "<html>\n <body>\n  <p>a  <b>b</b>\n c</p>\n  <pre>x\n  y</pre>\n <!-- note -->\n </body>\n</html>"
+        expected = minify(html)
+        for size in range(1, 12):
+            self.assertEqual(minify(html, size), expected)
+
+
+class TestMinifyCSS(unittest.TestCase):
+    def test_minify_css(self):
+        css = "/* theme */\nbody {\n  color: red;\n  margin : 0 auto ;\n}\n\nh1, h2 > a {\n  font-family: \"A  B\", serif;\n}\n"
+        self.assertEqual(minify_css(css), 'body{color:red;margin :0 auto}h1,h2>a{font-family:"A  B",serif}')
+
+    def test_keeps_descendant_pseudo_class_space(self):
+        self.assertEqual(minify_css("a :hover { x: y }"), "a :hover{x:y}")
+
+if __name__ == "__main__":
+    unittest.main()
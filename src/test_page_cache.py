@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+
+from page_cache import PageCache
+
+
+class TestPageCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = PageCache(os.path.join(self.tmp.name, "pages"), max_bytes=10_000)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def store(self, content_hash, title, chunks):
+        return "".join(self.cache.store(content_hash, title, iter(chunks)))
+
+    def test_round_trip(self):
+        self.assertIsNone(self.cache.open("abc"))
+        self.assertEqual(self.store("abc", "Title", ["<div>", "body", "</div>"]), "<div>body</div>")
+        title, body = self.cache.open("abc")
+        self.assertEqual(title, "Title")
+        self.assertEqual("".join(body), "<div>body</div>")
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_missing_title(self):
+        self.store("abc", None, ["<div></div>"])
+        self.assertIsNone(self.cache.open("abc")[0])
+
+    def test_failed_store_leaves_no_entry(self):
+        def chunks():
+            yield "<div>"
+            raise ValueError("parse error")
+        with self.assertRaises(ValueError):
+            "".join(self.cache.store("abc", "Title", chunks()))
+        self.assertIsNone(self.cache.open("abc"))
+        self.assertEqual(self.cache.entries(), [])
+
+    def test_evicts_least_recently_used(self):
+        for i in range(5):
+            self.store(f"page{i}", "T", ["x" * 3000])
+            path = self.cache.entry_path(f"page{i}")
+            os.utime(path, ns=(i * 10**9, i * 10**9))
+        self.assertLessEqual(self.cache.evict(), 10_000)
+        self.assertIsNone(self.cache.open("page0"))
+        self.assertIsNotNone(self.cache.open("page4"))
+
+    def test_pickles_without_counters(self):
+        import pickle
+        self.cache.hits = 3
+        copy = pickle.loads(pickle.dumps(self.cache))
+        self.assertEqual(copy.directory, self.cache.directory)
+        self.assertEqual(copy.hits, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+
+import profiling
+
+
+class TestProfiling(unittest.TestCase):
+    def tearDown(self):
+        profiling.stop_profiling()
+
+    def test_inactive_stage_is_noop(self):
+        self.assertIs(profiling.stage("read"), profiling.NULL_STAGE)
+        with profiling.stage("read"):
+            pass
+
+    def test_nested_stages_record_self_time(self):
+        profiler = profiling.start_profiling()
+        with profiling.page("a.md"):
+            with profiling.stage("blocks"):
+                with profiling.stage("inline"):
+                    pass
+                with profiling.stage("inline"):
+                    pass
+        profiling.stop_profiling()
+        self.assertEqual(profiler.stages["inline"][1], 2)
+        self.assertEqual(profiler.stages["blocks"][1], 1)
+        self.assertIn("a.md", profiler.pages)
+        self.assertIn("a.md;blocks;inline", profiler.folded)
+        total_self = sum(seconds for seconds, _ in profiler.stages.values())
+        self.assertAlmostEqual(total_self, profiler.pages["a.md"], places=6)
+
+    def test_hooks_receive_stage_and_page(self):
+        profiler = profiling.start_profiling()
+        events = []
+        profiler.add_hook(lambda name, page, seconds: events.append((name, page)))
+        with profiling.page("a.md"):
+            with profiling.stage("read"):
+                pass
+        with profiling.stage("copy"):
+            pass
+        self.assertEqual(events, [("read", "a.md"), ("page", "a.md"), ("copy", None)])
+
+    def test_merge_and_report(self):
+        worker = profiling.Profiler()
+        with profiling.Stage(worker, "page", "slow.md"):
+            with profiling.Stage(worker, "render"):
+                pass
+        profiler = profiling.start_profiling()
+        with profiling.page("fast.md"):
+            pass
+        profiler.merge(worker.snapshot())
+        profiler.pages["slow.md"] = 5.0
+        report = profiler.report(top=1)
+        self.assertIn("render", report)
+        self.assertIn("Slowest 1 of 2 pages", report)
+        self.assertIn("slow.md", report)
+        self.assertNotIn("fast.md", report)
+
+    def test_write_folded(self):
+        profiler = profiling.start_profiling()
+        with profiling.page("a.md"):
+            with profiling.stage("read"):
+                pass
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "out.folded")
+            profiler.write_folded(path)
+            with open(path) as f:
+                lines = f.read().splitlines()
+        self.assertEqual([line.rsplit(" ", 1)[0] for line in lines], ["a.md", "a.md;read"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import json
+import os
+import tempfile
+import unittest
+
+from block_markdown import block_lines_to_textnodes
+from search_index import PageTerms, SearchIndex, block_words, decode_postings, encode_postings, shard_key, term_hash
+from site_index import build_index
+
+
+def words(block_lines):
+    return list(block_words(block_lines_to_textnodes(block_lines)))
+
+
+class TestSearchIndex(unittest.TestCase):
+    def test_block_words_use_text_nodes(self):
+        self.assertEqual(words(["Some **Bold** [link text](/url) ![alt](/a.png) `code`"]), ["some", "bold", "link", "text", "code"])
+
+    def test_block_words_strip_block_markup(self):
+        self.assertEqual(words(["## A heading"]), ["a", "heading"])
+        self.assertEqual(words(["- one", "- two"]), ["one", "two"])
+        self.assertEqual(words(["```", "x = **y", "```"]), ["x", "y"])
+
+    def test_block_words_invalid_inline_markdown(self):
+        self.assertEqual(words(["unclosed **bold"]), ["unclosed", "bold"])
+
+    def test_page_terms_positions(self):
+        terms = PageTerms()
+        terms.add_block(block_lines_to_textnodes(["the cat and the hat"]))
+        terms.add_block(block_lines_to_textnodes(["the end"]))
+        self.assertEqual(terms.positions["the"], [0, 3, 5])
+        self.assertEqual(terms.count, 7)
+
+    def test_term_hash(self):
+        # Reference values of 32-bit FNV-1a; search.js must agree.
+        self.assertEqual(term_hash(""), 0x811c9dc5)
+        self.assertEqual(term_hash("a"), 0xe40c292c)
+        self.assertEqual(term_hash("foobar"), 0xbf9cf968)
+
+    def test_shards_grow_in_number_not_size(self):
+        search = SearchIndex(shard_bytes=1024)
+        for i in range(2000):
+            search.postings[f"term{i}"] = [(0, [i])]
+        buckets, shards = search.shards()
+        self.assertGreater(buckets, 20)
+        sizes = [len(json.dumps(shard, separators=(",", ":"))) for shard in shards.values()]
+        self.assertLess(max(sizes), 3 * 1024)
+        for key, shard in shards.items():
+            self.assertTrue(all(shard_key(term, buckets) == key for term in shard))
+
+    def test_postings_round_trip(self):
+        postings = [(0, [1, 5, 9]), (3, [0]), (4, [2, 100])]
+        encoded = encode_postings(postings)
+        self.assertEqual(encoded, [0, 3, 1, 4, 4, 3, 1, 0, 1, 2, 2, 98])
+        self.assertEqual(decode_postings(encoded), postings)
+
+    def test_build_and_write(self):
+        with tempfile.TemporaryDirectory() as root:
+            content = os.path.join(root, "content")
+            docs = os.path.join(root, "docs")
+            os.makedirs(os.path.join(content, "blog", "post"))
+            with open(os.path.join(content, "index.md"), "w") as f:
+                f.write("# Home\n\nNot indexed")
+            with open(os.path.join(content, "blog", "post", "index.md"), "w") as f:
+                f.write("# Post\n\nHello _world_, hello again")
+            search = SearchIndex("/blog/")
+            pages = [
+                (os.path.join(content, "index.md"), os.path.join(docs, "index.html")),
+                (os.path.join(content, "blog", "post", "index.md"), os.path.join(docs, "blog", "post", "index.html")),
+            ]
+            build_index(pages, docs, search)
+            self.assertEqual(search.pages, [("/blog/post/", "Post")])
+            self.assertNotIn("indexed", search.postings)
+            search.write(docs, "/site/")
+            search_dir = os.path.join(docs, "search")
+            with open(os.path.join(search_dir, "index.json")) as f:
+                meta = json.load(f)
+            self.assertEqual(meta["pages"], [["/site/blog/post/", "Post"]])
+            key = shard_key("hello", meta["buckets"])
+            self.assertIn(key, meta["shards"])
+            with open(os.path.join(search_dir, f"{key}.json")) as f:
+                shard = json.load(f)
+            self.assertEqual(decode_postings(shard["hello"]), [(0, [1, 3])])
+            self.assertTrue(os.path.isfile(os.path.join(search_dir, "search.js")))
+
+if __name__ == "__main__":
+    unittest.main()
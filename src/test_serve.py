@@ -0,0 +1,163 @@
+import os
+import tempfile
+import unittest
+
+from generate_pages import MANIFEST_PATH, PageOptions, build_incremental, load_manifest
+from serve import SAVE_DELAY, Reloader, TreeWatch, Watcher, unsupported_options
+
+
+class TestServe(unittest.TestCase):
+
+    def test_unsupported_options(self):
+        page = {"inputs": {"basepath": "/", "minify": True, "images": "abc"}, "output": "docs/index.html"}
+        manifest = {"pages": {"content/index.md": page}, "assets": {}, "generated": {"blog": {"inputs": {}, "output": "docs/blog/index.html"}}}
+        self.assertEqual(unsupported_options(manifest, PageOptions()), ["--images", "--listings", "--minify"])
+        self.assertEqual(unsupported_options(manifest, PageOptions(minify=True)), ["--images", "--listings"])
+        self.assertEqual(unsupported_options({"pages": {}, "assets": {}}, PageOptions()), [])
+
+    def test_reloader_wait(self):
+        reloader = Reloader()
+        self.assertEqual(reloader.wait(0, timeout=0), 0)
+        reloader.notify()
+        self.assertEqual(reloader.wait(0, timeout=0), 1)
+
+
+class TestTreeWatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "content")
+        os.makedirs(os.path.join(self.root, "blog"))
+        for i in range(4):
+            self.write(os.path.join(self.root, "blog", f"{i}.md"), "old")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text, mtime=None):
+        with open(path, "w") as f:
+            f.write(text)
+        if mtime is not None:
+            os.utime(path, ns=(mtime, mtime))
+
+    def settle(self, watch):
+        # Marks every directory as unchanged since its last listing, as it
+        # would be on a tree nobody touched for a while.
+        for directory, (_, files, subdirs) in list(watch.dirs.items()):
+            watch.dirs[directory] = (os.stat(directory).st_mtime_ns, files, subdirs)
+
+    def test_created_and_removed_files(self):
+        watch = TreeWatch([self.root])
+        os.makedirs(os.path.join(self.root, "new"))
+        self.write(os.path.join(self.root, "new", "a.md"), "new")
+        os.remove(os.path.join(self.root, "blog", "0.md"))
+        changed, removed = watch.poll()
+        self.assertEqual(changed, [os.path.join(self.root, "new", "a.md")])
+        self.assertEqual(removed, [os.path.join(self.root, "blog", "0.md")])
+        self.assertEqual(watch.poll(), ([], []))
+
+    def test_in_place_writes_are_swept(self):
+        watch = TreeWatch([self.root], sweep=2)
+        self.settle(watch)
+        self.write(os.path.join(self.root, "blog", "3.md"), "new", mtime=1)
+        found = []
+        # Two directories and four files, two paths per poll.
+        for _ in range(3):
+            changed, _ = watch.poll()
+            found.extend(changed)
+        self.assertEqual(found, [os.path.join(self.root, "blog", "3.md")])
+        # From now on it is stat'ed on every poll.
+        self.write(os.path.join(self.root, "blog", "3.md"), "newer", mtime=2)
+        self.assertEqual(watch.poll()[0], [os.path.join(self.root, "blog", "3.md")])
+
+    def test_unchanged_directories_are_not_listed(self):
+        watch = TreeWatch([self.root], sweep=0)
+        self.settle(watch)
+        scanned = []
+        scan = watch.scan
+        watch.scan = lambda directory, changed, removed: scanned.append(directory) or scan(directory, changed, removed)
+        self.assertEqual(watch.poll(), ([], []))
+        self.assertEqual(scanned, [])
+
+
+class TestWatcher(unittest.TestCase):
+    # The watcher works on the fixed static/, content/ and docs/ paths of a
+    # site checkout, so each test runs in a temporary one.
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        os.makedirs("static")
+        os.makedirs(os.path.join("content", "blog"))
+        self.write(os.path.join("static", "index.css"), "body {}")
+        self.write(os.path.join("content", "index.md"), "# Home\n\nHello")
+        self.write(os.path.join("content", "blog", "index.md"), "# Blog")
+        self.write("template.html", "<title>{{ Title }}</title>\n<body>\n{{ Content }}\n</body>")
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def watcher(self, options):
+        # serve builds everything once before it starts watching.
+        build_incremental("static", "content", "template.html", "docs", "/", options=options)
+        return Watcher("/", Reloader(), options)
+
+    def test_changed_page_is_rebuilt_with_the_build_options(self):
+        options = PageOptions(minify=True)
+        watcher = self.watcher(options)
+        blog = os.path.join("docs", "blog", "index.html")
+        os.utime(blog, ns=(0, 0))
+        self.write(os.path.join("content", "index.md"), "# Home\n\nChanged")
+        os.utime(os.path.join("content", "index.md"), ns=(1, 1))
+        self.assertTrue(watcher.poll())
+        html = self.read(os.path.join("docs", "index.html"))
+        self.assertIn("Changed", html)
+        self.assertNotIn("\n", html)
+        self.assertEqual(os.stat(blog).st_mtime_ns, 0)
+        # The manifest is written once nothing changed for a while.
+        self.assertFalse(watcher.poll())
+        self.assertNotEqual(load_manifest(MANIFEST_PATH), watcher.manifest)
+        watcher.last_change -= SAVE_DELAY
+        self.assertFalse(watcher.poll())
+        entry = load_manifest(MANIFEST_PATH)["pages"][os.path.join("content", "index.md")]
+        self.assertTrue(entry["inputs"]["minify"])
+        self.assertEqual(load_manifest(MANIFEST_PATH), watcher.manifest)
+
+    def test_removed_page_removes_its_output(self):
+        watcher = self.watcher(PageOptions())
+        os.remove(os.path.join("content", "blog", "index.md"))
+        self.assertTrue(watcher.poll())
+        self.assertFalse(os.path.exists(os.path.join("docs", "blog", "index.html")))
+        self.assertNotIn(os.path.join("content", "blog", "index.md"), watcher.manifest["pages"])
+
+    def test_template_change_rerenders_dependents(self):
+        watcher = self.watcher(PageOptions())
+        self.write("template.html", "<title>{{ Title }}</title>\n<main>\n{{ Content }}\n</main>")
+        os.utime("template.html", ns=(1, 1))
+        self.assertTrue(watcher.poll())
+        self.assertIn("<main>", self.read(os.path.join("docs", "blog", "index.html")))
+        self.assertIn("<main>", self.read(os.path.join("docs", "index.html")))
+        watcher.save()
+        # A build from scratch finds nothing stale.
+        before = os.stat(os.path.join("docs", "index.html")).st_mtime_ns
+        build_incremental("static", "content", "template.html", "docs", "/")
+        self.assertEqual(os.stat(os.path.join("docs", "index.html")).st_mtime_ns, before)
+
+    def test_new_asset_is_copied(self):
+        watcher = self.watcher(PageOptions())
+        self.write(os.path.join("static", "site.js"), "let a;")
+        self.assertTrue(watcher.poll())
+        self.assertEqual(self.read(os.path.join("docs", "site.js")), "let a;")
+        self.assertIn(os.path.join("static", "site.js"), watcher.manifest["assets"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import os
+import json
+import tempfile
+import unittest
+
+from generate_pages import copy_files, discover_content, generate_pages, list_files
+from shard import build_shard, merge_shards, parse_shard, partition
+
+
+class TestPartition(unittest.TestCase):
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for spec in ("0/4", "5/4", "1", "a/b", "1/0"):
+            with self.assertRaises(ValueError):
+                parse_shard(spec)
+
+    def test_hash_partition_is_stable(self):
+        sources = [f"content/page{i}.md" for i in range(100)]
+        shards = partition(sources, 3)
+        reordered = partition(list(reversed(sources)), 3)
+        self.assertEqual([sorted(shard) for shard in reordered], [sorted(shard) for shard in shards])
+        self.assertEqual(sorted(sum(shards, [])), sorted(sources))
+        # Adding a page does not move the others.
+        grown = partition(sources + ["content/new.md"], 3)
+        for before, after in zip(shards, grown):
+            self.assertEqual([src for src in after if src != "content/new.md"], before)
+
+    def test_costs_balance_shards(self):
+        costs = {"a": 8.0, "b": 5.0, "c": 4.0, "d": 3.0, "e": 1.0, "f": 1.0}
+        shards = partition(list(costs), 2, costs)
+        loads = sorted(sum(costs[src] for src in shard) for shard in shards)
+        self.assertEqual(loads, [11.0, 11.0])
+
+
+class TestShardedBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.static = os.path.join(root, "static")
+        self.content = os.path.join(root, "content")
+        self.template = os.path.join(root, "template.html")
+        self.timings = os.path.join(root, ".cache", "shards.json")
+        os.makedirs(os.path.join(self.static, "images"))
+        os.makedirs(os.path.join(self.content, "blog"))
+        self.write(os.path.join(self.static, "index.css"), "body {}")
+        self.write(os.path.join(self.static, "images", "a.png"), "png")
+        self.write(os.path.join(self.content, "index.md"), "# Home")
+        for i in range(12):
+            self.write(os.path.join(self.content, "blog", f"post{i}.md"), f"# Post {i}\n\n" + "word " * (i * 50))
+        self.write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def tree(self, directory):
+        files = {}
+        for root, _, names in os.walk(directory):
+            for name in names:
+                path = os.path.join(root, name)
+                with open(path, "rb") as f:
+                    files[os.path.relpath(path, directory)] = f.read()
+        return files
+
+    def shard_dir(self, index):
+        return os.path.join(self.tmp.name, "shards", str(index))
+
+    def build_shards(self, count):
+        return [
+            build_shard(self.static, self.content, self.template, self.shard_dir(i), "/", i, count, self.timings)
+            for i in range(1, count + 1)
+        ]
+
+    def test_merge_matches_full_build(self):
+        full = os.path.join(self.tmp.name, "full")
+        pages, assets = discover_content(self.content, full)
+        copy_files(list_files(self.static, full) + assets)
+        generate_pages(pages, self.template, "/")
+        manifests = self.build_shards(3)
+        self.assertEqual(sum(len(manifest["outputs"]) for manifest in manifests), 27)
+        docs = os.path.join(self.tmp.name, "docs")
+        merged = merge_shards([self.shard_dir(i) for i in (1, 2, 3)], docs, self.timings)
+        self.assertEqual(self.tree(docs), self.tree(full))
+        self.assertEqual(len(merged["timings"]), 13)
+        # The next build balances pages by the recorded timings.
+        with open(self.timings) as f:
+            self.assertEqual(json.load(f)["count"], 3)
+        again = self.build_shards(3)
+        self.assertEqual(sum(len(manifest["timings"]) for manifest in again), 13)
+
+    def test_merge_rejects_collisions(self):
+        self.build_shards(2)
+        self.write(os.path.join(self.shard_dir(2), "index.css"), "other")
+        self.write(os.path.join(self.shard_dir(1), "index.css"), "body {}")
+        docs = os.path.join(self.tmp.name, "docs")
+        with self.assertRaisesRegex(Exception, "more than one shard"):
+            merge_shards([self.shard_dir(1), self.shard_dir(2)], docs, self.timings)
+        self.assertFalse(os.path.exists(docs))
+
+    def test_merge_rejects_missing_shard(self):
+        self.build_shards(3)
+        with self.assertRaisesRegex(Exception, r"missing \[2\]"):
+            merge_shards([self.shard_dir(1), self.shard_dir(3)], os.path.join(self.tmp.name, "docs"), self.timings)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import os
+import tempfile
+import unittest
+
+from generate_pages import PageOptions, discover_content, generate_pages
+from link_check import LinkGraph
+from search_index import SearchIndex
+from site_index import build_index, listing_directories, page_url, write_listings, write_sitemap
+
+
+class TestSiteIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.content = os.path.join(root, "content")
+        self.docs = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        os.makedirs(os.path.join(self.content, "blog", "first"))
+        os.makedirs(os.path.join(self.content, "blog", "second"))
+        self.write(os.path.join(self.content, "index.md"), "# Home\n\n[blog](/blog/) and [first](/blog/first/)")
+        self.write(os.path.join(self.content, "blog", "first", "index.md"), "Intro\n\n# First Post\n\nOne two three\n\nTags: python, Static Sites")
+        self.write(os.path.join(self.content, "blog", "second", "index.md"), "# Second Post\n\nTags: python")
+        os.utime(os.path.join(self.content, "blog", "first", "index.md"), (1_700_000_000, 1_700_000_000))
+        os.utime(os.path.join(self.content, "blog", "second", "index.md"), (1_710_000_000, 1_710_000_000))
+        self.write(self.template, "<title>{{ Title }}</title><body>{{ Content }}</body>")
+        pages, _ = discover_content(self.content, self.docs)
+        self.pages = pages
+        self.index = build_index(pages, self.docs)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, path, text):
+        with open(path, "w") as f:
+            f.write(text)
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def test_page_info(self):
+        first = self.index.get(os.path.join(self.content, "blog", "first", "index.md"))
+        self.assertEqual(first.url, "/blog/first/")
+        self.assertEqual(first.title, "First Post")
+        self.assertEqual(first.words, 10)
+        self.assertEqual(first.tags, ["python", "Static Sites"])
+        home = self.index.get(os.path.join(self.content, "index.md"))
+        self.assertEqual(home.url, "/")
+
+    def test_search_and_links_in_one_read(self):
+        search = SearchIndex()
+        links = LinkGraph()
+        build_index(self.pages, self.docs, search, links)
+        _, _, home_links = links.pages["/"]
+        self.assertEqual(home_links.links, ["/blog/", "/blog/first/"])
+        self.assertEqual(len(search.postings["first"]), 2)
+
+    def test_page_url(self):
+        self.assertEqual(page_url(os.path.join(self.docs, "about.html"), self.docs), "/about.html")
+        self.assertEqual(page_url(os.path.join(self.docs, "a", "index.html"), self.docs), "/a/")
+
+    def test_listing_directories(self):
+        listings = listing_directories(self.index)
+        self.assertEqual([str(directory) for directory in listings], ["blog"])
+        self.assertEqual(len(listings[next(iter(listings))]), 2)
+
+    def test_listings_and_tags(self):
+        written = write_listings(self.index, self.template, "/site/")
+        urls = [url for url, _ in written]
+        self.assertEqual(urls, ["/blog/", "/tags/python/", "/tags/static-sites/", "/tags/"])
+        blog = self.read(os.path.join(self.docs, "blog", "index.html"))
+        # Newest first, links rewritten to the basepath.
+        self.assertLess(blog.index("Second Post"), blog.index("First Post"))
+        self.assertIn('href="/site/blog/first/"', blog)
+        tags = self.read(os.path.join(self.docs, "tags", "index.html"))
+        self.assertIn('<a href="/site/tags/python/">python</a> (2)', tags)
+
+    def test_listing_titles_are_escaped(self):
+        second = self.index.get(os.path.join(self.content, "blog", "second", "index.md"))
+        second.title = "Tags & <script>"
+        write_listings(self.index, self.template, "/")
+        blog = self.read(os.path.join(self.docs, "blog", "index.html"))
+        self.assertIn(">Tags &amp; &lt;script&gt;</a>", blog)
+        self.assertNotIn("<script>", blog)
+
+    def test_listings_only_rewritten_when_inputs_change(self):
+        records = {}
+        write_listings(self.index, self.template, "/", records=records)
+        self.assertEqual(len(records), 4)
+        for path in records:
+            os.utime(path, ns=(0, 0))
+        write_listings(self.index, self.template, "/", records=records)
+        self.assertTrue(all(os.stat(path).st_mtime_ns == 0 for path in records))
+        # Retitling a page only rewrites the listings that show it.
+        second = self.index.get(os.path.join(self.content, "blog", "second", "index.md"))
+        second.title = "Renamed"
+        write_listings(self.index, self.template, "/", records=records)
+        blog = os.path.join(self.docs, "blog", "index.html")
+        self.assertIn("Renamed", self.read(blog))
+        self.assertNotEqual(os.stat(os.path.join(self.docs, "tags", "python", "index.html")).st_mtime_ns, 0)
+        self.assertEqual(os.stat(os.path.join(self.docs, "tags", "static-sites", "index.html")).st_mtime_ns, 0)
+        self.assertEqual(os.stat(os.path.join(self.docs, "tags", "index.html")).st_mtime_ns, 0)
+        # Listings that are no longer generated are removed.
+        first = self.index.get(os.path.join(self.content, "blog", "first", "index.md"))
+        first.tags = ["python"]
+        write_listings(self.index, self.template, "/", records=records)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "tags", "static-sites")))
+        self.assertEqual(len(records), 3)
+
+    def test_colliding_tag_slugs_get_their_own_pages(self):
+        first = self.index.get(os.path.join(self.content, "blog", "first", "index.md"))
+        second = self.index.get(os.path.join(self.content, "blog", "second", "index.md"))
+        first.tags = ["C"]
+        second.tags = ["C++"]
+        urls = [url for url, _ in write_listings(self.index, self.template, "/")]
+        self.assertEqual(urls, ["/blog/", "/tags/c/", "/tags/c-2/", "/tags/"])
+        self.assertIn("Tagged: C++", self.read(os.path.join(self.docs, "tags", "c-2", "index.html")))
+        self.assertIn("Tagged: C<", self.read(os.path.join(self.docs, "tags", "c", "index.html")))
+
+    def test_directory_with_new_index_keeps_its_page(self):
+        records = {}
+        write_listings(self.index, self.template, "/", records=records)
+        self.write(os.path.join(self.content, "blog", "index.md"), "# Blog")
+        pages, _ = discover_content(self.content, self.docs)
+        generate_pages(pages, self.template, "/")
+        write_listings(build_index(pages, self.docs), self.template, "/", records=records)
+        blog = os.path.join(self.docs, "blog", "index.html")
+        self.assertIn("<title>Blog</title>", self.read(blog))
+        self.assertNotIn(os.path.normpath(blog), records)
+
+    def test_sitemap(self):
+        path = write_sitemap(self.index, "https://example.org/", "/site/", [("/blog/", 1_710_000_000)])
+        sitemap = self.read(path)
+        self.assertIn("<loc>https://example.org/site/</loc>", sitemap)
+        self.assertIn("<loc>https://example.org/site/blog/</loc>", sitemap)
+        self.assertIn("<loc>https://example.org/site/blog/first/</loc>", sitemap)
+        self.assertEqual(sitemap.count("<url>"), 4)
+
+    def test_pages_use_indexed_title(self):
+        first = self.index.get(os.path.join(self.content, "blog", "first", "index.md"))
+        first.title = "From Index"
+        generate_pages(self.pages, self.template, "/", options=PageOptions(index=self.index))
+        page = self.read(os.path.join(self.docs, "blog", "first", "index.html"))
+        self.assertIn("<title>From Index</title>", page)
+
+if __name__ == "__main__":
+    unittest.main()
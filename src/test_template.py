@@ -0,0 +1,86 @@
+import io
+import os
+import tempfile
+import unittest
+
+from template import Template, load_template
+
+
+class TestTemplate(unittest.TestCase):
+    def test_render_variables(self):
+        template = Template("<title>{{ Title }}</title><p>{{Date}}</p>{{ Content }}")
+        self.assertEqual(
+            template.render({"Title": "Home", "Date": "2025-01-01", "Content": "<div></div>"}),
+            "<title>Home</title><p>2025-01-01</p><div></div>",
+        )
+
+    def test_missing_variable_renders_empty(self):
+        template = Template("<nav>{{ Nav }}</nav>")
+        self.assertEqual(template.render({}), "<nav></nav>")
+
+    def test_streamed_variable(self):
+        template = Template("<body>{{ Content }}</body>")
+        buffer = io.StringIO()
+        template.write(buffer, {"Content": iter(["<p>", "hi", "</p>"])})
+        self.assertEqual(buffer.getvalue(), "<body><p>hi</p></body>")
+
+    def test_streamed_variable_used_twice(self):
+        template = Template("{{ Content }}|{{ Content }}")
+        self.assertEqual(template.render({"Content": iter(["a", "b"])}), "ab|ab")
+
+    def test_basepath_applies_to_template_only(self):
+        template = Template('<link href="/index.css" /><img src="/a.png" />{{ Content }}', "/site/")
+        self.assertEqual(
+            template.render({"Content": '<a href="/x">x</a>'}),
+            '<link href="/site/index.css" /><img src="/site/a.png" /><a href="/x">x</a>',
+        )
+
+    def test_load_template_caches_until_changed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, "w") as f:
+                f.write("{{ Title }}")
+            first = load_template(path)
+            self.assertIs(first, load_template(path))
+            self.assertIsNot(first, load_template(path, "/site/"))
+            with open(path, "w") as f:
+                f.write("<h1>{{ Title }}</h1>")
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+            self.assertEqual(load_template(path).render({"Title": "x"}), "<h1>x</h1>")
+
+    def test_partials(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.makedirs(os.path.join(tmp, "partials"))
+            path = os.path.join(tmp, "template.html")
+            nav = os.path.join(tmp, "partials", "nav.html")
+            link = os.path.join(tmp, "partials", "link.html")
+            with open(path, "w") as f:
+                f.write("{{> partials/nav.html }}<h1>{{ Title }}</h1>{{>partials/link.html}}")
+            with open(nav, "w") as f:
+                f.write("<nav>{{> link.html }}</nav>")
+            with open(link, "w") as f:
+                f.write('<a href="/">{{ Title }}</a>')
+            template = load_template(path, "/site/")
+            self.assertEqual(
+                template.render({"Title": "x"}),
+                '<nav><a href="/site/">x</a></nav><h1>x</h1><a href="/site/">x</a>',
+            )
+            self.assertEqual(template.dependencies, [path, nav, link])
+            with open(link, "w") as f:
+                f.write("<b>{{ Title }}</b>")
+            stat = os.stat(link)
+            os.utime(link, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+            self.assertEqual(load_template(path, "/site/").render({"Title": "x"}), "<nav><b>x</b></nav><h1>x</h1><b>x</b>")
+
+    def test_partial_cycle(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, "w") as f:
+                f.write("{{> template.html }}")
+            with self.assertRaises(ValueError):
+                load_template(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
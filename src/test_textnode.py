@@ -1,6 +1,6 @@
 import unittest
 
-from textnode import TextNode, TextType, text_node_to_html_node
+from textnode import TextNode, TextType, set_url_basepath, text_node_to_html_node
 
 
 class TestTextNode(unittest.TestCase):
@@ -24,6 +24,12 @@ class TestTextNode(unittest.TestCase):
         node2 = TextNode("This is a text node", TextType.BOLD, "google.com")
         self.assertNotEqual(node, node2)
 
+    def test_no_instance_dict(self):
+        node = TextNode("This is a text node", TextType.BOLD)
+        self.assertFalse(hasattr(node, "__dict__"))
+        with self.assertRaises(AttributeError):
+            node.extra = "nope"
+
         #TEXTNODE TO HTMLNODE TESTS
 
     def test_text(self):
@@ -55,6 +61,18 @@ class TestTextNode(unittest.TestCase):
             {"src": "https://www.boot.dev", "alt": "This is an image"},
         )
 
+    def test_url_basepath(self):
+        set_url_basepath("/site/")
+        try:
+            link = text_node_to_html_node(TextNode("a", TextType.LINK, "/blog/"))
+            image = text_node_to_html_node(TextNode("b", TextType.IMAGE, "/b.png"))
+            external = text_node_to_html_node(TextNode("c", TextType.LINK, "https://example.com/"))
+        finally:
+            set_url_basepath("/")
+        self.assertEqual(link.props["href"], "/site/blog/")
+        self.assertEqual(image.props["src"], "/site/b.png")
+        self.assertEqual(external.props["href"], "https://example.com/")
+
     def test_wrong_text_type(self):
         text_type = "GOOFY"
         node = TextNode("This is a text node", text_type)
@@ -19,6 +19,8 @@ Images, in this format: ![alt text](url)
 '''
 
 class TextNode():
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url=None):
         self.text = text
         self.text_type = text_type
@@ -30,6 +32,34 @@ class TextNode():
     def __repr__(self):
         return f"TextNode({self.text}, {self.text_type.value}, {self.url})"
 
+# Optional function url -> extra <img> attributes, or None; set by the image
+# pipeline for srcset, width/height and lazy loading (see images.py).
+IMAGE_RESOLVER = None
+# A plain value that changes whenever the resolver's answers would, such as
+# the pipeline's fingerprint(); the inline memo is keyed on it.
+IMAGE_RESOLVER_KEY = None
+
+def set_image_resolver(resolver, key=None):
+    global IMAGE_RESOLVER, IMAGE_RESOLVER_KEY
+    IMAGE_RESOLVER = resolver
+    # Without a key the resolver itself is the key, which only matches itself.
+    IMAGE_RESOLVER_KEY = resolver if key is None else key
+
+# Prefix for site-absolute link and image URLs, such as "/site/" for a site
+# served from a subdirectory; set for each page (see set_url_basepath).
+URL_BASEPATH = "/"
+
+def set_url_basepath(basepath):
+    global URL_BASEPATH
+    URL_BASEPATH = basepath
+
+def site_url(url):
+    # The same rewrite rewrite_basepath applies to href="/ and src="/ in
+    # the template.
+    if URL_BASEPATH != "/" and url.startswith("/"):
+        return URL_BASEPATH + url[1:]
+    return url
+
 def text_node_to_html_node(text_node):
     if text_node.text_type == TextType.TEXT:
         return LeafNode(None, text_node.text)
@@ -40,7 +70,10 @@ def text_node_to_html_node(text_node):
     if text_node.text_type == TextType.CODE:
         return LeafNode("code", text_node.text)
     if text_node.text_type == TextType.LINK:
-        return LeafNode("a", text_node.text, {"href": text_node.url})
+        return LeafNode("a", text_node.text, {"href": site_url(text_node.url)})
     if text_node.text_type == TextType.IMAGE:
-        return LeafNode("img", "", {"src": text_node.url, "alt": text_node.text})
+        props = {"src": site_url(text_node.url), "alt": text_node.text}
+        if IMAGE_RESOLVER is not None:
+            props.update(IMAGE_RESOLVER(text_node.url) or {})
+        return LeafNode("img", "", props)
     raise ValueError(f"invalid text type: {text_node.text_type}")
\ No newline at end of file